@@ -0,0 +1,122 @@
+"""Benchmark do perfil enxuto do navegador (LEAN_BROWSER_MODE).
+
+Abre o mesmo perfil com o Chrome padrão e com o perfil enxuto, rola o feed
+algumas vezes e compara a memória do navegador (PSS/RSS de todos os processos
+do Chrome) e os bytes transferidos pela rede. Também conta os links de post
+encontrados, para confirmar que a descoberta do feed continua funcionando.
+
+Uso (a partir da raiz do projeto; a medição de memória requer Linux):
+    python benchmarks/bench_browser_profile.py [--url https://www.instagram.com/instagram/] [--scrolls 10] [--login]
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import instagram_scraper
+from instagram_scraper import InstagramScraper, FEED_COUNT_SELECTORS
+
+
+def child_pids(pid):
+    """PIDs de todos os descendentes de um processo (Linux)"""
+    pids = []
+    stack = [pid]
+    while stack:
+        current = stack.pop()
+        try:
+            for task in os.listdir(f"/proc/{current}/task"):
+                with open(f"/proc/{current}/task/{task}/children") as f:
+                    children = [int(c) for c in f.read().split()]
+                pids.extend(children)
+                stack.extend(children)
+        except OSError:
+            continue
+    return pids
+
+
+def memory_mb(pids):
+    """Soma de PSS (ou RSS, se smaps_rollup não existir) dos processos, em MB"""
+    total = 0
+    for pid in pids:
+        for path, field in ((f"/proc/{pid}/smaps_rollup", "Pss:"), (f"/proc/{pid}/status", "VmRSS:")):
+            try:
+                with open(path) as f:
+                    value = next((int(line.split()[1]) for line in f if line.startswith(field)), None)
+            except OSError:
+                continue
+            if value is not None:
+                total += value
+                break
+    return total / 1024 if pids else None
+
+
+def transferred_bytes(driver):
+    """Bytes recebidos pela rede desde a última leitura do log de performance"""
+    total = 0
+    for entry in driver.get_log("performance"):
+        try:
+            message = json.loads(entry["message"])["message"]
+        except (KeyError, ValueError):
+            continue
+        if message.get("method") == "Network.loadingFinished":
+            total += message.get("params", {}).get("encodedDataLength", 0)
+    return total
+
+
+def run(lean, args):
+    instagram_scraper.LEAN_BROWSER_MODE = lean
+    # O log de performance (Network.*) só é ligado junto com a captura de rede
+    instagram_scraper.DISCOVERY_MODE = "network"
+
+    scraper = InstagramScraper.__new__(InstagramScraper)
+    scraper.network_capture = None
+    scraper.tabs = 1
+    scraper.setup_driver()
+    driver = scraper.driver
+    try:
+        if args.login:
+            scraper.ensure_logged_in(instagram_scraper.INSTAGRAM_USERNAME, instagram_scraper.INSTAGRAM_PASSWORD)
+        transferred_bytes(driver)
+
+        start = time.perf_counter()
+        driver.get(args.url)
+        time.sleep(instagram_scraper.PAGE_LOAD_DELAY)
+        received = transferred_bytes(driver)
+        peak = 0
+        for _ in range(args.scrolls):
+            driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
+            time.sleep(instagram_scraper.SCROLL_DELAY)
+            received += transferred_bytes(driver)
+            peak = max(peak, memory_mb(child_pids(driver.service.process.pid)) or 0)
+        elapsed = time.perf_counter() - start
+
+        posts = driver.execute_script("return document.querySelectorAll(arguments[0]).length",
+                                      FEED_COUNT_SELECTORS["post_links"])
+        return {"peak_mb": peak or None, "received_mb": received / 1024 / 1024, "posts": posts, "elapsed": elapsed}
+    finally:
+        driver.quit()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="https://www.instagram.com/instagram/", help="perfil usado na medição")
+    parser.add_argument("--scrolls", type=int, default=10, help="scrolls por execução")
+    parser.add_argument("--login", action="store_true", help="faz login com as credenciais do config.py")
+    args = parser.parse_args()
+
+    results = {}
+    for name, lean in (("padrão", False), ("enxuto", True)):
+        print(f"\n🌐 Perfil {name}...")
+        results[name] = run(lean, args)
+
+    print(f"\n{'perfil':<8} {'memória (MB)':>13} {'rede (MB)':>10} {'posts':>6} {'tempo (s)':>10}")
+    for name, result in results.items():
+        memory = f"{result['peak_mb']:.0f}" if result["peak_mb"] else "n/d"
+        print(f"{name:<8} {memory:>13} {result['received_mb']:>10.1f} {result['posts']:>6} {result['elapsed']:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
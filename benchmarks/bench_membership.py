@@ -0,0 +1,111 @@
+"""Benchmark do índice compacto de mídias baixadas (MEMBERSHIP_MODE = "compact").
+
+Compara memória e tempo de consulta do índice de hashes (mmap) com o conjunto
+antigo de URLs completas do CDN.
+
+Uso (a partir da raiz do projeto):
+    python benchmarks/bench_membership.py [--entries 10000000] [--set-sample 1000000]
+"""
+import argparse
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from instagram_scraper import CompactMembership, media_key
+
+
+def fake_url(i):
+    """URL no formato do CDN, com assinatura e parâmetros de tamanho"""
+    return (f"https://scontent-gru2-1.cdninstagram.com/v/t51.2885-15/{i}_{i * 7919 % 10**15}_{i * 104729}_n.jpg"
+            f"?stp=dst-jpg_e35_p640x640_sh0.08&_nc_ht=scontent-gru2-1.cdninstagram.com&_nc_cat=104"
+            f"&_nc_ohc=AbCdEfGh{i % 997}&edm=AOQ1c0wBAAAA&oh=00_AfB{i:016x}&oe=6612A3F1")
+
+
+def rss_mb():
+    """Memória residente do processo em MB (Linux); None em outros sistemas"""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        return None
+
+
+def time_lookups(container, keys):
+    start = time.perf_counter()
+    hits = sum(1 for key in keys if key in container)
+    elapsed = time.perf_counter() - start
+    return hits, elapsed / len(keys) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--entries", type=int, default=10_000_000, help="número de mídias no histórico")
+    parser.add_argument("--set-sample", type=int, default=1_000_000,
+                        help="tamanho do conjunto de URLs usado para estimar o modo antigo")
+    parser.add_argument("--lookups", type=int, default=200_000, help="consultas por medição")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="bench_membership_")
+    try:
+        history = os.path.join(workdir, "downloaded_urls.txt")
+        index = os.path.join(workdir, "downloads.idx")
+
+        print(f"📝 Gerando histórico com {args.entries} mídias...")
+        with open(history, "w", encoding="utf-8") as f:
+            for i in range(args.entries):
+                f.write(media_key(fake_url(i)) + "\n")
+
+        start = time.perf_counter()
+        CompactMembership(index, text_file=history).close()
+        print(f"🏗️  Construção do índice: {time.perf_counter() - start:.1f}s "
+              f"({os.path.getsize(index) / 1024 / 1024:.1f} MB em disco)")
+
+        rss_before = rss_mb()
+        tracemalloc.start()
+        start = time.perf_counter()
+        compact = CompactMembership(index, text_file=history)
+        startup = time.perf_counter() - start
+        heap = tracemalloc.get_traced_memory()[0] / 1024 / 1024
+        tracemalloc.stop()
+
+        present = [media_key(fake_url(random.randrange(args.entries))) for _ in range(args.lookups)]
+        absent = [media_key(fake_url(args.entries + i)) for i in range(args.lookups)]
+        hits, hit_us = time_lookups(compact, present)
+        false_hits, miss_us = time_lookups(compact, absent)
+        rss_after = rss_mb()
+
+        print(f"\n🗜️  Índice compacto ({args.entries} mídias)")
+        print(f"   Inicialização (mmap): {startup * 1000:.1f} ms")
+        print(f"   Heap Python após abrir: {heap:.2f} MB")
+        if rss_before is not None:
+            print(f"   RSS após {2 * args.lookups} consultas: +{rss_after - rss_before:.1f} MB")
+        print(f"   Consulta (presente): {hit_us:.2f} µs  ({hits}/{len(present)} encontrados)")
+        print(f"   Consulta (ausente):  {miss_us:.2f} µs  ({false_hits} falsos positivos)")
+        compact.close()
+
+        sample = min(args.set_sample, args.entries)
+        tracemalloc.start()
+        urls = set(fake_url(i) for i in range(sample))
+        set_heap = tracemalloc.get_traced_memory()[0] / 1024 / 1024
+        tracemalloc.stop()
+        probe = [fake_url(random.randrange(sample)) for _ in range(args.lookups)]
+        _, set_us = time_lookups(urls, probe)
+        estimated = set_heap * args.entries / sample
+
+        print(f"\n🐘 Conjunto de URLs (modo antigo, amostra de {sample})")
+        print(f"   Heap Python: {set_heap:.1f} MB  (estimado para {args.entries}: {estimated:.0f} MB)")
+        print(f"   Consulta: {set_us:.2f} µs")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""Benchmark do modo multiabas (TABS_PER_BROWSER / --tabs).
+
+Abre os mesmos perfis de duas formas - um Chrome por perfil e um único Chrome
+com uma janela por perfil - rola cada feed algumas vezes e compara a memória
+total (PSS de todos os processos do Chrome) e a memória por perfil.
+
+Uso (a partir da raiz do projeto; a medição de memória requer Linux):
+    python benchmarks/bench_tabs.py perfil1 perfil2 perfil3 [--scrolls 5] [--login]
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import instagram_scraper
+from instagram_scraper import InstagramScraper
+from bench_browser_profile import child_pids, memory_mb
+
+
+def start_browser(tabs, login):
+    scraper = InstagramScraper.__new__(InstagramScraper)
+    scraper.network_capture = None
+    scraper.tabs = tabs
+    scraper.setup_driver()
+    if login:
+        scraper.ensure_logged_in(instagram_scraper.INSTAGRAM_USERNAME, instagram_scraper.INSTAGRAM_PASSWORD)
+    return scraper.driver
+
+
+def scroll_all(driver, handles, scrolls):
+    for _ in range(scrolls):
+        for handle in handles:
+            driver.switch_to.window(handle)
+            driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
+        time.sleep(instagram_scraper.SCROLL_DELAY)
+
+
+def browser_memory(driver):
+    return memory_mb(child_pids(driver.service.process.pid)) or 0
+
+
+def profile_url(name):
+    return name if "instagram.com" in name else f"https://www.instagram.com/{name.strip('@/')}/"
+
+
+def run_processes(urls, args):
+    """Um Chrome por perfil (como no modo em lote sem abas)"""
+    drivers = []
+    try:
+        for url in urls:
+            driver = start_browser(1, args.login)
+            driver.get(url)
+            drivers.append(driver)
+        for driver in drivers:
+            scroll_all(driver, [driver.current_window_handle], args.scrolls)
+        return sum(browser_memory(driver) for driver in drivers)
+    finally:
+        for driver in drivers:
+            driver.quit()
+
+
+def run_tabs(urls, args):
+    """Um único Chrome com uma janela por perfil"""
+    driver = start_browser(len(urls), args.login)
+    try:
+        handles = []
+        for i, url in enumerate(urls):
+            if i:
+                driver.switch_to.new_window("window")
+            driver.get(url)
+            handles.append(driver.current_window_handle)
+        scroll_all(driver, handles, args.scrolls)
+        return browser_memory(driver)
+    finally:
+        driver.quit()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("profiles", nargs="+", help="URLs ou nomes de usuário dos perfis")
+    parser.add_argument("--scrolls", type=int, default=5, help="scrolls por perfil")
+    parser.add_argument("--login", action="store_true", help="faz login com as credenciais do config.py")
+    args = parser.parse_args()
+
+    urls = [profile_url(name) for name in args.profiles]
+    results = {}
+    print(f"\n🌐 {len(urls)} navegadores, um perfil em cada...")
+    results["processos"] = run_processes(urls, args)
+    print(f"\n🗂️  Um navegador com {len(urls)} abas...")
+    results["abas"] = run_tabs(urls, args)
+
+    print(f"\n{'modo':<10} {'total (MB)':>11} {'por perfil (MB)':>16}")
+    for name, total in results.items():
+        if total:
+            print(f"{name:<10} {total:>11.0f} {total / len(urls):>16.0f}")
+        else:
+            print(f"{name:<10} {'n/d':>11} {'n/d':>16}")
+
+
+if __name__ == "__main__":
+    main()
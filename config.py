@@ -27,4 +27,171 @@ DOWNLOADED_URLS_FILE = "downloaded_urls.txt"
 # Delays em segundos (ajuste se necessário)
 SCROLL_DELAY = 2.0          # Pausa entre scrolls
 DOWNLOAD_DELAY = 0.2        # Pausa entre downloads
-PAGE_LOAD_DELAY = 3.0       # Pausa para carregamento de páginas
\ No newline at end of file
+PAGE_LOAD_DELAY = 3.0       # Pausa para carregamento de páginas
+
+# ===== CONFIGURAÇÕES AVANÇADAS (OPCIONAIS) =====
+# Se alguma opção abaixo não existir no seu config.py, o script usa o valor padrão
+
+# Modo de extração das imagens do feed:
+# - "script": uma única chamada JavaScript por scroll retorna todos os candidatos (rápido)
+# - "selenium": modo antigo, consulta cada <img> individualmente pelo WebDriver
+EXTRACTION_MODE = "script"
+
+# Downloads paralelos: número de workers compartilhando a mesma sessão HTTP (keep-alive)
+# e limite de conexões simultâneas por host do CDN. Use 1 para baixar uma imagem por vez.
+DOWNLOAD_WORKERS = 4
+MAX_CONNECTIONS_PER_HOST = 4
+
+# Pipeline: o scroll apenas enfileira as imagens encontradas e os workers baixam em
+# segundo plano, sobrepondo rede e carregamento da página. A fila é limitada
+# (PIPELINE_QUEUE_SIZE); quando cheia, o scroll espera os workers liberarem espaço.
+PIPELINE_MODE = True
+PIPELINE_QUEUE_SIZE = 64
+
+# Downloads em blocos: tamanho de cada bloco gravado em disco e tamanho máximo aceito
+# por imagem (em bytes). Respostas que não são imagens (ex: páginas HTML) são rejeitadas.
+DOWNLOAD_CHUNK_SIZE = 64 * 1024
+MAX_IMAGE_BYTES = 50 * 1024 * 1024
+
+# Registro de downloads:
+# - "sqlite": banco SQLite indexado (uma linha por mídia, com perfil, arquivo, tamanho e data).
+#   Na primeira execução importa automaticamente o DOWNLOADED_URLS_FILE antigo.
+# - "text": modo antigo, arquivo texto carregado inteiro na memória
+LEDGER_BACKEND = "sqlite"
+LEDGER_DB_FILE = "downloads.db"
+LEDGER_BATCH_SIZE = 50      # Registros gravados por transação
+LEDGER_JOURNAL_MODE = "WAL" # Use "DELETE" se o LEDGER_DB_FILE ficar num volume de rede (fila distribuída)
+
+# Verificação de duplicatas:
+# - "exact": usa o registro diretamente (conjunto em memória ou consultas ao SQLite)
+# - "compact": índice ordenado de hashes de 64 bits acessado via mmap (8 bytes por mídia,
+#   inicialização instantânea). Com o registro SQLite, positivos são confirmados no banco.
+MEMBERSHIP_MODE = "exact"
+MEMBERSHIP_INDEX_FILE = "downloads.idx"
+
+# Armazenamento das imagens:
+# - "timestamp": nomes com perfil, data/hora e número do scroll (ex: natgeo_20241215_162035_scroll05_img001.jpg)
+# - "content": nome = SHA-256 do conteúdo; imagens idênticas são salvas uma única vez
+STORAGE_MODE = "timestamp"
+
+# Quase-duplicatas (re-encodes, redimensionamentos) por hash perceptual - requer Pillow:
+# - "off": desativado
+# - "flag": apenas avisa
+# - "skip": apaga a cópia nova
+# - "hardlink": substitui a cópia nova por um hard link para a imagem original
+PHASH_MODE = "off"
+PHASH_THRESHOLD = 4         # Distância de Hamming máxima (0-7) para considerar quase-duplicata
+PHASH_INDEX_FILE = "phashes.db"
+PHASH_WORKERS = 2           # Processos que calculam os hashes em segundo plano
+
+# Espera após cada scroll:
+# - "event": retorna assim que novos posts aparecem ou a página cresce, com tempo máximo
+#   adaptado às latências observadas (entre SCROLL_WAIT_MIN e SCROLL_WAIT_MAX segundos)
+# - "fixed": modo antigo, pausas fixas (4s por scroll, 3s por tentativa extra)
+SCROLL_WAIT_MODE = "event"
+SCROLL_WAIT_MIN = 1.0
+SCROLL_WAIT_MAX = 8.0
+SCROLL_SETTLE_MS = 250      # Espera sem novas inserções antes de processar o lote
+
+# Processamento a cada scroll (com EXTRACTION_MODE = "script"):
+# - "delta": um MutationObserver no navegador guarda só as imagens inseridas desde o último
+#   scroll e mantém as contagens de elementos atualizadas, sem varrer a página inteira
+# - "full": reprocessa todas as imagens da página a cada scroll
+FEED_TRACKING_MODE = "delta"
+
+# Descoberta das mídias durante o scroll:
+# - "dom": lê as imagens renderizadas na página (<img>)
+# - "network": lê as respostas JSON do feed capturadas pelo Chrome (CDP), com todos os slides
+#   dos carrosséis, a maior resolução disponível, tipo da mídia e data
+DISCOVERY_MODE = "dom"
+
+# Reaproveita os bytes das imagens que o navegador já carregou (lidos via CDP) em vez de
+# baixá-las de novo; só faz o download por HTTP quando a cópia do navegador é menor que o alvo
+BROWSER_BYTES_MODE = False
+BROWSER_BYTES_MIN_WIDTH = 1080  # Largura mínima (px) para aceitar a cópia do navegador
+
+# Modo de navegação pelo perfil:
+# - "browser": rola o feed no Chrome
+# - "http": o Chrome é usado só para o login; os cookies são exportados e o feed é paginado
+#   por HTTP (mesmos endpoints do web app, com cursor), sem manter o navegador aberto
+# - "hybrid": duas fases - o Chrome rola o feed coletando só os links /p/<shortcode>, depois
+#   cada post é resolvido em paralelo por HTTP (todos os slides dos carrosséis)
+CRAWL_MODE = "browser"
+API_BASE_URL = "https://www.instagram.com"  # Troque por um servidor local para testar com JSON de exemplo
+IG_APP_ID = "936619743392459"   # Cabeçalho X-IG-App-ID enviado pelo web app
+HTTP_PAGE_SIZE = 12             # Posts por página no modo "http"
+HTTP_PAGE_DELAY = 2.0           # Pausa entre páginas no modo "http"
+RESOLVE_WORKERS = 4             # Posts resolvidos em paralelo no modo "hybrid"
+
+# Cache de sessão: após o primeiro login, cookies e localStorage da conta são salvos em
+# SESSION_DIRECTORY/<usuario>.json e reaproveitados nos próximos runs (login completo só
+# quando a sessão expira). Esses arquivos dão acesso à conta - não compartilhe!
+SESSION_CACHE_MODE = True
+SESSION_DIRECTORY = "sessions"
+
+# Espera pelo carregamento das páginas (login, perfil): uma única verificação combinada de
+# popups, indicadores de login e erros, que dispensa os popups assim que aparecem
+PAGE_SETTLE_TIMEOUT = 10.0      # Tempo máximo de espera (segundos)
+PAGE_QUIET_SECONDS = 1.0        # Tempo sem novos popups para considerar a página pronta
+
+# ChromeDriver: baixado uma única vez por versão principal do Chrome (Chrome for Testing)
+# e reutilizado do cache nas próximas execuções. Funciona no Windows, Linux e macOS.
+CHROME_BINARY = None            # Caminho do Chrome/Chromium (None = detectar automaticamente)
+CHROMEDRIVER_PATH = None        # Caminho de um ChromeDriver já instalado (None = resolver automaticamente)
+DRIVER_OFFLINE_MODE = False     # True = nunca acessa a rede; usa só o cache, o PATH ou CHROMEDRIVER_PATH
+# DRIVER_CACHE_DIRECTORY = "~/.cache/instagram-scraper/chromedriver"
+
+# Perfil enxuto do navegador: Chrome headless, sem autoplay, viewport menor, imagens
+# decodificadas em 1x e vídeos/fontes/rastreadores bloqueados via CDP (menos CPU, RAM e banda).
+# Compare com: python benchmarks/bench_browser_profile.py
+LEAN_BROWSER_MODE = False
+LEAN_WINDOW_SIZE = "1024,768"
+BLOCKED_URL_PATTERNS = None     # Lista de padrões (ex: ["*.mp4*"]); None = lista padrão do script
+
+# Memória do navegador limitada em feeds muito longos: posts já processados que ficaram
+# DOM_PRUNE_MARGIN alturas de tela acima da área visível viram placeholders de altura fixa
+# (imagens liberadas), mantendo a altura da página para o carregamento infinito continuar
+DOM_PRUNE_MODE = False
+DOM_PRUNE_MARGIN = 2
+
+# Modo em lote (python instagram_scraper.py --batch perfis.txt): cada worker é um processo
+# com seu próprio Chrome, mantido aberto e logado entre os perfis
+BATCH_WORKERS = 2
+BATCH_RESULTS_FILE = "batch_results.jsonl"  # Uma linha JSON com o resultado de cada perfil
+
+# Modo multiabas (modo em lote com --tabs N): cada Chrome atende vários perfis ao mesmo
+# tempo, um por janela, com um scheduler que alterna entre eles enquanto o conteúdo carrega.
+# Usa bem menos memória por perfil que um Chrome por perfil - veja benchmarks/bench_tabs.py
+TABS_PER_BROWSER = 1
+
+# Fila distribuída (várias máquinas): o coordenador enfileira os perfis com
+#   python instagram_scraper.py --queue-add perfis.txt
+# e cada máquina roda "python instagram_scraper.py --queue-worker --workers N".
+# Para compartilhar o trabalho, JOB_QUEUE_FILE e LEDGER_DB_FILE devem apontar para o mesmo
+# volume compartilhado (com LEDGER_JOURNAL_MODE = "DELETE"). Cada perfil fica com um worker por
+# JOB_LEASE_SECONDS, renovado enquanto ele trabalha; se o worker cair, o lease expira e outro
+# worker retoma o perfil. Cada mídia é reservada no registro antes do download (sem duplicatas).
+JOB_QUEUE_BACKEND = "sqlite"    # "sqlite" ou "memory" (só dentro de um processo, para testes; recusada na linha de comando)
+JOB_QUEUE_FILE = "jobs.db"
+JOB_LEASE_SECONDS = 300
+JOB_MAX_ATTEMPTS = 3            # Tentativas por perfil antes de marcá-lo como falho
+JOB_POLL_SECONDS = 30           # Espera quando todos os perfis restantes estão com outros workers
+CLAIM_TTL_SECONDS = 600         # Reserva de download abandonada há mais tempo pode ser retomada
+
+# Checkpoints por perfil: a cada CHECKPOINT_INTERVAL scrolls (ou páginas, no modo "http")
+# o script grava o último post visto, o número do scroll e o cursor de paginação. Se a
+# execução cair, a próxima avança direto até esse ponto (sem extrair nada no caminho) em
+# vez de rolar e processar o feed inteiro de novo. O checkpoint é apagado quando o perfil termina.
+# No modo pipeline o checkpoint só é gravado quando os downloads enfileirados antes dele
+# terminam (o scroll não para para esvaziar a fila).
+# Com a fila distribuída, aponte CHECKPOINT_DIRECTORY para o volume compartilhado.
+CHECKPOINT_MODE = True
+CHECKPOINT_DIRECTORY = "checkpoints"
+CHECKPOINT_INTERVAL = 10
+
+# Modo incremental ("só posts novos"), para atualizar perfis já arquivados: o scroll (ou a
+# paginação HTTP) para depois de INCREMENTAL_STOP_AFTER mídias seguidas que já estão no
+# histórico, em vez de ir até o fim do feed. Posts fixados no topo do perfil são ignorados
+# na contagem.
+INCREMENTAL_MODE = False
+INCREMENTAL_STOP_AFTER = 24
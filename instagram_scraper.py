@@ -14,7 +14,27 @@ import re
 import urllib.parse
 import sys
 import subprocess
+import platform
 import ctypes
+import socket
+import argparse
+import multiprocessing
+import threading
+import queue
+import tempfile
+import sqlite3
+import mmap
+import struct
+import hashlib
+import heapq
+import bisect
+import base64
+import shutil
+import zipfile
+from collections import deque, OrderedDict
+from array import array
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from requests.adapters import HTTPAdapter
 
 # Importa configurações
 try:
@@ -25,119 +45,1769 @@ except ImportError:
     print("📋 Veja o README.md para instruções detalhadas")
     sys.exit(1)
 
+# Configurações avançadas (opcionais - usam o valor padrão se ausentes do config.py)
+import config as _config
+EXTRACTION_MODE = getattr(_config, "EXTRACTION_MODE", "script")
+DOWNLOAD_WORKERS = getattr(_config, "DOWNLOAD_WORKERS", 4)
+MAX_CONNECTIONS_PER_HOST = getattr(_config, "MAX_CONNECTIONS_PER_HOST", 4)
+PIPELINE_MODE = getattr(_config, "PIPELINE_MODE", True)
+PIPELINE_QUEUE_SIZE = getattr(_config, "PIPELINE_QUEUE_SIZE", 64)
+DOWNLOAD_CHUNK_SIZE = getattr(_config, "DOWNLOAD_CHUNK_SIZE", 64 * 1024)
+MAX_IMAGE_BYTES = getattr(_config, "MAX_IMAGE_BYTES", 50 * 1024 * 1024)
+LEDGER_BACKEND = getattr(_config, "LEDGER_BACKEND", "sqlite")
+LEDGER_DB_FILE = getattr(_config, "LEDGER_DB_FILE", "downloads.db")
+LEDGER_BATCH_SIZE = getattr(_config, "LEDGER_BATCH_SIZE", 50)
+LEDGER_JOURNAL_MODE = getattr(_config, "LEDGER_JOURNAL_MODE", "WAL")
+MEMBERSHIP_MODE = getattr(_config, "MEMBERSHIP_MODE", "exact")
+MEMBERSHIP_INDEX_FILE = getattr(_config, "MEMBERSHIP_INDEX_FILE", "downloads.idx")
+STORAGE_MODE = getattr(_config, "STORAGE_MODE", "timestamp")
+PHASH_MODE = getattr(_config, "PHASH_MODE", "off")
+PHASH_THRESHOLD = getattr(_config, "PHASH_THRESHOLD", 4)
+PHASH_INDEX_FILE = getattr(_config, "PHASH_INDEX_FILE", "phashes.db")
+PHASH_WORKERS = getattr(_config, "PHASH_WORKERS", 2)
+SCROLL_WAIT_MODE = getattr(_config, "SCROLL_WAIT_MODE", "event")
+SCROLL_WAIT_MIN = getattr(_config, "SCROLL_WAIT_MIN", 1.0)
+SCROLL_WAIT_MAX = getattr(_config, "SCROLL_WAIT_MAX", 8.0)
+SCROLL_SETTLE_MS = getattr(_config, "SCROLL_SETTLE_MS", 250)
+FEED_TRACKING_MODE = getattr(_config, "FEED_TRACKING_MODE", "delta")
+DISCOVERY_MODE = getattr(_config, "DISCOVERY_MODE", "dom")
+BROWSER_BYTES_MODE = getattr(_config, "BROWSER_BYTES_MODE", False)
+BROWSER_BYTES_MIN_WIDTH = getattr(_config, "BROWSER_BYTES_MIN_WIDTH", 1080)
+CRAWL_MODE = getattr(_config, "CRAWL_MODE", "browser")
+API_BASE_URL = getattr(_config, "API_BASE_URL", "https://www.instagram.com")
+IG_APP_ID = getattr(_config, "IG_APP_ID", "936619743392459")
+HTTP_PAGE_SIZE = getattr(_config, "HTTP_PAGE_SIZE", 12)
+HTTP_PAGE_DELAY = getattr(_config, "HTTP_PAGE_DELAY", 2.0)
+RESOLVE_WORKERS = getattr(_config, "RESOLVE_WORKERS", 4)
+SESSION_CACHE_MODE = getattr(_config, "SESSION_CACHE_MODE", True)
+SESSION_DIRECTORY = getattr(_config, "SESSION_DIRECTORY", "sessions")
+PAGE_SETTLE_TIMEOUT = getattr(_config, "PAGE_SETTLE_TIMEOUT", 10.0)
+PAGE_QUIET_SECONDS = getattr(_config, "PAGE_QUIET_SECONDS", 1.0)
+CHROME_BINARY = getattr(_config, "CHROME_BINARY", None)
+CHROMEDRIVER_PATH = getattr(_config, "CHROMEDRIVER_PATH", None)
+DRIVER_CACHE_DIRECTORY = os.path.expanduser(getattr(_config, "DRIVER_CACHE_DIRECTORY",
+                                                    os.path.join("~", ".cache", "instagram-scraper", "chromedriver")))
+DRIVER_OFFLINE_MODE = getattr(_config, "DRIVER_OFFLINE_MODE", False)
+LEAN_BROWSER_MODE = getattr(_config, "LEAN_BROWSER_MODE", False)
+LEAN_WINDOW_SIZE = getattr(_config, "LEAN_WINDOW_SIZE", "1024,768")
+BLOCKED_URL_PATTERNS = getattr(_config, "BLOCKED_URL_PATTERNS", None)
+DOM_PRUNE_MODE = getattr(_config, "DOM_PRUNE_MODE", False)
+DOM_PRUNE_MARGIN = getattr(_config, "DOM_PRUNE_MARGIN", 2)
+BATCH_WORKERS = getattr(_config, "BATCH_WORKERS", 2)
+TABS_PER_BROWSER = getattr(_config, "TABS_PER_BROWSER", 1)
+JOB_QUEUE_BACKEND = getattr(_config, "JOB_QUEUE_BACKEND", "sqlite")
+JOB_QUEUE_FILE = getattr(_config, "JOB_QUEUE_FILE", "jobs.db")
+JOB_LEASE_SECONDS = getattr(_config, "JOB_LEASE_SECONDS", 300)
+JOB_MAX_ATTEMPTS = getattr(_config, "JOB_MAX_ATTEMPTS", 3)
+JOB_POLL_SECONDS = getattr(_config, "JOB_POLL_SECONDS", 30)
+CLAIM_TTL_SECONDS = getattr(_config, "CLAIM_TTL_SECONDS", 600)
+CHECKPOINT_MODE = getattr(_config, "CHECKPOINT_MODE", True)
+CHECKPOINT_DIRECTORY = getattr(_config, "CHECKPOINT_DIRECTORY", "checkpoints")
+CHECKPOINT_INTERVAL = getattr(_config, "CHECKPOINT_INTERVAL", 10)
+INCREMENTAL_MODE = getattr(_config, "INCREMENTAL_MODE", False)
+INCREMENTAL_STOP_AFTER = getattr(_config, "INCREMENTAL_STOP_AFTER", 24)
+BATCH_RESULTS_FILE = getattr(_config, "BATCH_RESULTS_FILE", "batch_results.jsonl")
+
+# Requisições bloqueadas no perfil enxuto (LEAN_BROWSER_MODE): vídeos e áudio, fontes e
+# scripts de rastreamento/telemetria. Imagens e CSS continuam liberados (o feed depende deles).
+LEAN_BLOCKED_URLS = [
+    "*.mp4*", "*.m4a*", "*.m4v*", "*.webm*",
+    "*.woff*", "*.ttf*", "*.otf*",
+    "*connect.facebook.net*", "*facebook.com/tr*", "*doubleclick.net*",
+    "*google-analytics.com*", "*googletagmanager.com*",
+    "*/logging_client_events*", "*/ajax/bz*"
+]
+
+USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
+
+# Seletores para imagens no feed
+FEED_IMAGE_SELECTORS = [
+    "article img",
+    "div._aagw img",
+    "img[style*='object-fit']",
+    "div._aagu img",
+    "div._aagv img"
+]
+
+# Classificador de mídia executado no navegador. Mantém as mesmas heurísticas
+# do modo antigo (indicadores no HTML do pai/avô, SVG de play, span de duração
+# e links /reel/ ou /tv/), mas sem nenhuma chamada extra ao WebDriver.
+MEDIA_CLASSIFIER_JS = """
+function classifyMedia(img) {
+    const parent = img.parentElement;
+    const grandparent = parent ? parent.parentElement : null;
+    if (!grandparent) return {verdict: 'photo', reason: ''};
+
+    // O HTML do avô já contém o do pai
+    const html = grandparent.outerHTML.toLowerCase();
+    const indicators = ['reel', 'video', 'play', 'duration', 'clip',
+                        'svg', 'play-button', 'video-player', 'media-video'];
+    for (const indicator of indicators) {
+        if (html.includes(indicator)) {
+            const verdict = (indicator === 'reel' || indicator === 'clip') ? 'reel' : 'video';
+            return {verdict: verdict, reason: 'html:' + indicator};
+        }
+    }
+
+    if (grandparent.querySelector('svg')) return {verdict: 'video', reason: 'svg'};
+
+    for (const span of grandparent.querySelectorAll('span')) {
+        const text = (span.innerText || '').trim();
+        if (/^\\d+:\\d+/.test(text)) return {verdict: 'video', reason: 'duration:' + text};
+    }
+
+    // Só links dentro do avô, como no modo antigo: o link do post que envolve a
+    // imagem contém o nome do perfil (ex: /freelancer.photos/p/...)
+    for (const link of grandparent.querySelectorAll('a')) {
+        const href = (link.href || '').toLowerCase();
+        for (const pattern of ['/reel/', '/reels/', '/tv/', 'reel']) {
+            if (href.includes(pattern)) {
+                return {verdict: pattern === '/tv/' ? 'video' : 'reel', reason: 'link:' + href};
+            }
+        }
+    }
+
+    return {verdict: 'photo', reason: ''};
+}
+"""
+
+# Seletores usados para contar os elementos do feed a cada scroll
+FEED_COUNT_SELECTORS = {
+    "articles": "article",
+    "post_links": "a[href*='/p/']",
+    "images": "article img",
+    "grid_items": "div._aagw",
+    "media_containers": "div._aagu"
+}
+
+# Monta a lista de candidatos (sem duplicatas por src, na ordem recebida) com
+# src, srcset, alt, link do post mais próximo, o veredito do classificador e se o
+# post está fixado no topo do perfil (ícone de alfinete no link do post).
+# Com trackProcessed (DOM_PRUNE_MODE) as imagens devolvidas entram na fila que
+# PRUNE_FEED_JS consome; sem poda nada é guardado, para não reter nós removidos.
+CANDIDATE_BUILDER_JS = MEDIA_CLASSIFIER_JS + """
+const PINNED_ICON_SELECTOR = "svg[aria-label*='pinned' i], svg[aria-label*='fixad' i]";
+function buildCandidates(images, trackProcessed) {
+    const seen = new Set();
+    const candidates = [];
+    const processed = trackProcessed ? (window.__igProcessedImages || (window.__igProcessedImages = [])) : null;
+    for (const img of images) {
+        const src = img.src || '';
+        if (!src || seen.has(src) || img.dataset.igPruned) continue;
+        seen.add(src);
+        if (processed && !img.dataset.igSeen) {
+            img.dataset.igSeen = '1';
+            processed.push(img);
+        }
+        const parent = img.parentElement;
+        const grandparent = parent ? parent.parentElement : null;
+        const scope = grandparent || parent || img;
+        let link = img.closest('a[href]');
+        if (!link) link = scope.querySelector('a[href]');
+        const classification = classifyMedia(img);
+        candidates.push({
+            src: src,
+            srcset: img.getAttribute('srcset') || '',
+            alt: img.getAttribute('alt') || '',
+            href: link ? link.href : '',
+            verdict: classification.verdict,
+            reason: classification.reason,
+            pinned: !!(link && link.querySelector(PINNED_ICON_SELECTOR))
+        });
+    }
+    return candidates;
+}
+"""
+
+# Extrai todos os candidatos do feed em uma única chamada ao navegador.
+# Argumentos: seletor das imagens e se elas entram na fila da poda (DOM_PRUNE_MODE).
+FEED_CANDIDATES_JS = CANDIDATE_BUILDER_JS + """
+return buildCandidates(document.querySelectorAll(arguments[0]), arguments[1]);
+"""
+
+# Instala no navegador um rastreador do feed (MutationObserver) que guarda as
+# imagens inseridas (ou com src alterado) desde a última leitura e mantém as
+# contagens de FEED_COUNT_SELECTORS atualizadas por inserção/remoção, sem
+# varrer o documento inteiro a cada scroll.
+FEED_TRACKER_JS = """
+const imageSelector = arguments[0];
+const countSelectors = arguments[1];
+if (window.__igFeedTracker) window.__igFeedTracker.observer.disconnect();
+
+const tracker = {pending: new Set(), counts: {}, observer: null};
+for (const name of Object.keys(countSelectors)) {
+    tracker.counts[name] = document.querySelectorAll(countSelectors[name]).length;
+}
+for (const img of document.querySelectorAll(imageSelector)) tracker.pending.add(img);
+
+function countIn(node, selector) {
+    return (node.matches(selector) ? 1 : 0) + node.querySelectorAll(selector).length;
+}
+function track(node, delta) {
+    if (node.nodeType !== 1) return;
+    for (const name of Object.keys(countSelectors)) {
+        tracker.counts[name] = Math.max(0, tracker.counts[name] + delta * countIn(node, countSelectors[name]));
+    }
+    if (delta > 0) {
+        if (node.matches(imageSelector)) tracker.pending.add(node);
+        for (const img of node.querySelectorAll(imageSelector)) tracker.pending.add(img);
+    }
+}
+
+tracker.observer = new MutationObserver((mutations) => {
+    for (const mutation of mutations) {
+        if (mutation.type === 'attributes') {
+            // Imagens com carregamento tardio recebem o src depois de inseridas
+            if (mutation.target.matches(imageSelector) && !mutation.target.dataset.igPruned) tracker.pending.add(mutation.target);
+            continue;
+        }
+        for (const node of mutation.removedNodes) track(node, -1);
+        for (const node of mutation.addedNodes) track(node, 1);
+    }
+});
+tracker.observer.observe(document.body, {
+    childList: true, subtree: true, attributes: true, attributeFilter: ['src', 'srcset']
+});
+window.__igFeedTracker = tracker;
+return true;
+"""
+
+# Lê e esvazia o buffer do rastreador: só as imagens novas desde a última leitura.
+# Retorna null se o rastreador não existe (ex: a página foi recarregada).
+# Argumento: se as imagens entram na fila da poda (DOM_PRUNE_MODE).
+FEED_DELTA_JS = CANDIDATE_BUILDER_JS + """
+const tracker = window.__igFeedTracker;
+if (!tracker) return null;
+const images = Array.from(tracker.pending).filter((img) => img.isConnected);
+tracker.pending.clear();
+return buildCandidates(images, arguments[0]);
+"""
+
+# Substitui os posts já processados que ficaram bem acima da área visível por
+# placeholders de altura fixa: o tamanho da caixa é congelado, o conteúdo deixa de
+# ser renderizado (content-visibility) e as imagens trocam o src por um GIF de 1px,
+# liberando os bitmaps decodificados. A altura da página não muda, então o
+# carregador infinito no fim do feed continua disparando normalmente.
+# Argumentos: seletor das imagens, margem (em alturas de tela), e se só imagens já
+# entregues ao Python (buildCandidates) podem ser podadas. Retorna quantas foram.
+PRUNE_FEED_JS = """
+const imageSelector = arguments[0];
+const margin = arguments[1] * window.innerHeight;
+const requireSeen = arguments[2];
+const blank = 'data:image/gif;base64,R0lGODlhAQABAAAAACH5BAEKAAEALAAAAAABAAEAAAICTAEAOw==';
+const queue = requireSeen
+    ? (window.__igProcessedImages || [])
+    : Array.from(document.querySelectorAll(imageSelector)).filter((img) => !img.dataset.igPruned);
+const keep = [];
+let pruned = 0;
+for (const img of queue) {
+    if (!img.isConnected) continue;
+    if (img.getBoundingClientRect().bottom > -margin) {
+        keep.push(img);
+        continue;
+    }
+    const post = img.closest('a[href]') || img.parentElement || img;
+    if (!post.dataset.igPlaceholder) {
+        const box = post.getBoundingClientRect();
+        post.style.height = box.height + 'px';
+        post.style.minHeight = box.height + 'px';
+        post.style.contentVisibility = 'hidden';
+        post.dataset.igPlaceholder = '1';
+        for (const video of post.querySelectorAll('video')) {
+            video.removeAttribute('src');
+            video.load();
+        }
+    }
+    img.dataset.igPruned = '1';
+    img.removeAttribute('srcset');
+    img.src = blank;
+    pruned++;
+}
+if (requireSeen) window.__igProcessedImages = keep;
+return pruned;
+"""
+
+# Textos dos botões que dispensam popups (notificações, salvar login, etc.)
+DISMISS_TEXTS = [
+    "Not Now", "Agora não", "Maybe Later", "Talvez depois",
+    "Not now", "agora não", "Cancel", "Cancelar"
+]
+
+# Estado da página em uma única consulta: botão de popup visível, indicadores de
+# login, mensagem de erro do login, formulário de login e conteúdo do perfil
+PAGE_STATE_JS = """
+const texts = arguments[0].map(t => t.toLowerCase());
+const state = {dismiss: null, dismissText: null, loggedIn: false, loginError: null, loginForm: false, content: false};
+for (const button of document.querySelectorAll('button, [role="button"]')) {
+    const text = (button.innerText || button.textContent || '').trim();
+    if (text && texts.includes(text.toLowerCase()) && button.offsetParent !== null) {
+        state.dismiss = button;
+        state.dismissText = text;
+        break;
+    }
+}
+state.loggedIn = !!document.querySelector(
+    "a[href='/direct/inbox/'], svg[aria-label='Home'], svg[aria-label='New post'], [data-testid='app-header']"
+);
+const error = document.querySelector('#slfErrorAlert, form [role="alert"]');
+state.loginError = error ? (error.innerText || '').trim() || 'erro de login' : null;
+state.loginForm = !!document.querySelector("input[name='username']");
+state.content = !!document.querySelector("article, main, [role='main']");
+return state;
+"""
+
+# Rola a página e espera (no próprio navegador) até o feed crescer: retorna assim
+# que novos posts são inseridos ou o scrollHeight aumenta, após um curto período
+# sem novas inserções (para o lote terminar de entrar), ou quando o tempo acaba.
+SCROLL_AND_WAIT_JS = """
+const previousHeight = arguments[0];
+const timeoutMs = arguments[1];
+const scrollMode = arguments[2];
+const settleMs = arguments[3];
+const done = arguments[arguments.length - 1];
+const start = performance.now();
+const feedSelector = "a[href*='/p/'], a[href*='/reel/'], article img, img[style*='object-fit']";
+let finished = false;
+let firstTrigger = null;
+let settleTimer = null;
+
+function grew() {
+    return document.body.scrollHeight > previousHeight;
+}
+function finish(ready) {
+    if (finished) return;
+    finished = true;
+    observer.disconnect();
+    clearTimeout(settleTimer);
+    clearTimeout(timeoutTimer);
+    clearInterval(pollTimer);
+    done({ready: ready, height: document.body.scrollHeight, elapsed: (performance.now() - start) / 1000});
+}
+function trigger() {
+    const now = performance.now();
+    if (firstTrigger === null) firstTrigger = now;
+    clearTimeout(settleTimer);
+    // Não prolonga a espera indefinidamente se a página não para de mudar
+    if (now - firstTrigger > settleMs * 4) { finish(true); return; }
+    settleTimer = setTimeout(() => finish(true), settleMs);
+}
+function isFeedNode(node) {
+    return node.nodeType === 1 && (node.matches(feedSelector) || node.querySelector(feedSelector));
+}
+
+const observer = new MutationObserver((mutations) => {
+    if (firstTrigger !== null || grew()) { trigger(); return; }
+    for (const mutation of mutations) {
+        for (const node of mutation.addedNodes) {
+            if (isFeedNode(node)) { trigger(); return; }
+        }
+    }
+});
+observer.observe(document.body, {childList: true, subtree: true});
+const timeoutTimer = setTimeout(() => finish(grew()), timeoutMs);
+const pollTimer = setInterval(() => { if (firstTrigger === null && grew()) trigger(); }, 100);
+
+if (scrollMode === 'by') {
+    window.scrollBy(0, 1000);
+} else {
+    window.scrollTo(0, document.body.scrollHeight);
+}
+if (grew()) trigger();
+"""
+
+# Shortcodes dos links de post (/p/<shortcode>/) presentes na página, na ordem do documento
+HARVEST_SHORTCODES_JS = """
+const codes = [];
+for (const link of document.querySelectorAll(arguments[0])) {
+    const match = (link.getAttribute('href') || '').match(/\\/p\\/([A-Za-z0-9_-]+)/);
+    if (match) codes.push(match[1]);
+}
+return codes;
+"""
+
+# Classifica um único elemento <img> (modo "selenium") em uma só chamada
+CLASSIFY_ELEMENT_JS = MEDIA_CLASSIFIER_JS + """
+return classifyMedia(arguments[0]);
+"""
+
+def media_key(url):
+    """Deriva uma chave estável para a mídia a partir da URL do CDN.
+
+    As URLs do Instagram trazem assinatura e tamanho na query string (que mudam
+    a cada sessão), mas o nome do arquivo no caminho identifica a mídia:
+    https://scontent.cdninstagram.com/v/t51.2885-15/123_456_789_n.jpg?stp=...&oh=...
+    vira "ig:123_456_789_n". Chaves já canônicas são retornadas sem alteração.
+    """
+    url = (url or "").strip()
+    if not url or url.startswith("ig:"):
+        return url
+    
+    path = urllib.parse.urlparse(url).path
+    filename = path.rstrip('/').rsplit('/', 1)[-1]
+    stem = filename.rsplit('.', 1)[0] if '.' in filename else filename
+    if stem:
+        return f"ig:{stem}"
+    
+    # URL sem nome de arquivo reconhecível: usa o caminho sem a query string
+    return f"url:{path or url}"
+
+def image_url_width(url):
+    """Largura indicada pelo CDN na URL (ex: "p640x640" ou "s1080x1080" no parâmetro stp).
+
+    Retorna None quando a URL não traz tamanho, ou seja, é a imagem original.
+    """
+    match = re.search(r'(?:^|[/_=])[ps](\d{2,5})x(\d{2,5})(?=[_/&.]|$)', urllib.parse.unquote(url or ""))
+    return int(match.group(1)) if match else None
+
+def browser_copy_is_enough(browser_url, target_url):
+    """Decide se a cópia já carregada pelo navegador serve no lugar de um novo download"""
+    browser_width = image_url_width(browser_url)
+    if browser_width is None:
+        return True
+    target_width = image_url_width(target_url)
+    if target_width is not None and browser_width >= target_width:
+        return True
+    return browser_width >= BROWSER_BYTES_MIN_WIDTH
+
+SHORTCODE_ALPHABET = "ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789-_"
+
+def shortcode_to_media_id(shortcode):
+    """Converte o shortcode de um post (/p/<shortcode>/) no id numérico da mídia.
+
+    O shortcode é o id em base 64; posts privados trazem um sufixo extra após
+    os 11 primeiros caracteres, que não faz parte do id.
+    """
+    media_id = 0
+    for char in shortcode[:11]:
+        media_id = media_id * 64 + SHORTCODE_ALPHABET.index(char)
+    return str(media_id)
+
+def profile_name(profile_url):
+    """Extrai o nome de usuário de uma URL de perfil (https://www.instagram.com/usuario/ -> usuario)"""
+    path = urllib.parse.urlparse(profile_url.strip()).path
+    parts = [part for part in path.split('/') if part]
+    return parts[0].lower() if parts else profile_url.strip().lower()
+
+def reserve_unique_path(filepath):
+    """Cria o arquivo de destino vazio sem sobrescrever nenhum existente.
+
+    A criação exclusiva (O_EXCL) é atômica também entre processos: se o nome já
+    existe, tenta nome_2.jpg, nome_3.jpg... Retorna o caminho reservado.
+    """
+    root, extension = os.path.splitext(filepath)
+    attempt = 1
+    while True:
+        candidate = filepath if attempt == 1 else f"{root}_{attempt}{extension}"
+        try:
+            os.close(os.open(candidate, os.O_CREAT | os.O_EXCL | os.O_WRONLY, 0o644))
+            return candidate
+        except FileExistsError:
+            attempt += 1
+
+class DownloadLedger:
+    """Registro de downloads em SQLite (modo WAL), com uma linha por mídia.
+
+    Consultas de existência vão direto ao índice da chave da mídia, sem carregar
+    o histórico em memória. As inserções ficam num buffer e são gravadas em
+    transações de até batch_size linhas (ou ao chamar flush()).
+    """
+
+    def __init__(self, db_path, legacy_file=None, batch_size=50, journal_mode="WAL"):
+        self.db_path = db_path
+        self.batch_size = max(batch_size, 1)
+        self.lock = threading.RLock()
+        self.buffer = {}
+        self.conn = sqlite3.connect(db_path, timeout=30, check_same_thread=False)
+        # WAL não funciona em volumes de rede: registros compartilhados usam "DELETE"
+        self.conn.execute(f"PRAGMA journal_mode={journal_mode}")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS downloads (
+                media_key TEXT PRIMARY KEY,
+                profile TEXT,
+                url TEXT,
+                file_path TEXT,
+                bytes INTEGER,
+                downloaded_at TEXT
+            );
+            CREATE INDEX IF NOT EXISTS idx_downloads_profile ON downloads(profile);
+            CREATE TABLE IF NOT EXISTS meta (
+                name TEXT PRIMARY KEY,
+                value TEXT
+            );
+            CREATE TABLE IF NOT EXISTS claims (
+                media_key TEXT PRIMARY KEY,
+                owner TEXT,
+                claimed_at REAL
+            );
+        """)
+        self.conn.commit()
+        if legacy_file:
+            self.import_legacy_file(legacy_file)
+
+    def import_legacy_file(self, legacy_file):
+        """Importa (uma única vez) o antigo downloaded_urls.txt para o banco"""
+        with self.lock:
+            imported = self.conn.execute("SELECT value FROM meta WHERE name = 'legacy_imported'").fetchone()
+            if imported or not os.path.exists(legacy_file):
+                return 0
+            
+            with open(legacy_file, 'r', encoding='utf-8') as f:
+                keys = set(media_key(line) for line in f if line.strip())
+            with self.conn:
+                self.conn.executemany(
+                    "INSERT OR IGNORE INTO downloads (media_key) VALUES (?)",
+                    ((key,) for key in keys)
+                )
+                self.conn.execute(
+                    "INSERT OR REPLACE INTO meta (name, value) VALUES ('legacy_imported', ?)",
+                    (datetime.now().isoformat(),)
+                )
+            print(f"📥 Histórico antigo importado para o banco: {len(keys)} mídias de {legacy_file}")
+            return len(keys)
+
+    def __contains__(self, key):
+        key = media_key(key)
+        with self.lock:
+            if key in self.buffer:
+                return True
+            row = self.conn.execute("SELECT 1 FROM downloads WHERE media_key = ? LIMIT 1", (key,)).fetchone()
+            return row is not None
+
+    def add(self, key, profile=None, url=None, file_path=None, size=None):
+        """Registra uma mídia baixada (gravada no banco no próximo lote)"""
+        key = media_key(key)
+        with self.lock:
+            self.buffer[key] = (key, profile, url, file_path, size, datetime.now().isoformat())
+            if len(self.buffer) >= self.batch_size:
+                self.flush()
+
+    def flush(self):
+        """Grava o buffer de inserções em uma única transação"""
+        with self.lock:
+            if not self.buffer:
+                return
+            rows = list(self.buffer.values())
+            with self.conn:
+                self.conn.executemany(
+                    "INSERT OR IGNORE INTO downloads (media_key, profile, url, file_path, bytes, downloaded_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    rows
+                )
+                # Mídias registradas não precisam mais da reserva
+                self.conn.executemany("DELETE FROM claims WHERE media_key = ?", [(row[0],) for row in rows])
+            self.buffer.clear()
+
+    def claim(self, key, owner, ttl):
+        """Reserva a mídia para um worker antes do download (registro compartilhado entre máquinas).
+
+        Retorna False se ela já foi baixada ou está reservada por outro worker;
+        reservas mais antigas que ttl segundos (worker que caiu) podem ser tomadas.
+        """
+        key = media_key(key)
+        now = time.time()
+        with self.lock:
+            if key in self.buffer:
+                return False
+            with self.conn:
+                if self.conn.execute("SELECT 1 FROM downloads WHERE media_key = ? LIMIT 1", (key,)).fetchone():
+                    return False
+                cursor = self.conn.execute(
+                    "INSERT OR IGNORE INTO claims (media_key, owner, claimed_at) VALUES (?, ?, ?)", (key, owner, now)
+                )
+                if cursor.rowcount == 1:
+                    return True
+                cursor = self.conn.execute(
+                    "UPDATE claims SET owner = ?, claimed_at = ? WHERE media_key = ? AND (owner = ? OR claimed_at < ?)",
+                    (owner, now, key, owner, now - ttl)
+                )
+                return cursor.rowcount == 1
+
+    def release(self, key, owner):
+        """Libera a reserva de um download que falhou"""
+        with self.lock, self.conn:
+            self.conn.execute("DELETE FROM claims WHERE media_key = ? AND owner = ?", (media_key(key), owner))
+
+    def approximate_count(self):
+        """Número aproximado de mídias em O(1) (maior rowid em vez de COUNT(*))"""
+        with self.lock:
+            row = self.conn.execute("SELECT MAX(rowid) FROM downloads").fetchone()
+            return (row[0] or 0) + len(self.buffer)
+
+    def count_profile(self, profile):
+        """Número de mídias registradas para um perfil"""
+        self.flush()
+        with self.lock:
+            return self.conn.execute("SELECT COUNT(*) FROM downloads WHERE profile = ?", (profile,)).fetchone()[0]
+
+    def __len__(self):
+        self.flush()
+        with self.lock:
+            return self.conn.execute("SELECT COUNT(*) FROM downloads").fetchone()[0]
+
+    def iter_keys_since(self, rowid):
+        """Itera (rowid, chave) das mídias registradas depois de um rowid, em ordem"""
+        self.flush()
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        try:
+            for row in conn.execute("SELECT rowid, media_key FROM downloads WHERE rowid > ? ORDER BY rowid", (rowid,)):
+                yield row
+        finally:
+            conn.close()
+
+    def set_file_path(self, old_path, new_path):
+        """Aponta para new_path os registros que apontavam para old_path (ex: duplicata removida)"""
+        self.flush()
+        with self.lock:
+            with self.conn:
+                self.conn.execute("UPDATE downloads SET file_path = ? WHERE file_path = ?", (new_path, old_path))
+
+    def close(self):
+        self.flush()
+        with self.lock:
+            self.conn.close()
+
+class CompactMembership:
+    """Conjunto compacto de chaves de mídia para históricos muito grandes.
+
+    Guarda só um hash de 64 bits por mídia, num arquivo ordenado acessado via
+    mmap: a inicialização é instantânea e o custo é de 8 bytes por entrada.
+    Mídias novas (desde a última gravação do índice) ficam num pequeno
+    conjunto em memória. Com o registro SQLite, todo resultado positivo é
+    confirmado por uma consulta exata no banco.
+    """
+
+    MAGIC = b"IGKEYS01"
+    HEADER = struct.Struct("<8sQQ")  # magic, quantidade de hashes, posição já indexada da fonte
+    SORT_CHUNK = 1000000
+
+    def __init__(self, index_path, ledger=None, text_file=None):
+        if sys.byteorder != "little":
+            raise RuntimeError("índice compacto só é suportado em máquinas little-endian")
+        self.index_path = index_path
+        self.ledger = ledger
+        self.text_file = text_file
+        self.lock = threading.Lock()
+        self.recent = set()
+        self.mm = None
+        self.hashes = None
+        self.count = 0
+        self.mark = 0
+        
+        if not os.path.exists(self.index_path):
+            entries, mark = self.read_source(0)
+            self.write_index(self.in_blocks(self.sorted_unique(self.hash_key(key) for key in entries)), mark)
+        self.map_index()
+        
+        # Mídias registradas depois da última gravação do índice
+        entries, _ = self.read_source(self.mark)
+        self.recent = set(self.hash_key(key) for key in entries)
+
+    @staticmethod
+    def hash_key(key):
+        digest = hashlib.blake2b(media_key(key).encode('utf-8'), digest_size=8).digest()
+        return int.from_bytes(digest, 'little')
+
+    def read_source(self, mark):
+        """Lê as chaves registradas a partir de uma posição da fonte (rowid ou byte do arquivo).
+
+        Retorna (lista_de_chaves, nova_posição).
+        """
+        keys = []
+        if self.ledger:
+            for rowid, key in self.ledger.iter_keys_since(mark):
+                keys.append(key)
+                mark = rowid
+        elif self.text_file and os.path.exists(self.text_file):
+            with open(self.text_file, 'rb') as f:
+                f.seek(mark)
+                for line in f:
+                    # Linha incompleta (ainda sendo escrita) fica para a próxima leitura
+                    if not line.endswith(b'\n'):
+                        break
+                    mark += len(line)
+                    line = line.strip()
+                    if line:
+                        keys.append(line.decode('utf-8', 'replace'))
+        return keys, mark
+
+    def sorted_unique(self, hashes):
+        """Ordena hashes com memória limitada (ordenação externa em blocos) e remove repetidos"""
+        runs = []
+        chunk = []
+        for h in hashes:
+            chunk.append(h)
+            if len(chunk) >= self.SORT_CHUNK:
+                runs.append(self.write_run(sorted(chunk)))
+                chunk = []
+        chunk.sort()
+        
+        if not runs:
+            merged = iter(chunk)
+        else:
+            runs.append(self.write_run(chunk))
+            merged = heapq.merge(*(self.read_run(path) for path in runs))
+        
+        last = None
+        for h in merged:
+            if h != last:
+                yield h
+                last = h
+        for path in runs:
+            try:
+                os.unlink(path)
+            except OSError:
+                pass
+
+    def write_run(self, sorted_hashes):
+        fd, path = tempfile.mkstemp(suffix='.run', dir=os.path.dirname(os.path.abspath(self.index_path)))
+        with os.fdopen(fd, 'wb') as f:
+            array('Q', sorted_hashes).tofile(f)
+        return path
+
+    def read_run(self, path, batch=65536):
+        with open(path, 'rb') as f:
+            while True:
+                data = f.read(batch * 8)
+                if not data:
+                    break
+                yield from array('Q', data)
+
+    @staticmethod
+    def in_blocks(hashes, size=65536):
+        """Agrupa uma sequência de hashes em blocos array('Q') para gravação"""
+        block = array('Q')
+        for h in hashes:
+            block.append(h)
+            if len(block) >= size:
+                yield block
+                block = array('Q')
+        if block:
+            yield block
+
+    def write_index(self, blocks, mark):
+        """Grava os blocos de hashes ordenados num arquivo temporário e o renomeia atomicamente"""
+        fd, tmp_path = tempfile.mkstemp(suffix='.tmp', dir=os.path.dirname(os.path.abspath(self.index_path)))
+        try:
+            count = 0
+            with os.fdopen(fd, 'wb') as f:
+                f.write(self.HEADER.pack(self.MAGIC, 0, mark))
+                for block in blocks:
+                    f.write(block)
+                    count += len(block)
+                # Solta a última referência ao mmap antigo antes de fechá-lo
+                block = None
+                f.seek(0)
+                f.write(self.HEADER.pack(self.MAGIC, count, mark))
+                f.flush()
+                os.fsync(f.fileno())
+            # No Windows o arquivo mapeado precisa ser fechado antes do rename
+            self.unmap_index()
+            os.replace(tmp_path, self.index_path)
+        except BaseException:
+            try:
+                os.unlink(tmp_path)
+            except OSError:
+                pass
+            raise
+
+    def map_index(self):
+        with open(self.index_path, 'rb') as f:
+            self.mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self.count, self.mark = self.HEADER.unpack_from(self.mm, 0)
+        if magic != self.MAGIC:
+            raise ValueError(f"arquivo de índice inválido: {self.index_path}")
+        start = self.HEADER.size
+        self.hashes = memoryview(self.mm)[start:start + self.count * 8].cast('Q')
+
+    def unmap_index(self):
+        if self.hashes is not None:
+            self.hashes.release()
+            self.hashes = None
+        if self.mm is not None:
+            self.mm.close()
+            self.mm = None
+
+    def contains_hash(self, h):
+        if h in self.recent:
+            return True
+        hashes = self.hashes
+        if hashes is None:
+            return False
+        i = bisect.bisect_left(hashes, h)
+        return i < len(hashes) and hashes[i] == h
+
+    def __contains__(self, key):
+        with self.lock:
+            found = self.contains_hash(self.hash_key(key))
+        # Confirmação exata no banco (elimina falsos positivos por colisão de hash)
+        if found and self.ledger:
+            return key in self.ledger
+        return found
+
+    def add(self, key, **kwargs):
+        with self.lock:
+            self.recent.add(self.hash_key(key))
+
+    def __len__(self):
+        return self.count + len(self.recent)
+
+    def flush(self):
+        """Incorpora ao índice em disco tudo o que foi registrado desde a última gravação.
+
+        Relê a fonte a partir da posição indexada (e não só o que este processo
+        adicionou), então também inclui mídias registradas por outros processos.
+        """
+        with self.lock:
+            entries, new_mark = self.read_source(self.mark)
+            new_hashes = sorted(set(self.hash_key(key) for key in entries))
+            new_hashes = [h for h in new_hashes if not self.contains_indexed(h)]
+            if not new_hashes and new_mark == self.mark:
+                return
+            
+            self.write_index(self.merge_sorted(new_hashes), new_mark)
+            self.map_index()
+            self.recent = set(h for h in self.recent if not self.contains_indexed(h))
+
+    def contains_indexed(self, h):
+        hashes = self.hashes
+        if hashes is None:
+            return False
+        i = bisect.bisect_left(hashes, h)
+        return i < len(hashes) and hashes[i] == h
+
+    def merge_sorted(self, new_hashes):
+        """Intercala os hashes novos (ordenados) com o índice atual, copiando trechos inteiros do mmap"""
+        hashes = self.hashes
+        if hashes is None:
+            yield array('Q', new_hashes)
+            return
+        start = 0
+        for h in new_hashes:
+            i = bisect.bisect_left(hashes, h, start)
+            if i > start:
+                yield hashes[start:i]
+            yield array('Q', [h])
+            start = i
+        if start < len(hashes):
+            yield hashes[start:]
+
+    def close(self):
+        self.flush()
+        with self.lock:
+            self.unmap_index()
+
+# Respostas JSON do Instagram que trazem posts do feed
+FEED_RESPONSE_PATTERNS = [
+    "/graphql/query",
+    "/api/graphql",
+    "/api/v1/feed/user/",
+    "/api/v1/users/web_profile_info/",
+    "/api/v1/media/"
+]
+
+def best_image_candidate(candidates):
+    """Escolhe a maior imagem de uma lista de candidatos {url, width, height}"""
+    best = None
+    for candidate in candidates or []:
+        if not isinstance(candidate, dict) or not candidate.get('url'):
+            continue
+        area = (candidate.get('width') or 0) * (candidate.get('height') or 0)
+        if best is None or area > best[0]:
+            best = (area, candidate)
+    return best[1] if best else None
+
+def parse_media_node(node, parent=None):
+    """Converte um post (API v1 ou GraphQL) em registros de mídia, um por slide do carrossel"""
+    shortcode = node.get('code') or node.get('shortcode') or (parent or {}).get('shortcode')
+    taken_at = node.get('taken_at') or node.get('taken_at_timestamp') or (parent or {}).get('taken_at')
+    pinned = bool(node.get('timeline_pinned_user_ids') or node.get('is_pinned') or (parent or {}).get('is_pinned'))
+    # Dono do post (e coautores de posts em colaboração); os slides herdam do carrossel
+    owners = [
+        user.get('username') for user in [node.get('user') or node.get('owner')] + list(node.get('coauthor_producers') or [])
+        if isinstance(user, dict) and user.get('username')
+    ] or (parent or {}).get('owners', [])
+    is_story = bool(
+        node.get('expiring_at') or node.get('product_type') == 'story'
+        or 'Story' in (node.get('__typename') or '') or (parent or {}).get('is_story')
+    )
+    
+    # Carrossel: um registro por slide
+    children = node.get('carousel_media')
+    if children is None and isinstance(node.get('edge_sidecar_to_children'), dict):
+        children = [edge.get('node') for edge in node['edge_sidecar_to_children'].get('edges', [])]
+    if children:
+        info = {'shortcode': shortcode, 'taken_at': taken_at, 'is_pinned': pinned, 'owners': owners, 'is_story': is_story}
+        records = []
+        for child in children:
+            if isinstance(child, dict):
+                records.extend(parse_media_node(child, parent=info))
+        return records
+    
+    is_video = (
+        node.get('media_type') == 2
+        or node.get('is_video') is True
+        or node.get('product_type') in ('clips', 'igtv')
+        or node.get('__typename') in ('GraphVideo', 'XDTGraphVideo')
+    )
+    
+    candidate = None
+    if isinstance(node.get('image_versions2'), dict):
+        candidate = best_image_candidate(node['image_versions2'].get('candidates'))
+    if candidate is None and node.get('display_resources'):
+        candidate = best_image_candidate([
+            {'url': r.get('src'), 'width': r.get('config_width'), 'height': r.get('config_height')}
+            for r in node['display_resources'] if isinstance(r, dict)
+        ])
+    if candidate is None and node.get('display_url'):
+        dimensions = node.get('dimensions') or {}
+        candidate = {'url': node['display_url'], 'width': dimensions.get('width'), 'height': dimensions.get('height')}
+    if candidate is None:
+        return []
+    
+    return [{
+        'media_id': str(node.get('pk') or node.get('id') or ''),
+        'shortcode': shortcode,
+        'media_type': 'video' if is_video else 'photo',
+        'url': candidate['url'],
+        'width': candidate.get('width'),
+        'height': candidate.get('height'),
+        'taken_at': taken_at,
+        'is_pinned': pinned,
+        'owners': owners,
+        'is_story': is_story
+    }]
+
+def is_media_node(node):
+    return (
+        isinstance(node, dict)
+        and ('image_versions2' in node or 'display_url' in node or 'carousel_media' in node)
+        and ('pk' in node or 'id' in node or 'code' in node or 'shortcode' in node)
+    )
+
+def parse_feed_media(payload):
+    """Extrai as mídias de uma resposta JSON do feed (API v1 ou GraphQL).
+
+    Percorre a estrutura inteira procurando nós de post, então funciona com os
+    vários formatos de resposta usados pelo web app. Retorna uma lista de
+    registros {media_id, shortcode, media_type, url, width, height, taken_at,
+    is_pinned, owners, is_story} na ordem em que aparecem.
+    """
+    records = []
+    stack = [payload]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, list):
+            stack.extend(reversed(node))
+        elif isinstance(node, dict):
+            if is_media_node(node):
+                records.extend(parse_media_node(node))
+            else:
+                stack.extend(reversed(list(node.values())))
+    return records
+
+def load_json_body(body):
+    """Decodifica o corpo JSON de uma resposta do Instagram (remove o prefixo anti-JSON-hijacking)"""
+    body = body.strip()
+    if body.startswith("for (;;);"):
+        body = body[len("for (;;);"):]
+    return json.loads(body)
+
+class NetworkCapture:
+    """Lê o log de rede do Chrome (CDP) e extrai as mídias das respostas do feed.
+
+    O próprio web app busca o feed em JSON enquanto a página rola; aqui essas
+    respostas são lidas com Network.getResponseBody, sem nenhuma requisição extra.
+    Com BROWSER_BYTES_MODE as imagens que o navegador já baixou também são
+    registradas, para que seus bytes sejam reaproveitados no lugar de um novo GET.
+    """
+
+    # Buffer do Chrome para corpos de resposta (as imagens precisam caber aqui)
+    MAX_TOTAL_BUFFER = 200 * 1024 * 1024
+    MAX_RESOURCE_BUFFER = 20 * 1024 * 1024
+    MAX_TRACKED_IMAGES = 2000
+
+    def __init__(self, driver, capture_feed=True, capture_images=False):
+        self.driver = driver
+        self.capture_feed = capture_feed
+        self.capture_images = capture_images
+        self.feed_requests = {}
+        self.pending_media = []
+        self.seen_media = set()
+        self.image_requests = {}
+        self.images = OrderedDict()
+        self.enable()
+
+    def enable(self):
+        """Ativa o domínio Network na aba atual (as configurações do CDP valem por aba)"""
+        self.driver.execute_cdp_cmd("Network.enable", {
+            "maxTotalBufferSize": self.MAX_TOTAL_BUFFER,
+            "maxResourceBufferSize": self.MAX_RESOURCE_BUFFER
+        })
+
+    def is_feed_response(self, response):
+        url = response.get('url', '')
+        mime_type = response.get('mimeType', '')
+        return any(pattern in url for pattern in FEED_RESPONSE_PATTERNS) and ('json' in mime_type or 'javascript' in mime_type or 'text' in mime_type)
+
+    def is_image_response(self, response):
+        url = response.get('url', '')
+        return response.get('mimeType', '').startswith('image/') and ('cdninstagram' in url or 'fbcdn' in url)
+
+    def update(self):
+        """Processa os eventos de rede acumulados desde a última chamada"""
+        for entry in self.driver.get_log('performance'):
+            try:
+                message = json.loads(entry['message'])['message']
+            except (KeyError, ValueError):
+                continue
+            method = message.get('method')
+            params = message.get('params', {})
+            request_id = params.get('requestId')
+            
+            if method == 'Network.responseReceived':
+                response = params.get('response', {})
+                if self.capture_feed and self.is_feed_response(response):
+                    self.feed_requests[request_id] = response.get('url')
+                elif self.capture_images and self.is_image_response(response):
+                    self.image_requests[request_id] = response.get('url')
+            elif method == 'Network.loadingFinished':
+                if request_id in self.feed_requests:
+                    self.feed_requests.pop(request_id, None)
+                    self.pending_media.extend(self.read_feed_response(request_id))
+                elif request_id in self.image_requests:
+                    self.register_image(request_id, self.image_requests.pop(request_id))
+            elif method == 'Network.loadingFailed':
+                self.feed_requests.pop(request_id, None)
+                self.image_requests.pop(request_id, None)
+
+    def drain(self):
+        """Processa os eventos de rede acumulados e retorna as mídias novas encontradas"""
+        self.update()
+        media, self.pending_media = self.pending_media, []
+        return media
+
+    def register_image(self, request_id, url):
+        """Guarda a maior cópia carregada de cada mídia (o srcset pode trazer várias)"""
+        key = media_key(url)
+        current = self.images.get(key)
+        if current is not None and not browser_copy_is_enough(url, current[1]):
+            return
+        self.images[key] = (request_id, url)
+        self.images.move_to_end(key)
+        while len(self.images) > self.MAX_TRACKED_IMAGES:
+            self.images.popitem(last=False)
+
+    def read_image(self, img_url):
+        """Retorna os bytes da imagem já carregada pelo navegador, ou None.
+
+        Só usa a cópia do navegador quando a resolução dela atende ao alvo; o
+        Chrome pode já ter descartado o corpo do buffer, e nesse caso o chamador
+        faz o download normal por HTTP.
+        """
+        entry = self.images.get(media_key(img_url))
+        if entry is None or not browser_copy_is_enough(entry[1], img_url):
+            return None
+        request_id = entry[0]
+        try:
+            result = self.driver.execute_cdp_cmd('Network.getResponseBody', {'requestId': request_id})
+        except Exception:
+            self.images.pop(media_key(img_url), None)
+            return None
+        body = result.get('body', '')
+        if not result.get('base64Encoded'):
+            return None
+        return base64.b64decode(body)
+
+    def read_feed_response(self, request_id):
+        try:
+            result = self.driver.execute_cdp_cmd('Network.getResponseBody', {'requestId': request_id})
+            body = result.get('body', '')
+            if result.get('base64Encoded'):
+                body = base64.b64decode(body).decode('utf-8', 'replace')
+            records = parse_feed_media(load_json_body(body))
+        except Exception:
+            return []
+        
+        new_records = []
+        for record in records:
+            key = (record['media_id'], media_key(record['url']))
+            if key not in self.seen_media:
+                self.seen_media.add(key)
+                new_records.append(record)
+        return new_records
+
+class RequestsTransport:
+    """Transporte HTTP do modo sem navegador: GET de JSON relativo a uma URL base.
+
+    O cliente da API só depende de get_json(path, params), então qualquer
+    objeto com esse método serve. tests/api_server.py é um servidor local que
+    serve páginas gravadas do feed: apontando API_BASE_URL para ele dá para
+    testar a paginação sem o Instagram.
+    """
+
+    def __init__(self, session, base_url=API_BASE_URL, headers=None):
+        self.session = session
+        self.base_url = base_url.rstrip('/')
+        self.headers = dict(headers or {})
+
+    def get_json(self, path, params=None):
+        url = self.base_url + '/' + path.lstrip('/')
+        response = self.session.get(url, params=params, headers=self.headers, timeout=30)
+        response.raise_for_status()
+        return load_json_body(response.text)
+
+class InstagramApiClient:
+    """Pagina as mídias de um perfil pelos mesmos endpoints que o web app usa"""
+
+    def __init__(self, transport, page_size=HTTP_PAGE_SIZE):
+        self.transport = transport
+        self.page_size = page_size
+
+    def get_user_id(self, username):
+        payload = self.transport.get_json("/api/v1/users/web_profile_info/", {'username': username})
+        user = ((payload or {}).get('data') or {}).get('user') or {}
+        user_id = user.get('id') or user.get('pk')
+        if not user_id:
+            raise ValueError(f"perfil não encontrado: {username}")
+        return str(user_id)
+
+    def iter_feed_pages(self, user_id, max_id=None):
+        """Gera (registros, próximo_cursor) para cada página do feed, até a última"""
+        while True:
+            params = {'count': self.page_size}
+            if max_id:
+                params['max_id'] = max_id
+            payload = self.transport.get_json(f"/api/v1/feed/user/{user_id}/", params)
+            next_max_id = payload.get('next_max_id')
+            yield parse_feed_media(payload.get('items', [])), next_max_id
+            if not payload.get('more_available') or not next_max_id or next_max_id == max_id:
+                break
+            max_id = next_max_id
+
+    def get_post_media(self, shortcode):
+        """Todas as mídias de um post (todos os slides, se for carrossel)"""
+        payload = self.transport.get_json(f"/api/v1/media/{shortcode_to_media_id(shortcode)}/info/")
+        return parse_feed_media(payload.get('items', []))
+
+CHROME_FOR_TESTING_URL = "https://googlechromelabs.github.io/chrome-for-testing/latest-versions-per-milestone-with-downloads.json"
+
+def read_version(text):
+    match = re.search(r'(\d+)\.(\d+)\.(\d+)\.(\d+)', text or "")
+    return match.group(0) if match else None
+
+class ChromeDriverResolver:
+    """Encontra (ou baixa uma única vez) o ChromeDriver da versão principal do Chrome instalado.
+
+    Os binários ficam em cache_dir/<versão principal>/<plataforma>/ e são
+    reutilizados enquanto a versão do Chrome não muda. Cada binário é
+    verificado com --version antes do uso. Em modo offline nada é baixado.
+    """
+
+    def __init__(self, cache_dir, offline=False):
+        self.cache_dir = cache_dir
+        self.offline = offline
+        self.binary_name = "chromedriver.exe" if os.name == "nt" else "chromedriver"
+
+    @staticmethod
+    def platform_name():
+        """Nome da plataforma no Chrome for Testing"""
+        machine = platform.machine().lower()
+        if sys.platform.startswith("win"):
+            return "win64" if sys.maxsize > 2**32 else "win32"
+        if sys.platform == "darwin":
+            return "mac-arm64" if machine in ("arm64", "aarch64") else "mac-x64"
+        return "linux64"
+
+    @staticmethod
+    def chrome_version(chrome_path):
+        """Versão do Chrome instalado, sem abrir o navegador"""
+        if os.name == "nt":
+            # No Windows o chrome.exe não imprime a versão; ela é o nome da pasta ao lado dele
+            try:
+                versions = [read_version(name) for name in os.listdir(os.path.dirname(chrome_path))]
+                versions = [v for v in versions if v]
+                return max(versions, key=lambda v: tuple(map(int, v.split('.')))) if versions else None
+            except OSError:
+                return None
+        try:
+            output = subprocess.run([chrome_path, "--version"], capture_output=True, text=True, timeout=15).stdout
+            return read_version(output)
+        except (OSError, subprocess.SubprocessError):
+            return None
+
+    def driver_version(self, driver_path):
+        try:
+            output = subprocess.run([driver_path, "--version"], capture_output=True, text=True, timeout=15).stdout
+            return read_version(output)
+        except (OSError, subprocess.SubprocessError):
+            return None
+
+    def verify(self, driver_path, major):
+        """O binário existe, executa e é da mesma versão principal do Chrome?"""
+        if not driver_path or not os.path.isfile(driver_path):
+            return False
+        version = self.driver_version(driver_path)
+        return bool(version) and (major is None or version.split('.')[0] == major)
+
+    def cached_path(self, major):
+        return os.path.join(self.cache_dir, major or "unknown", self.platform_name(), self.binary_name)
+
+    def resolve(self, chrome_path):
+        """Retorna o caminho de um ChromeDriver compatível, ou None"""
+        version = self.chrome_version(chrome_path) if chrome_path else None
+        major = version.split('.')[0] if version else None
+        print(f"Versão do Chrome: {version or 'desconhecida'}")
+        
+        # 1. Caminho configurado explicitamente
+        if CHROMEDRIVER_PATH and self.verify(CHROMEDRIVER_PATH, major):
+            return CHROMEDRIVER_PATH
+        
+        # 2. Cache local por versão principal
+        cached = self.cached_path(major)
+        if self.verify(cached, major):
+            print(f"ChromeDriver em cache: {cached}")
+            return cached
+        
+        # 3. ChromeDriver já instalado no sistema (ex: pacote chromium-driver)
+        system_driver = shutil.which(self.binary_name)
+        if system_driver and self.verify(system_driver, major):
+            print(f"ChromeDriver do sistema: {system_driver}")
+            return system_driver
+        
+        if self.offline:
+            print("Modo offline: nenhum ChromeDriver compatível encontrado localmente")
+            return None
+        
+        # 4. Download único do Chrome for Testing para a versão principal instalada
+        if major:
+            try:
+                return self.download(major, cached)
+            except Exception as e:
+                print(f"Erro ao baixar do Chrome for Testing: {e}")
+        
+        # 5. webdriver-manager (usa e mantém o próprio cache em ~/.wdm)
+        try:
+            from webdriver_manager.chrome import ChromeDriverManager
+            print("Tentando obter ChromeDriver com webdriver-manager...")
+            path = ChromeDriverManager().install()
+            if path and os.path.basename(path) != self.binary_name:
+                path = os.path.join(os.path.dirname(path), self.binary_name)
+            if self.verify(path, None):
+                return path
+        except Exception as e:
+            print(f"Erro com webdriver-manager: {e}")
+        return None
+
+    def download(self, major, target):
+        print(f"Baixando ChromeDriver {major} ({self.platform_name()})...")
+        response = requests.get(CHROME_FOR_TESTING_URL, timeout=30)
+        response.raise_for_status()
+        downloads = response.json()['milestones'][major]['downloads']['chromedriver']
+        url = next(d['url'] for d in downloads if d['platform'] == self.platform_name())
+        
+        response = requests.get(url, timeout=120)
+        response.raise_for_status()
+        
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        with tempfile.TemporaryDirectory(dir=os.path.dirname(target)) as tmp_dir:
+            zip_path = os.path.join(tmp_dir, "chromedriver.zip")
+            with open(zip_path, 'wb') as f:
+                f.write(response.content)
+            with zipfile.ZipFile(zip_path) as archive:
+                member = next(n for n in archive.namelist() if os.path.basename(n) == self.binary_name)
+                extracted = archive.extract(member, tmp_dir)
+            os.chmod(extracted, 0o755)
+            # Rename atômico: outro processo nunca vê um binário pela metade
+            os.replace(extracted, target)
+        
+        if not self.verify(target, major):
+            raise Exception("binário baixado não passou na verificação")
+        print(f"ChromeDriver salvo em cache: {target}")
+        return target
+
+def compute_dhash(path):
+    """Calcula o hash perceptual (dHash de 64 bits) de uma imagem.
+
+    Executado em processos separados (ProcessPoolExecutor). Retorna (path, hash)
+    ou (path, None) se a imagem não puder ser lida.
+    """
+    try:
+        from PIL import Image
+        with Image.open(path) as img:
+            pixels = list(img.convert('L').resize((9, 8), Image.LANCZOS).getdata())
+    except Exception:
+        return path, None
+    
+    value = 0
+    for row in range(8):
+        for col in range(8):
+            left = pixels[row * 9 + col]
+            right = pixels[row * 9 + col + 1]
+            value = (value << 1) | (1 if left > right else 0)
+    return path, value
+
+class PerceptualHashIndex:
+    """Índice de hashes perceptuais para encontrar quase-duplicatas (re-encodes, redimensionamentos).
+
+    Os hashes são calculados num pool de processos, fora do caminho de download.
+    Para achar candidatos sem comparar com todas as imagens, o hash é dividido em
+    8 bandas de 8 bits: se a distância de Hamming for <= 7, pelo menos uma banda
+    é idêntica (princípio da casa dos pombos).
+    """
+
+    BANDS = 8
+
+    def __init__(self, db_path, threshold, action, workers, ledger=None):
+        self.threshold = threshold
+        self.action = action
+        self.ledger = ledger
+        self.lock = threading.Lock()
+        self.buckets = [dict() for _ in range(self.BANDS)]
+        self.near_duplicates = 0
+        self.conn = sqlite3.connect(db_path, timeout=30, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("CREATE TABLE IF NOT EXISTS phashes (file_path TEXT PRIMARY KEY, phash INTEGER NOT NULL)")
+        self.conn.commit()
+        for file_path, phash in self.conn.execute("SELECT file_path, phash FROM phashes"):
+            self.index(phash % (1 << 64), file_path)
+        self.pool = ProcessPoolExecutor(max_workers=max(workers, 1))
+
+    def bands(self, phash):
+        return [(phash >> (8 * i)) & 0xFF for i in range(self.BANDS)]
+
+    def index(self, phash, file_path):
+        for band, value in enumerate(self.bands(phash)):
+            self.buckets[band].setdefault(value, []).append((phash, file_path))
+
+    def find_similar(self, phash):
+        """Retorna (arquivo, distância) da imagem indexada mais parecida dentro do limite"""
+        best = None
+        for band, value in enumerate(self.bands(phash)):
+            for other, file_path in self.buckets[band].get(value, ()):
+                distance = bin(phash ^ other).count('1')
+                if distance <= self.threshold and (best is None or distance < best[1]):
+                    best = (file_path, distance)
+        return best
+
+    def submit(self, file_path):
+        """Agenda o cálculo do hash perceptual de um arquivo recém-baixado"""
+        future = self.pool.submit(compute_dhash, file_path)
+        future.add_done_callback(self.on_hash_ready)
+
+    def on_hash_ready(self, future):
+        try:
+            file_path, phash = future.result()
+        except Exception as e:
+            print(f"⚠️  Erro ao calcular hash perceptual: {e}")
+            return
+        if phash is None:
+            return
+        
+        with self.lock:
+            match = self.find_similar(phash)
+            if match and os.path.abspath(match[0]) != os.path.abspath(file_path) and os.path.exists(match[0]):
+                self.handle_near_duplicate(file_path, match[0], match[1])
+                return
+            self.index(phash, file_path)
+            # SQLite só guarda inteiros com sinal de 64 bits
+            stored = phash - (1 << 64) if phash >= (1 << 63) else phash
+            with self.conn:
+                self.conn.execute("INSERT OR REPLACE INTO phashes (file_path, phash) VALUES (?, ?)", (file_path, stored))
+
+    def handle_near_duplicate(self, file_path, original, distance):
+        self.near_duplicates += 1
+        name, original_name = os.path.basename(file_path), os.path.basename(original)
+        try:
+            if self.action == "skip":
+                os.unlink(file_path)
+                if self.ledger:
+                    self.ledger.set_file_path(file_path, original)
+                print(f"🧬 Quase-duplicata removida: {name} ≈ {original_name} (distância {distance})")
+            elif self.action == "hardlink":
+                tmp_path = file_path + ".link"
+                os.link(original, tmp_path)
+                os.replace(tmp_path, file_path)
+                print(f"🧬 Quase-duplicata substituída por hard link: {name} -> {original_name} (distância {distance})")
+            else:
+                print(f"🧬 Quase-duplicata detectada: {name} ≈ {original_name} (distância {distance})")
+        except OSError as e:
+            print(f"⚠️  Erro ao tratar quase-duplicata {name}: {e}")
+
+    def close(self):
+        """Aguarda os hashes pendentes e fecha o índice"""
+        self.pool.shutdown(wait=True)
+        with self.lock:
+            self.conn.close()
+
+class DownloadPipeline:
+    """Fila limitada de downloads consumida por workers em segundo plano.
+
+    O loop de scroll apenas enfileira as URLs encontradas; quando a fila está
+    cheia, submit() bloqueia (backpressure) até algum worker liberar espaço.
+    """
+
+    def __init__(self, scraper, workers, max_queued):
+        self.scraper = scraper
+        self.queue = queue.Queue(maxsize=max(max_queued, 1))
+        self.lock = threading.Lock()
+        self.pending = set()
+        self.completed = 0
+        self.failed = 0
+        # Por perfil: downloads ainda na fila e downloads concluídos
+        self.profile_pending = {}
+        self.profile_completed = {}
+        # Número de ordem de cada envio e os que ainda não terminaram (checkpoints)
+        self.submitted = 0
+        self.unfinished = set()
+        self.threads = []
+        for i in range(max(workers, 1)):
+            thread = threading.Thread(target=self._worker, name=f"download-{i+1}", daemon=True)
+            thread.start()
+            self.threads.append(thread)
+
+    def submit(self, img_url, filename, message=None, body=None):
+        """Enfileira um download. Retorna False se a URL já está na fila"""
+        key = media_key(img_url)
+        # O perfil é fixado no envio: no modo multiabas ele muda antes do download terminar
+        profile = self.scraper.current_profile
+        with self.lock:
+            if key in self.pending:
+                return False
+            self.pending.add(key)
+            self.profile_pending[profile] = self.profile_pending.get(profile, 0) + 1
+            self.submitted += 1
+            sequence = self.submitted
+            self.unfinished.add(sequence)
+        self.queue.put((img_url, filename, message, body, profile, sequence))
+        return True
+
+    def submit_all(self, jobs):
+        """Enfileira uma lista de (url, arquivo, mensagem, bytes). Retorna quantos foram aceitos"""
+        return sum(1 for job in jobs if self.submit(*job))
+
+    def _worker(self):
+        while True:
+            job = self.queue.get()
+            if job is None:
+                self.queue.task_done()
+                break
+            img_url, filename, message, body, profile, sequence = job
+            try:
+                if message:
+                    print(message)
+                success = self.scraper.download_image(img_url, filename, body=body, profile=profile)
+                # Pequena pausa entre downloads (por worker)
+                time.sleep(DOWNLOAD_DELAY)
+            except Exception as e:
+                print(f"✗ Erro no worker de download: {e}")
+                success = False
+            with self.lock:
+                self.pending.discard(media_key(img_url))
+                self.unfinished.discard(sequence)
+                self.profile_pending[profile] -= 1
+                if success:
+                    self.completed += 1
+                    self.profile_completed[profile] = self.profile_completed.get(profile, 0) + 1
+                else:
+                    self.failed += 1
+            self.queue.task_done()
+
+    def finished_through(self):
+        """Maior número de envio até o qual todos os downloads já terminaram"""
+        with self.lock:
+            return min(self.unfinished) - 1 if self.unfinished else self.submitted
+
+    def profile_status(self, profile):
+        """Retorna (na fila, concluídos) dos downloads enviados para o perfil"""
+        with self.lock:
+            return self.profile_pending.get(profile, 0), self.profile_completed.get(profile, 0)
+
+    def flush(self):
+        """Aguarda até que todos os downloads enfileirados terminem"""
+        self.queue.join()
+
+    def close(self):
+        """Esvazia a fila e encerra os workers"""
+        self.flush()
+        for _ in self.threads:
+            self.queue.put(None)
+        for thread in self.threads:
+            thread.join()
+        self.threads = []
+
+class SQLiteJobQueue:
+    """Fila de perfis compartilhada entre máquinas (SQLite num volume compartilhado).
+
+    Cada worker pega um perfil com um lease de lease_seconds e o renova com
+    heartbeat() enquanto trabalha. Se o worker cair, o lease expira e o perfil
+    volta para a fila; após max_attempts tentativas ele é marcado como falho.
+    """
+
+    def __init__(self, db_path, max_attempts=3):
+        self.max_attempts = max(max_attempts, 1)
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(db_path, timeout=60, isolation_level=None, check_same_thread=False)
+        # Modo de journal clássico: WAL exige memória compartilhada, que volumes de rede não têm
+        self.conn.execute("PRAGMA journal_mode=DELETE")
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS jobs (
+                url TEXT PRIMARY KEY,
+                status TEXT NOT NULL DEFAULT 'pending',
+                owner TEXT,
+                lease_until REAL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                result TEXT,
+                updated_at REAL
+            );
+            CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs(status, lease_until);
+        """)
+
+    def transaction(self, statements):
+        """Executa [(sql, parâmetros)] numa transação exclusiva e retorna os cursores"""
+        with self.lock:
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                cursors = [self.conn.execute(sql, params) for sql, params in statements]
+                self.conn.execute("COMMIT")
+                return cursors
+            except BaseException:
+                self.conn.execute("ROLLBACK")
+                raise
+
+    def add(self, urls):
+        """Enfileira perfis (os já presentes são ignorados). Retorna quantos entraram"""
+        now = time.time()
+        cursors = self.transaction([
+            ("INSERT OR IGNORE INTO jobs (url, status, updated_at) VALUES (?, 'pending', ?)", (url, now))
+            for url in urls
+        ])
+        return sum(cursor.rowcount for cursor in cursors)
+
+    def claim(self, owner, lease_seconds):
+        """Pega o próximo perfil livre (ou com lease expirado). Retorna a URL ou None"""
+        now = time.time()
+        with self.lock:
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                self.conn.execute(
+                    "UPDATE jobs SET status = 'failed', result = ?, updated_at = ? "
+                    "WHERE status = 'leased' AND lease_until < ? AND attempts >= ?",
+                    (json.dumps({'error': "lease expirado em todas as tentativas"}), now, now, self.max_attempts)
+                )
+                row = self.conn.execute(
+                    "SELECT url FROM jobs WHERE status = 'pending' OR (status = 'leased' AND lease_until < ?) "
+                    "ORDER BY rowid LIMIT 1", (now,)
+                ).fetchone()
+                if row:
+                    self.conn.execute(
+                        "UPDATE jobs SET status = 'leased', owner = ?, lease_until = ?, attempts = attempts + 1, "
+                        "updated_at = ? WHERE url = ?", (owner, now + lease_seconds, now, row[0])
+                    )
+                self.conn.execute("COMMIT")
+            except BaseException:
+                self.conn.execute("ROLLBACK")
+                raise
+        return row[0] if row else None
+
+    def heartbeat(self, url, owner, lease_seconds):
+        """Renova o lease. Retorna False se ele foi perdido (expirou e outro worker pegou o perfil)"""
+        now = time.time()
+        cursor, = self.transaction([(
+            "UPDATE jobs SET lease_until = ?, updated_at = ? WHERE url = ? AND owner = ? AND status = 'leased'",
+            (now + lease_seconds, now, url, owner)
+        )])
+        return cursor.rowcount == 1
+
+    def complete(self, url, owner, result):
+        self.transaction([(
+            "UPDATE jobs SET status = 'done', lease_until = NULL, result = ?, updated_at = ? WHERE url = ? AND owner = ?",
+            (json.dumps(result, ensure_ascii=False), time.time(), url, owner)
+        )])
+
+    def fail(self, url, owner, error):
+        """Devolve o perfil à fila (ou marca como falho após max_attempts tentativas)"""
+        self.transaction([(
+            "UPDATE jobs SET status = CASE WHEN attempts >= ? THEN 'failed' ELSE 'pending' END, "
+            "lease_until = NULL, result = ?, updated_at = ? WHERE url = ? AND owner = ?",
+            (self.max_attempts, json.dumps({'error': error}, ensure_ascii=False), time.time(), url, owner)
+        )])
+
+    def counts(self):
+        with self.lock:
+            return dict(self.conn.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall())
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+class MemoryJobQueue:
+    """Mesma interface da SQLiteJobQueue, em memória.
+
+    Só existe dentro do processo que a criou: serve para testes e para rodar
+    workers em threads passando a fila em queue_worker(job_queue=...). A linha
+    de comando e os workers em processos separados exigem a fila SQLite.
+    """
+
+    def __init__(self, max_attempts=3):
+        self.max_attempts = max(max_attempts, 1)
+        self.lock = threading.Lock()
+        self.jobs = OrderedDict()
+
+    def add(self, urls):
+        with self.lock:
+            added = 0
+            for url in urls:
+                if url not in self.jobs:
+                    self.jobs[url] = {'status': 'pending', 'owner': None, 'lease_until': None, 'attempts': 0, 'result': None}
+                    added += 1
+            return added
+
+    def claim(self, owner, lease_seconds):
+        now = time.time()
+        with self.lock:
+            for url, job in self.jobs.items():
+                expired = job['status'] == 'leased' and job['lease_until'] < now
+                if expired and job['attempts'] >= self.max_attempts:
+                    job.update(status='failed', result={'error': "lease expirado em todas as tentativas"})
+                elif job['status'] == 'pending' or expired:
+                    job.update(status='leased', owner=owner, lease_until=now + lease_seconds, attempts=job['attempts'] + 1)
+                    return url
+        return None
+
+    def heartbeat(self, url, owner, lease_seconds):
+        with self.lock:
+            job = self.jobs.get(url)
+            if not job or job['owner'] != owner or job['status'] != 'leased':
+                return False
+            job['lease_until'] = time.time() + lease_seconds
+            return True
+
+    def complete(self, url, owner, result):
+        with self.lock:
+            job = self.jobs.get(url)
+            if job and job['owner'] == owner:
+                job.update(status='done', lease_until=None, result=result)
+
+    def fail(self, url, owner, error):
+        with self.lock:
+            job = self.jobs.get(url)
+            if job and job['owner'] == owner:
+                status = 'failed' if job['attempts'] >= self.max_attempts else 'pending'
+                job.update(status=status, lease_until=None, result={'error': error})
+
+    def counts(self):
+        with self.lock:
+            counts = {}
+            for job in self.jobs.values():
+                counts[job['status']] = counts.get(job['status'], 0) + 1
+            return counts
+
+    def close(self):
+        pass
+
+def open_job_queue(backend=JOB_QUEUE_BACKEND):
+    """Abre a fila de perfis configurada ("sqlite" ou "memory")"""
+    if backend == "memory":
+        return MemoryJobQueue(JOB_MAX_ATTEMPTS)
+    return SQLiteJobQueue(JOB_QUEUE_FILE, JOB_MAX_ATTEMPTS)
+
+class FeedTab:
+    """Estado de um perfil aberto em uma aba/janela do modo multiabas"""
+
+    def __init__(self, handle, profile_url):
+        self.handle = handle
+        self.profile_url = profile_url
+        self.profile = profile_name(profile_url)
+        self.scroll_count = 0
+        self.posts = 0
+        self.last_height = 0
+        self.no_change_count = 0
+        self.known_streak = 0
+        self.streak_keys = set()
+        self.queued = 0
+        self.downloads = 0
+        self.completed_before = 0
+        self.started = time.time()
+        self.done = False
+        self.error = None
+
+    def result(self):
+        return {
+            'profile': self.profile,
+            'url': self.profile_url,
+            'posts': self.posts,
+            'downloads': self.downloads,
+            'ok': self.error is None,
+            'error': self.error,
+            'elapsed': round(time.time() - self.started, 1)
+        }
+
 class InstagramScraper:
-    def __init__(self):
+    def __init__(self, tabs=1):
         self.driver = None
         self.prints_dir = PRINTS_DIRECTORY
         self.downloaded_urls_file = DOWNLOADED_URLS_FILE
         self.downloaded_urls = set()
+        self.ledger = None
+        self.current_profile = None
+        self.history_lock = threading.Lock()
+        self.host_semaphores = {}
+        self.host_semaphores_lock = threading.Lock()
+        self.http_session = self.create_http_session()
+        self.pipeline = None
+        self.phash_index = None
+        self.scroll_latencies = deque(maxlen=20)
+        self.network_capture = None
+        self.api_transport = None
+        self.logged_in = False
+        self.keep_driver = False
+        self.tabs = tabs
+        self.worker_id = None
+        self.known_streak = 0
+        self.streak_keys = set()
+        self.pending_checkpoints = []
         self.setup_driver()
         self.create_prints_directory()
         self.load_downloaded_urls()
+        self.open_phash_index()
     
     def find_chrome_executable(self):
-        """Encontra o executável do Chrome no Windows"""
-        possible_paths = [
-            r"C:\Program Files\Google\Chrome\Application\chrome.exe",
-            r"C:\Program Files (x86)\Google\Chrome\Application\chrome.exe",
-            r"C:\Users\{}\AppData\Local\Google\Chrome\Application\chrome.exe".format(os.getenv('USERNAME')),
-        ]
+        """Encontra o executável do Chrome (Windows, Linux ou macOS)"""
+        if CHROME_BINARY:
+            return CHROME_BINARY if os.path.exists(CHROME_BINARY) else None
+        
+        if os.name == "nt":
+            possible_paths = [
+                r"C:\Program Files\Google\Chrome\Application\chrome.exe",
+                r"C:\Program Files (x86)\Google\Chrome\Application\chrome.exe",
+                r"C:\Users\{}\AppData\Local\Google\Chrome\Application\chrome.exe".format(os.getenv('USERNAME')),
+            ]
+        elif sys.platform == "darwin":
+            possible_paths = [
+                "/Applications/Google Chrome.app/Contents/MacOS/Google Chrome",
+                "/Applications/Chromium.app/Contents/MacOS/Chromium",
+            ]
+        else:
+            possible_paths = [
+                shutil.which(name) for name in
+                ("google-chrome", "google-chrome-stable", "chromium", "chromium-browser", "chrome")
+            ]
+            possible_paths += ["/opt/google/chrome/chrome", "/usr/lib/chromium/chromium"]
         
         for path in possible_paths:
-            if os.path.exists(path):
+            if path and os.path.exists(path):
                 return path
         
         return None
     
-    def clear_webdriver_cache(self):
-        """Limpa cache antigo do webdriver-manager"""
-        try:
-            import shutil
-            wdm_cache = os.path.expanduser("~/.wdm")
-            if os.path.exists(wdm_cache):
-                print("Limpando cache antigo do webdriver-manager...")
-                shutil.rmtree(wdm_cache)
-        except:
-            pass
-
     def download_chromedriver(self):
-        """Baixa o ChromeDriver manualmente se necessário"""
-        try:
-            from webdriver_manager.chrome import ChromeDriverManager
-            print("Tentando baixar ChromeDriver com webdriver-manager...")
-            
-            # Limpa cache primeiro
-            self.clear_webdriver_cache()
-            
-            # Obtém o diretório onde o webdriver-manager salva
-            chrome_driver_path = ChromeDriverManager().install()
-            print(f"Webdriver-manager retornou: {chrome_driver_path}")
-            
-            # Procura pelo chromedriver.exe no diretório
-            if chrome_driver_path:
-                driver_dir = os.path.dirname(chrome_driver_path)
-                
-                # Procura por chromedriver.exe no diretório e subdiretórios
-                for root, dirs, files in os.walk(driver_dir):
-                    for file in files:
-                        if file == "chromedriver.exe":
-                            correct_path = os.path.join(root, file)
-                            print(f"ChromeDriver encontrado em: {correct_path}")
-                            return correct_path
-                
-                # Se não encontrou, tenta o caminho direto
-                direct_path = os.path.join(driver_dir, "chromedriver.exe")
-                if os.path.exists(direct_path):
-                    return direct_path
-            
-            raise Exception("ChromeDriver não encontrado nos caminhos esperados")
-                
-        except Exception as e:
-            print(f"Erro com webdriver-manager: {e}")
-            print("Tentando método alternativo...")
-            
-            # Método alternativo: baixar diretamente
-            try:
-                import zipfile
-                import tempfile
-                
-                # URL do ChromeDriver mais recente (versão estável)
-                driver_url = "https://storage.googleapis.com/chrome-for-testing-public/120.0.6099.109/win64/chromedriver-win64.zip"
-                
-                print("Baixando ChromeDriver diretamente...")
-                response = requests.get(driver_url)
-                response.raise_for_status()
-                
-                with tempfile.NamedTemporaryFile(delete=False, suffix='.zip') as tmp_file:
-                    tmp_file.write(response.content)
-                    zip_path = tmp_file.name
-                
-                # Extrai o ChromeDriver
-                extract_dir = os.path.join(os.getcwd(), "chromedriver")
-                os.makedirs(extract_dir, exist_ok=True)
-                
-                with zipfile.ZipFile(zip_path, 'r') as zip_ref:
-                    zip_ref.extractall(extract_dir)
-                
-                # Procura pelo chromedriver.exe no diretório extraído
-                for root, dirs, files in os.walk(extract_dir):
-                    for file in files:
-                        if file == "chromedriver.exe":
-                            driver_path = os.path.join(root, file)
-                            print(f"ChromeDriver extraído em: {driver_path}")
-                            return driver_path
-                
-                # Cleanup do arquivo zip
-                os.unlink(zip_path)
-                
-                raise Exception("ChromeDriver.exe não encontrado no arquivo baixado")
-                    
-            except Exception as e2:
-                print(f"Erro no método alternativo: {e2}")
-                return None
+        """Obtém o ChromeDriver compatível com o Chrome instalado (com cache local)"""
+        resolver = ChromeDriverResolver(DRIVER_CACHE_DIRECTORY, offline=DRIVER_OFFLINE_MODE)
+        return resolver.resolve(self.find_chrome_executable())
     
     def setup_driver(self):
-        """Configura o driver do Chrome com melhor compatibilidade Windows"""
+        """Configura o driver do Chrome (Windows, Linux ou macOS)"""
         print("Configurando ChromeDriver...")
         
         # Verifica se o Chrome está instalado
@@ -167,7 +1837,20 @@ class InstagramScraper:
         chrome_options.add_argument("--disable-plugins")
         chrome_options.add_experimental_option("useAutomationExtension", False)
         chrome_options.add_experimental_option("excludeSwitches", ["enable-automation", "enable-logging"])
-        chrome_options.add_argument("--user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36")
+        chrome_options.add_argument(f"--user-agent={USER_AGENT}")
+        
+        if LEAN_BROWSER_MODE:
+            self.apply_lean_options(chrome_options)
+        
+        if self.tabs > 1:
+            # Modo multiabas: as abas fora de foco continuam carregando e rodando scripts
+            chrome_options.add_argument("--disable-background-timer-throttling")
+            chrome_options.add_argument("--disable-backgrounding-occluded-windows")
+            chrome_options.add_argument("--disable-renderer-backgrounding")
+        
+        # Captura de rede via CDP: o log de performance traz os eventos Network.*
+        if DISCOVERY_MODE == "network" or BROWSER_BYTES_MODE:
+            chrome_options.set_capability("goog:loggingPrefs", {"performance": "ALL"})
         
         # Tenta obter o ChromeDriver
         driver_path = self.download_chromedriver()
@@ -188,6 +1871,15 @@ class InstagramScraper:
             self.driver.execute_script("Object.defineProperty(navigator, 'webdriver', {get: () => undefined})")
             print("✓ ChromeDriver iniciado com sucesso!")
             
+            if DISCOVERY_MODE == "network" or BROWSER_BYTES_MODE:
+                self.network_capture = NetworkCapture(self.driver,
+                                                      capture_feed=DISCOVERY_MODE == "network",
+                                                      capture_images=BROWSER_BYTES_MODE)
+                print("✓ Captura de rede (CDP) ativa")
+            
+            if LEAN_BROWSER_MODE:
+                self.block_heavy_requests()
+            
         except Exception as e:
             print(f"ERRO ao inicializar ChromeDriver: {e}")
             print("\nTentativas de solução:")
@@ -196,11 +1888,110 @@ class InstagramScraper:
             print("3. Verifique se o antivírus não está bloqueando")
             sys.exit(1)
     
+    def apply_lean_options(self, chrome_options):
+        """Perfil enxuto: headless, sem autoplay, viewport menor e sem serviços de fundo"""
+        chrome_options.add_argument("--headless=new")
+        chrome_options.add_argument(f"--window-size={LEAN_WINDOW_SIZE}")
+        chrome_options.add_argument("--force-device-scale-factor=1")  # Decodifica imagens em 1x
+        chrome_options.add_argument("--autoplay-policy=user-gesture-required")
+        chrome_options.add_argument("--mute-audio")
+        chrome_options.add_argument("--disable-gpu")
+        chrome_options.add_argument("--disable-background-networking")
+        chrome_options.add_argument("--disable-component-update")
+        chrome_options.add_argument("--disable-default-apps")
+        chrome_options.add_argument("--disable-sync")
+        chrome_options.add_argument("--no-first-run")
+        chrome_options.add_experimental_option("prefs", {
+            "profile.default_content_setting_values.notifications": 2
+        })
+        print("🪶 Perfil enxuto do navegador ativo (headless)")
+    
+    def block_heavy_requests(self):
+        """Bloqueia via CDP as requisições que o scraper nunca usa (vídeo, fontes, rastreadores)"""
+        patterns = BLOCKED_URL_PATTERNS if BLOCKED_URL_PATTERNS is not None else LEAN_BLOCKED_URLS
+        try:
+            if not self.network_capture:
+                self.driver.execute_cdp_cmd("Network.enable", {})
+            self.driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": list(patterns)})
+            print(f"✓ {len(patterns)} padrões de URL bloqueados")
+        except Exception as e:
+            print(f"⚠️ Não foi possível bloquear URLs: {e}")
+    
+    def apply_tab_network_settings(self):
+        """Reaplica na aba atual os ajustes de rede do CDP, que não passam de uma aba para outra"""
+        if self.network_capture:
+            try:
+                self.network_capture.enable()
+            except Exception as e:
+                print(f"⚠️ Não foi possível ativar a captura de rede na aba: {e}")
+        if LEAN_BROWSER_MODE:
+            self.block_heavy_requests()
+    
+    def create_http_session(self):
+        """Cria a sessão HTTP compartilhada (keep-alive) usada por todos os workers de download"""
+        session = requests.Session()
+        session.headers.update({'User-Agent': USER_AGENT})
+        
+        # Pool de conexões dimensionado para o número de workers
+        pool_size = max(DOWNLOAD_WORKERS, MAX_CONNECTIONS_PER_HOST, 1)
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=2)
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        return session
+    
+    def get_host_semaphore(self, url):
+        """Retorna o semáforo que limita downloads simultâneos para o host da URL"""
+        host = urllib.parse.urlparse(url).netloc
+        with self.host_semaphores_lock:
+            if host not in self.host_semaphores:
+                self.host_semaphores[host] = threading.BoundedSemaphore(max(MAX_CONNECTIONS_PER_HOST, 1))
+            return self.host_semaphores[host]
+    
+    def create_api_transport(self):
+        """Exporta os cookies da sessão do navegador para o cliente HTTP do modo "http" """
+        csrf_token = ""
+        for cookie in self.driver.get_cookies():
+            self.http_session.cookies.set(cookie['name'], cookie['value'],
+                                          domain=cookie.get('domain'), path=cookie.get('path', '/'))
+            if cookie['name'] == 'csrftoken':
+                csrf_token = cookie['value']
+        
+        headers = {
+            'X-IG-App-ID': IG_APP_ID,
+            'X-CSRFToken': csrf_token,
+            'X-Requested-With': 'XMLHttpRequest',
+            'Referer': API_BASE_URL.rstrip('/') + '/'
+        }
+        return RequestsTransport(self.http_session, API_BASE_URL, headers)
+    
+    def close_driver(self):
+        """Fecha o navegador quando ele não é mais necessário (ex: após o login no modo "http")"""
+        if self.driver:
+            try:
+                self.driver.quit()
+                print("✓ Navegador fechado")
+            except Exception:
+                print("⚠️ Erro ao fechar navegador")
+        self.driver = None
+        self.network_capture = None
+        self.logged_in = False
+    
     def create_prints_directory(self):
         """Cria o diretório prints se não existir"""
         if not os.path.exists(self.prints_dir):
             os.makedirs(self.prints_dir)
             print(f"Diretório '{self.prints_dir}' criado")
+            return
+        
+        # Remove arquivos temporários de downloads interrompidos (crash no meio da escrita).
+        # Só os antigos: outros processos (modo em lote) podem estar gravando os recentes.
+        try:
+            for name in os.listdir(self.prints_dir):
+                path = os.path.join(self.prints_dir, name)
+                if name.endswith('.part') and time.time() - os.path.getmtime(path) > 3600:
+                    os.unlink(path)
+        except Exception as e:
+            print(f"⚠️  Erro ao limpar downloads incompletos: {e}")
     
     def login_instagram(self, username, password):
         """Faz login no Instagram"""
@@ -209,7 +2000,6 @@ class InstagramScraper:
         try:
             # Navega para a página de login
             self.driver.get("https://www.instagram.com/accounts/login/")
-            time.sleep(3)
             
             # Aguarda elementos de login carregarem
             WebDriverWait(self.driver, 10).until(
@@ -235,51 +2025,22 @@ class InstagramScraper:
             login_button.click()
             
             print("Aguardando login...")
-            time.sleep(5)
-            
-            # Verifica se o login foi bem-sucedido usando múltiplos métodos
-            success = False
             
-            # Método 1: Verifica URL
-            current_url = self.driver.current_url
-            if "login" not in current_url.lower() and "instagram.com" in current_url:
-                success = True
+            # Espera por qualquer desfecho (indicador de login, erro ou popup) e
+            # dispensa os popups até a página ficar quieta
+            state = self.settle_page(want="logged_in", timeout=max(PAGE_SETTLE_TIMEOUT, 15))
             
-            # Método 2: Procura por elementos que indicam login bem-sucedido
-            try:
-                # Procura por elementos que só aparecem quando logado
-                logged_indicators = [
-                    "//a[@href='/direct/inbox/']",  # Link de mensagens
-                    "//svg[@aria-label='Home']",     # Ícone Home
-                    "//svg[@aria-label='New post']", # Ícone novo post
-                    "//*[@data-testid='app-header']"  # Header da app
-                ]
-                
-                for indicator in logged_indicators:
-                    try:
-                        element = WebDriverWait(self.driver, 3).until(
-                            EC.presence_of_element_located((By.XPATH, indicator))
-                        )
-                        if element:
-                            success = True
-                            break
-                    except:
-                        continue
-            except:
-                pass
+            if state.get('loginError'):
+                print(f"✗ Falha no login: {state['loginError']}")
+                return False
             
-            # Método 3: Verifica se não há campos de login visíveis
-            try:
-                login_fields = self.driver.find_elements(By.NAME, "username")
-                if not login_fields:
-                    success = True
-            except:
-                pass
+            current_url = self.driver.current_url
+            success = state.get('loggedIn') or (
+                not state.get('loginForm') and "login" not in current_url.lower() and "instagram.com" in current_url
+            )
             
             if success:
                 print("✓ Login realizado com sucesso!")
-                # Tenta dispensar notificações/popups
-                self.dismiss_popups()
                 return True
             else:
                 print("✗ Falha no login - verifique as credenciais")
@@ -292,39 +2053,165 @@ class InstagramScraper:
     def dismiss_popups(self):
         """Dispensa popups e notificações do Instagram"""
         print("Dispensando popups...")
+        self.settle_page(want=None)
+    
+    def settle_page(self, want="content", timeout=PAGE_SETTLE_TIMEOUT):
+        """Espera a página chegar a um estado útil, dispensando popups pelo caminho.
+
+        A cada volta uma única consulta (PAGE_STATE_JS) verifica ao mesmo tempo
+        botões de popup, indicadores de login, erro de login e conteúdo. Popups
+        são clicados assim que aparecem; a espera termina quando o estado pedido
+        (want: "logged_in", "content" ou None para qualquer um) foi atingido e a
+        página ficou PAGE_QUIET_SECONDS sem novos popups, quando há erro de login
+        ou quando o tempo acaba. Retorna o último estado lido.
+        """
+        deadline = time.time() + timeout
+        last_activity = time.time()
+        state = {}
         
-        try:
-            # Lista de possíveis textos de botões para dispensar
-            dismiss_texts = [
-                "Not Now", "Agora não", "Maybe Later", "Talvez depois",
-                "Not now", "agora não", "Cancel", "Cancelar"
-            ]
+        while True:
+            try:
+                state = self.driver.execute_script(PAGE_STATE_JS, DISMISS_TEXTS) or {}
+            except Exception:
+                state = {}
             
-            for text in dismiss_texts:
+            if state.get('dismiss') is not None:
                 try:
-                    button = WebDriverWait(self.driver, 3).until(
-                        EC.element_to_be_clickable((By.XPATH, f"//button[contains(text(), '{text}')]"))
-                    )
-                    button.click()
-                    print(f"✓ Popup dispensado: {text}")
-                    time.sleep(PAGE_LOAD_DELAY)
-                except:
+                    state['dismiss'].click()
+                    print(f"✓ Popup dispensado: {state.get('dismissText')}")
+                except Exception:
+                    pass
+                last_activity = time.time()
+            elif state.get('loginError'):
+                return state
+            else:
+                if want == "logged_in":
+                    reached = state.get('loggedIn') or (state and not state.get('loginForm') and "login" not in self.driver.current_url.lower())
+                elif want == "content":
+                    reached = state.get('content') or state.get('loginForm')
+                else:
+                    reached = bool(state)
+                if reached and time.time() - last_activity >= PAGE_QUIET_SECONDS:
+                    return state
+            
+            if time.time() >= deadline:
+                return state
+            time.sleep(0.2)
+    
+    def session_cache_path(self, username):
+        safe_name = re.sub(r'[^A-Za-z0-9._-]', '_', username)
+        return os.path.join(SESSION_DIRECTORY, f"{safe_name}.json")
+    
+    def save_session(self, username):
+        """Salva cookies e localStorage da conta logada para os próximos runs"""
+        try:
+            session = {
+                'saved_at': time.time(),
+                'cookies': self.driver.get_cookies(),
+                'local_storage': self.driver.execute_script("return Object.assign({}, window.localStorage);")
+            }
+            os.makedirs(SESSION_DIRECTORY, exist_ok=True)
+            path = self.session_cache_path(username)
+            fd, tmp_path = tempfile.mkstemp(prefix=".session.", suffix=".part", dir=SESSION_DIRECTORY)
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(session, f)
+            os.replace(tmp_path, path)  # mkstemp já cria o arquivo só com permissão do dono
+            print(f"💾 Sessão salva em {path}")
+        except Exception as e:
+            print(f"⚠️ Não foi possível salvar a sessão: {e}")
+    
+    def restore_session(self, username):
+        """Restaura a sessão salva da conta. Retorna True se ela ainda for válida"""
+        path = self.session_cache_path(username)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                session = json.load(f)
+        except (OSError, ValueError):
+            return False
+        
+        # Validação local: sem cookie de sessão (ou expirado) nem vale abrir a página
+        now = time.time()
+        session_cookie = next((c for c in session.get('cookies', []) if c.get('name') == 'sessionid'), None)
+        if not session_cookie or session_cookie.get('expiry', now + 1) <= now:
+            print("⚠️ Sessão salva expirada, fazendo login completo...")
+            self.discard_session(username)
+            return False
+        
+        print("🔑 Restaurando sessão salva...")
+        try:
+            # Página leve do domínio só para poder gravar cookies e localStorage
+            self.driver.get("https://www.instagram.com/robots.txt")
+            for cookie in session['cookies']:
+                try:
+                    self.driver.add_cookie(cookie)
+                except Exception:
                     continue
-                    
+            self.driver.execute_script(
+                "for (const [k, v] of Object.entries(arguments[0])) window.localStorage.setItem(k, v);",
+                session.get('local_storage') or {}
+            )
+            
+            self.driver.get("https://www.instagram.com/")
+            state = self.settle_page(want="logged_in")
+            valid = bool(state.get('loggedIn')) or (
+                bool(state) and not state.get('loginForm') and "login" not in self.driver.current_url.lower()
+            )
         except Exception as e:
-            print("Nenhum popup encontrado ou erro ao dispensar")
+            print(f"⚠️ Erro ao restaurar a sessão: {e}")
+            valid = False
+        
+        if valid:
+            print("✓ Sessão restaurada, login dispensado!")
+            return True
         
-        time.sleep(PAGE_LOAD_DELAY)
+        print("⚠️ Sessão salva não é mais válida, fazendo login completo...")
+        self.discard_session(username)
+        try:
+            self.driver.delete_all_cookies()
+        except Exception:
+            pass
+        return False
+    
+    def discard_session(self, username):
+        try:
+            os.remove(self.session_cache_path(username))
+        except OSError:
+            pass
+    
+    def ensure_logged_in(self, username, password):
+        """Reaproveita a sessão salva da conta; faz o login completo só quando ela expirou"""
+        if SESSION_CACHE_MODE and self.restore_session(username):
+            return True
+        
+        success = self.login_instagram(username, password)
+        if success and SESSION_CACHE_MODE:
+            self.save_session(username)
+        return success
     
     def load_downloaded_urls(self):
         """Carrega URLs já baixadas de arquivo para evitar duplicatas"""
+        if LEDGER_BACKEND == "sqlite":
+            if self.open_ledger():
+                if MEMBERSHIP_MODE == "compact":
+                    self.open_compact_membership()
+                return
+            print("⚠️  Usando o histórico em arquivo texto")
+        
+        if MEMBERSHIP_MODE == "compact" and self.open_compact_membership():
+            return
+        
         try:
             if os.path.exists(self.downloaded_urls_file):
                 with open(self.downloaded_urls_file, 'r', encoding='utf-8') as f:
-                    self.downloaded_urls = set(line.strip() for line in f if line.strip())
+                    entries = [line.strip() for line in f if line.strip()]
+                self.downloaded_urls = set(media_key(entry) for entry in entries)
+                
+                # Migração única: históricos antigos guardavam a URL assinada completa
+                if any(not entry.startswith(("ig:", "url:")) for entry in entries):
+                    self.migrate_downloaded_urls_file(len(entries))
                 
                 print(f"🔄 Sistema de recuperação ativo!")
-                print(f"📂 Carregadas {len(self.downloaded_urls)} URLs já baixadas anteriormente")
+                print(f"📂 Carregadas {len(self.downloaded_urls)} mídias já baixadas anteriormente")
                 
                 if len(self.downloaded_urls) > 0:
                     print(f"✅ O script vai PULAR imagens já baixadas e continuar de onde parou")
@@ -335,7 +2222,7 @@ class InstagramScraper:
                         print(f"📁 {len(image_files)} arquivos de imagem encontrados na pasta prints/")
                         
                         if len(image_files) != len(self.downloaded_urls):
-                            print(f"⚠️  Discrepância detectada: {len(self.downloaded_urls)} URLs vs {len(image_files)} arquivos")
+                            print(f"⚠️  Discrepância detectada: {len(self.downloaded_urls)} mídias vs {len(image_files)} arquivos")
                             print(f"   Isso é normal se algumas imagens falharam no download anteriormente")
                     except:
                         pass
@@ -349,28 +2236,135 @@ class InstagramScraper:
             print("⚠️  Continuando sem histórico - pode haver duplicatas")
             self.downloaded_urls = set()
     
-    def save_downloaded_url(self, url):
-        """Salva URL baixada no arquivo para controle de duplicatas"""
+    def open_ledger(self):
+        """Abre o registro SQLite (importando o downloaded_urls.txt antigo na primeira vez)"""
+        try:
+            self.ledger = DownloadLedger(LEDGER_DB_FILE, legacy_file=self.downloaded_urls_file,
+                                         batch_size=LEDGER_BATCH_SIZE, journal_mode=LEDGER_JOURNAL_MODE)
+            self.downloaded_urls = self.ledger
+            
+            count = self.ledger.approximate_count()
+            print(f"🔄 Sistema de recuperação ativo!")
+            print(f"📂 Registro de downloads: {LEDGER_DB_FILE} (~{count} mídias já baixadas)")
+            if count > 0:
+                print(f"✅ O script vai PULAR imagens já baixadas e continuar de onde parou")
+            return True
+        except Exception as e:
+            print(f"❌ Erro ao abrir o registro SQLite: {e}")
+            self.ledger = None
+            self.downloaded_urls = set()
+            return False
+    
+    def open_compact_membership(self):
+        """Substitui o conjunto em memória pelo índice compacto de hashes (mmap)"""
+        try:
+            start = time.time()
+            self.downloaded_urls = CompactMembership(
+                MEMBERSHIP_INDEX_FILE,
+                ledger=self.ledger,
+                text_file=None if self.ledger else self.downloaded_urls_file
+            )
+            print(f"🗜️  Índice compacto carregado: {len(self.downloaded_urls)} mídias em {time.time() - start:.2f}s ({MEMBERSHIP_INDEX_FILE})")
+            return True
+        except Exception as e:
+            print(f"⚠️  Erro ao carregar índice compacto, usando modo exato: {e}")
+            self.downloaded_urls = self.ledger if self.ledger else set()
+            return False
+    
+    def persist_membership_index(self):
+        """Grava no índice compacto as mídias baixadas nesta sessão"""
+        if isinstance(self.downloaded_urls, CompactMembership):
+            try:
+                self.downloaded_urls.flush()
+            except Exception as e:
+                print(f"⚠️  Erro ao gravar índice compacto: {e}")
+    
+    def open_phash_index(self):
+        """Inicia o índice de hashes perceptuais (detecção de quase-duplicatas), se ativado"""
+        if PHASH_MODE not in ("flag", "skip", "hardlink"):
+            return
+        try:
+            import PIL
+        except ImportError:
+            print("⚠️  PHASH_MODE requer a biblioteca Pillow (pip install Pillow) - detecção de quase-duplicatas desativada")
+            return
+        try:
+            self.phash_index = PerceptualHashIndex(PHASH_INDEX_FILE, PHASH_THRESHOLD, PHASH_MODE, PHASH_WORKERS, ledger=self.ledger)
+            print(f"🧬 Detecção de quase-duplicatas ativa (modo {PHASH_MODE}, distância <= {PHASH_THRESHOLD})")
+        except Exception as e:
+            print(f"⚠️  Erro ao abrir índice de hashes perceptuais: {e}")
+            self.phash_index = None
+    
+    def close_phash_index(self):
+        """Aguarda os hashes perceptuais pendentes e fecha o índice"""
+        if self.phash_index:
+            phash_index = self.phash_index
+            self.phash_index = None
+            phash_index.close()
+            if phash_index.near_duplicates:
+                print(f"🧬 {phash_index.near_duplicates} quase-duplicatas encontradas nesta sessão")
+    
+    def flush_history(self):
+        """Grava em disco os registros de download pendentes (modo SQLite)"""
+        if self.ledger:
+            try:
+                self.ledger.flush()
+            except Exception as e:
+                print(f"⚠️  Erro ao gravar registro de downloads: {e}")
+    
+    def migrate_downloaded_urls_file(self, old_count):
+        """Reescreve o histórico com chaves canônicas, mantendo um backup do arquivo original"""
+        try:
+            backup_file = self.downloaded_urls_file + ".bak"
+            if not os.path.exists(backup_file):
+                os.replace(self.downloaded_urls_file, backup_file)
+            
+            tmp_file = self.downloaded_urls_file + ".tmp"
+            with open(tmp_file, 'w', encoding='utf-8') as f:
+                for key in sorted(self.downloaded_urls):
+                    f.write(key + '\n')
+            os.replace(tmp_file, self.downloaded_urls_file)
+            
+            print(f"🔁 Histórico migrado para chaves de mídia: {old_count} URLs -> {len(self.downloaded_urls)} mídias únicas")
+            print(f"   Backup do arquivo original: {backup_file}")
+        except Exception as e:
+            print(f"⚠️  Erro ao migrar histórico (continuando com as chaves em memória): {e}")
+    
+    def save_downloaded_url(self, url, file_path=None, size=None, profile=None):
+        """Salva a chave da mídia baixada no arquivo para controle de duplicatas"""
         try:
-            self.downloaded_urls.add(url)
-            with open(self.downloaded_urls_file, 'a', encoding='utf-8') as f:
-                f.write(url + '\n')
+            key = media_key(url)
+            if self.ledger:
+                self.ledger.add(key, profile=profile or self.current_profile, url=url, file_path=file_path, size=size)
+                if self.downloaded_urls is not self.ledger:
+                    self.downloaded_urls.add(key)
+                return
+            
+            # Os workers de download chamam este método em paralelo
+            with self.history_lock:
+                self.downloaded_urls.add(key)
+                with open(self.downloaded_urls_file, 'a', encoding='utf-8') as f:
+                    f.write(key + '\n')
         except Exception as e:
             print(f"Erro ao salvar URL: {e}")
     
     def count_elements_detailed(self):
         """Conta elementos usando múltiplos seletores e retorna detalhes"""
-        selectors_data = {
-            "articles": "article",
-            "post_links": "a[href*='/p/']", 
-            "images": "article img",
-            "grid_items": "div._aagw",
-            "media_containers": "div._aagu"
-        }
+        selectors_data = FEED_COUNT_SELECTORS
         
         counts = {}
         total_max = 0
         
+        # Modo delta: contagens mantidas pelo rastreador no navegador (sem varrer o documento)
+        if self.feed_tracking_enabled():
+            try:
+                tracked = self.driver.execute_script("return window.__igFeedTracker ? window.__igFeedTracker.counts : null")
+                if tracked:
+                    counts = {name: int(tracked.get(name, 0)) for name in selectors_data}
+                    return max(counts.values(), default=0), counts
+            except Exception:
+                pass
+        
         for name, selector in selectors_data.items():
             try:
                 elements = self.driver.find_elements(By.CSS_SELECTOR, selector)
@@ -382,26 +2376,218 @@ class InstagramScraper:
         
         return total_max, counts
 
+    def feed_tracking_enabled(self):
+        """Indica se o processamento incremental (só nós novos) está ativo"""
+        return EXTRACTION_MODE == "script" and FEED_TRACKING_MODE == "delta"
+    
+    def install_feed_tracker(self):
+        """Instala o rastreador de inserções do feed na página atual (modo delta)"""
+        if not self.feed_tracking_enabled():
+            return False
+        try:
+            self.driver.execute_script(FEED_TRACKER_JS, ", ".join(FEED_IMAGE_SELECTORS), FEED_COUNT_SELECTORS)
+            return True
+        except Exception as e:
+            print(f"⚠️  Erro ao instalar rastreador do feed: {e}")
+            return False
+    
+    def collect_feed_candidates(self):
+        """Coleta todos os candidatos a imagem do feed com uma única chamada JavaScript"""
+        try:
+            candidates = self.driver.execute_script(FEED_CANDIDATES_JS, ", ".join(FEED_IMAGE_SELECTORS), DOM_PRUNE_MODE)
+            return candidates or []
+        except Exception as e:
+            print(f"   ⚠️  Erro na extração via script: {e}")
+            return []
+    
+    def collect_new_feed_candidates(self):
+        """Coleta só os candidatos inseridos desde o último scroll (modo delta)"""
+        try:
+            candidates = self.driver.execute_script(FEED_DELTA_JS, DOM_PRUNE_MODE)
+            if candidates is not None:
+                return candidates
+            # Rastreador perdido (página recarregada): reinstala e processa a página inteira
+            self.install_feed_tracker()
+            return self.driver.execute_script(FEED_DELTA_JS, DOM_PRUNE_MODE) or []
+        except Exception as e:
+            print(f"   ⚠️  Erro na extração incremental, usando a página inteira: {e}")
+            return self.collect_feed_candidates()
+
+    def check_basic_filters(self, src, alt):
+        """Aplica os filtros básicos de URL/alt. Retorna 'skip', 'reel' ou None se passou"""
+        if not (src and 'instagram' in src):
+            return 'skip'
+
+        # Exclui imagens de perfil, stories, etc.
+        basic_excludes = ['profile', 'story', 'avatar', 'highlight']
+        if any(exclude in src.lower() for exclude in basic_excludes):
+            return 'skip'
+        if any(exclude in alt.lower() for exclude in basic_excludes):
+            return 'skip'
+
+        # Filtro específico para URLs de reels/vídeos
+        reel_url_patterns = ['/reel/', '/clips/', '/tv/', 'video', 'reel']
+        if any(pattern in src.lower() for pattern in reel_url_patterns):
+            return 'reel'
+
+        return None
+
+    def get_high_res_url(self, src, srcset=""):
+        """Retorna a URL de maior resolução disponível (srcset ou src sem tamanho reduzido)"""
+        best_url, best_width = None, 0
+        for entry in (srcset or "").split(','):
+            parts = entry.strip().split()
+            if len(parts) == 2 and parts[1].endswith('w'):
+                try:
+                    width = int(parts[1][:-1])
+                except ValueError:
+                    continue
+                if width > best_width:
+                    best_url, best_width = parts[0], width
+        if best_url:
+            return best_url
+        return src.replace('150x150/', '').replace('240x240/', '').replace('320x320/', '')
+
+    def reset_known_streak(self):
+        self.known_streak = 0
+        self.streak_keys = set()
+    
+    def track_known_streak(self, key, known, pinned=False):
+        """Conta as mídias seguidas já baixadas (modo incremental).
+
+        Cada mídia conta uma vez só, na primeira vez em que aparece (os modos que
+        releem a página inteira a cada scroll veem as mesmas imagens de novo, já
+        baixadas). Posts fixados ficam no topo do perfil fora da ordem
+        cronológica, então não contam nem zeram a sequência; vídeos também não.
+        """
+        if pinned or key in self.streak_keys:
+            return
+        self.streak_keys.add(key)
+        self.known_streak = self.known_streak + 1 if known else 0
+    
+    def reached_known_content(self):
+        """Modo incremental: True depois de INCREMENTAL_STOP_AFTER mídias seguidas já baixadas"""
+        return INCREMENTAL_MODE and self.known_streak >= INCREMENTAL_STOP_AFTER
+    
+    def filter_feed_candidates(self, candidates, images_found):
+        """Filtra em Python os candidatos coletados pelo script.
+
+        Retorna (novas_imagens, ja_baixadas, reels_ignorados).
+        """
+        new_images = []
+        already_downloaded = 0
+        reels_skipped = 0
+
+        for candidate in candidates:
+            src = candidate.get('src') or ""
+            alt = candidate.get('alt') or ""
+
+            verdict = self.check_basic_filters(src, alt)
+            if verdict == 'skip':
+                continue
+            if verdict == 'reel':
+                reels_skipped += 1
+                continue
+
+            key = media_key(src)
+            if key in images_found:
+                continue
+
+            if key in self.downloaded_urls:
+                already_downloaded += 1
+                self.track_known_streak(key, True, candidate.get('pinned'))
+                continue
+
+            # Veredito do classificador executado no navegador
+            if candidate.get('verdict', 'photo') != 'photo':
+                reels_skipped += 1
+                continue
+
+            self.track_known_streak(key, False, candidate.get('pinned'))
+            images_found.add(key)
+            new_images.append(self.get_high_res_url(src, candidate.get('srcset')))
+
+        return new_images, already_downloaded, reels_skipped
+
+    def filter_network_media(self, records, images_found):
+        """Filtra as mídias capturadas da rede. Retorna (novas_imagens, ja_baixadas, videos_ignorados)
+
+        As respostas JSON da página também trazem stories, sugestões e posts de
+        outras contas: só ficam os posts do perfil atual, com os mesmos filtros
+        de URL do modo DOM.
+        """
+        new_images = []
+        already_downloaded = 0
+        videos_skipped = 0
+        
+        for record in records:
+            if record.get('is_story'):
+                continue
+            owners = [owner.lower() for owner in record.get('owners') or []]
+            if owners and self.current_profile and self.current_profile not in owners:
+                continue
+            
+            verdict = self.check_basic_filters(record['url'], "")
+            if verdict == 'skip':
+                continue
+            if record['media_type'] != 'photo' or verdict == 'reel':
+                videos_skipped += 1
+                continue
+            
+            key = media_key(record['url'])
+            if key in images_found:
+                continue
+            if key in self.downloaded_urls:
+                already_downloaded += 1
+                self.track_known_streak(key, True, record.get('is_pinned'))
+                continue
+            
+            self.track_known_streak(key, False, record.get('is_pinned'))
+            images_found.add(key)
+            new_images.append(record['url'])
+        
+        return new_images, already_downloaded, videos_skipped
+    
+    def filename_prefix(self):
+        """Prefixo dos nomes de arquivo: perfil e data/hora.
+
+        O perfil diferencia abas e workers que baixam no mesmo segundo com o
+        mesmo número de scroll (a data só vai até os segundos).
+        """
+        date_str = datetime.now().strftime("%Y%m%d_%H%M%S")
+        if not self.current_profile:
+            return date_str
+        safe_name = re.sub(r'[^A-Za-z0-9._-]', '_', self.current_profile)
+        return f"{safe_name}_{date_str}"
+    
     def extract_and_download_new_images(self, scroll_count):
         """Extrai e baixa novas imagens encontradas no scroll atual"""
         print(f"   🖼️  Procurando novas imagens...")
-        
+
         # Extrai imagens da área visível atual
         new_images = []
         images_found_this_round = set()
-        
-        # Seletores para imagens no feed
-        image_selectors = [
-            "article img",
-            "div._aagw img", 
-            "img[style*='object-fit']",
-            "div._aagu img",
-            "div._aagv img"
-        ]
-        
+
         reels_skipped_this_round = 0
         already_downloaded_this_round = 0
-        
+
+        if self.network_capture and self.network_capture.capture_feed:
+            # Modo rede: mídias vêm das respostas JSON do feed, não do DOM
+            records = self.network_capture.drain()
+            new_images, already_downloaded_this_round, reels_skipped_this_round = \
+                self.filter_network_media(records, images_found_this_round)
+            image_selectors = []
+        elif EXTRACTION_MODE == "script":
+            if self.feed_tracking_enabled():
+                candidates = self.collect_new_feed_candidates()
+            else:
+                candidates = self.collect_feed_candidates()
+            new_images, already_downloaded_this_round, reels_skipped_this_round = \
+                self.filter_feed_candidates(candidates, images_found_this_round)
+            image_selectors = []
+        else:
+            image_selectors = FEED_IMAGE_SELECTORS
+
         for selector in image_selectors:
             try:
                 img_elements = self.driver.find_elements(By.CSS_SELECTOR, selector)
@@ -411,46 +2597,36 @@ class InstagramScraper:
                         src = img.get_attribute('src')
                         alt = img.get_attribute('alt') or ""
                         
-                        # Filtros básicos
-                        if not (src and 'instagram' in src):
-                            continue
-                            
-                        # Exclui imagens de perfil, stories, etc.
-                        basic_excludes = ['profile', 'story', 'avatar', 'highlight']
-                        if any(exclude in src.lower() for exclude in basic_excludes):
-                            continue
-                        if any(exclude in alt.lower() for exclude in basic_excludes):
+                        # Filtros básicos (perfil, stories, URLs de reels/vídeos)
+                        verdict = self.check_basic_filters(src, alt)
+                        if verdict == 'skip':
                             continue
-                            
-                        # Filtro específico para URLs de reels/vídeos
-                        reel_url_patterns = ['/reel/', '/clips/', '/tv/', 'video', 'reel']
-                        if any(pattern in src.lower() for pattern in reel_url_patterns):
+                        if verdict == 'reel':
                             reels_skipped_this_round += 1
                             continue
                             
                         # Verifica se já foi processada nesta sessão
-                        if src in images_found_this_round:
+                        key = media_key(src)
+                        if key in images_found_this_round:
                             continue
                         
                         # IMPORTANTE: Verifica se já foi baixada anteriormente
-                        if src in self.downloaded_urls:
+                        if key in self.downloaded_urls:
                             already_downloaded_this_round += 1
+                            self.track_known_streak(key, True)
                             continue
                         
-                        # Verifica se é reel ou vídeo
-                        if self.is_reel_or_video(img):
-                            reels_skipped_this_round += 1
-                            continue
-                        
-                        # Verifica se o link da postagem é de reel
-                        if self.has_reel_link_nearby(img):
+                        # Verifica se é reel ou vídeo (thumbnail ou link próximo)
+                        verdict, reason = self.classify_media_element(img)
+                        if verdict != 'photo':
                             reels_skipped_this_round += 1
                             continue
                         
+                        self.track_known_streak(key, False)
                         # Pega a URL da imagem em alta resolução se possível
                         high_res_src = src.replace('150x150/', '').replace('240x240/', '').replace('320x320/', '')
                         
-                        images_found_this_round.add(src)
+                        images_found_this_round.add(key)
                         new_images.append(high_res_src)
                             
                     except Exception as e:
@@ -473,20 +2649,21 @@ class InstagramScraper:
         
         # Baixa as novas imagens encontradas
         if new_images:
-            successful_downloads = 0
+            # Cria nome do arquivo com perfil, timestamp e número do scroll
+            prefix = self.filename_prefix()
+            jobs = []
             for i, img_url in enumerate(new_images):
-                # Cria nome do arquivo com timestamp e número do scroll
-                current_date = datetime.now()
-                date_str = current_date.strftime("%Y%m%d_%H%M%S")
-                filename = f"{date_str}_scroll{scroll_count:02d}_img{i+1:03d}.jpg"
-                
-                print(f"      💾 Baixando {i+1}/{len(new_images)}: {filename}")
-                
-                if self.download_image(img_url, filename):
-                    successful_downloads += 1
-                
-                # Pequena pausa entre downloads
-                time.sleep(DOWNLOAD_DELAY)
+                filename = f"{prefix}_scroll{scroll_count:02d}_img{i+1:03d}.jpg"
+                jobs.append((img_url, filename, f"      💾 Baixando {i+1}/{len(new_images)}: {filename}"))
+            jobs = self.attach_browser_bodies(jobs)
+            
+            if self.pipeline:
+                # Modo pipeline: só enfileira, os workers baixam enquanto o scroll continua
+                queued = self.pipeline.submit_all(jobs)
+                print(f"   📤 {queued} imagens enviadas para a fila de download")
+                return queued
+            
+            successful_downloads = self.download_images_batch(jobs)
             
             print(f"   ✅ {successful_downloads}/{len(new_images)} imagens baixadas com sucesso")
             return successful_downloads
@@ -497,30 +2674,200 @@ class InstagramScraper:
                 print(f"   ℹ️  Nenhuma imagem encontrada neste scroll")
             return 0
 
+    def prune_processed_posts(self):
+        """Troca os posts já processados bem acima da tela por placeholders (DOM_PRUNE_MODE)"""
+        if not DOM_PRUNE_MODE:
+            return 0
+        # No modo rede (ou no híbrido) o Python não lê o DOM: qualquer imagem já fora da tela serve
+        require_seen = EXTRACTION_MODE == "script" and not (self.network_capture and self.network_capture.capture_feed) \
+            and CRAWL_MODE != "hybrid"
+        try:
+            pruned = self.driver.execute_script(
+                PRUNE_FEED_JS, ", ".join(FEED_IMAGE_SELECTORS), DOM_PRUNE_MARGIN, require_seen
+            )
+        except Exception as e:
+            print(f"   ⚠️  Erro ao podar posts processados: {e}")
+            return 0
+        if pruned:
+            print(f"   🧹 {pruned} imagens já processadas liberadas da página")
+        return pruned
+    
+    def current_scroll_timeout(self):
+        """Tempo máximo de espera por novo conteúdo, adaptado às latências já observadas"""
+        if len(self.scroll_latencies) < 3:
+            return SCROLL_WAIT_MAX
+        latencies = sorted(self.scroll_latencies)
+        p90 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.9))]
+        return min(max(p90 * 3, SCROLL_WAIT_MIN), SCROLL_WAIT_MAX)
+    
+    def scroll_and_wait(self, previous_height, scroll="bottom"):
+        """Rola a página e retorna a nova altura assim que o feed crescer (ou o tempo acabar)"""
+        timeout = self.current_scroll_timeout()
+        try:
+            self.driver.set_script_timeout(timeout + 5)
+            result = self.driver.execute_async_script(
+                SCROLL_AND_WAIT_JS, previous_height, int(timeout * 1000), scroll, SCROLL_SETTLE_MS
+            )
+        except Exception as e:
+            print(f"   ⚠️  Erro na espera por eventos, usando pausa fixa: {e}")
+            time.sleep(SCROLL_DELAY)
+            return self.driver.execute_script("return document.body.scrollHeight")
+        
+        if result.get('ready'):
+            self.scroll_latencies.append(result['elapsed'])
+            print(f"   ⚡ Novo conteúdo em {result['elapsed']:.2f}s")
+        else:
+            print(f"   ⌛ Sem novo conteúdo após {result['elapsed']:.1f}s")
+        return result['height']
+    
+    def page_shortcodes(self):
+        """Shortcodes dos posts presentes na página, na ordem do feed"""
+        return self.driver.execute_script(HARVEST_SHORTCODES_JS, FEED_COUNT_SELECTORS["post_links"]) or []
+    
+    def checkpoint_path(self, profile):
+        safe_name = re.sub(r'[^A-Za-z0-9._-]', '_', profile)
+        return os.path.join(CHECKPOINT_DIRECTORY, f"{safe_name}.json")
+    
+    def save_checkpoint(self, mode, **state):
+        """Registra até onde o perfil foi processado (último post, scrolls, cursor) para retomar após uma queda.
+
+        O checkpoint nunca aponta além do que já está salvo em disco: no modo
+        pipeline ele fica pendente até os downloads enfileirados antes dele
+        terminarem e é gravado por write_ready_checkpoints() num scroll seguinte,
+        sem parar o scroll para esvaziar a fila.
+        """
+        if not CHECKPOINT_MODE:
+            return
+        mark = self.pipeline.submitted if self.pipeline else 0
+        self.pending_checkpoints.append((mark, dict(state, profile=self.current_profile, mode=mode)))
+        self.write_ready_checkpoints()
+    
+    def write_ready_checkpoints(self):
+        """Grava o checkpoint pendente mais recente cujos downloads anteriores já terminaram"""
+        finished = self.pipeline.finished_through() if self.pipeline else float('inf')
+        ready = [state for mark, state in self.pending_checkpoints if mark <= finished]
+        if not ready:
+            return
+        self.pending_checkpoints = [(mark, state) for mark, state in self.pending_checkpoints if mark > finished]
+        checkpoint = dict(ready[-1], saved_at=time.time())
+        try:
+            self.flush_history()
+            os.makedirs(CHECKPOINT_DIRECTORY, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(prefix=".checkpoint.", suffix=".part", dir=CHECKPOINT_DIRECTORY)
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(checkpoint, f)
+            os.replace(tmp_path, self.checkpoint_path(checkpoint['profile']))
+            print(f"   📌 Checkpoint salvo (post {checkpoint.get('shortcode')})")
+        except Exception as e:
+            print(f"   ⚠️  Não foi possível salvar o checkpoint: {e}")
+    
+    def load_checkpoint(self, mode):
+        """Checkpoint de uma execução interrompida deste perfil no mesmo modo (ou None)"""
+        if not CHECKPOINT_MODE:
+            return None
+        try:
+            with open(self.checkpoint_path(self.current_profile), 'r', encoding='utf-8') as f:
+                checkpoint = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if checkpoint.get('mode') != mode:
+            return None
+        saved = datetime.fromtimestamp(checkpoint.get('saved_at', 0)).strftime("%d/%m/%Y %H:%M")
+        print(f"📌 Checkpoint encontrado (salvo em {saved}): a execução anterior foi interrompida")
+        return checkpoint
+    
+    def clear_checkpoint(self):
+        """Remove o checkpoint do perfil atual (chamado quando o perfil termina)"""
+        self.pending_checkpoints = [(mark, state) for mark, state in self.pending_checkpoints
+                                    if state['profile'] != self.current_profile]
+        try:
+            os.remove(self.checkpoint_path(self.current_profile))
+        except OSError:
+            pass
+    
+    def fast_forward(self, checkpoint):
+        """Retoma um perfil interrompido: rola sem extrair nada até o post do checkpoint aparecer.
+
+        As imagens que passam durante o avanço continuam no DOM (e no rastreador do
+        feed), então o primeiro scroll normal ainda vê os posts ao redor do
+        checkpoint. Retorna o número do scroll do checkpoint, ou 0 se o post não
+        foi encontrado (ex: foi apagado) e o perfil recomeça do topo.
+        """
+        target = checkpoint.get('shortcode')
+        print(f"⏩ Avançando até o post {target} (scroll #{checkpoint.get('scroll_count', 0)} da execução anterior)...")
+        started = time.time()
+        last_height = self.driver.execute_script("return document.body.scrollHeight")
+        no_change_count = 0
+        scrolls = 0
+        
+        while no_change_count < 5:
+            if target in self.page_shortcodes():
+                print(f"✓ Checkpoint alcançado em {scrolls} scrolls ({time.time() - started:.1f}s)")
+                return checkpoint.get('scroll_count', 0)
+            
+            scrolls += 1
+            scroll = "by" if no_change_count >= 3 else "bottom"
+            if SCROLL_WAIT_MODE == "event":
+                new_height = self.scroll_and_wait(last_height, scroll=scroll)
+            else:
+                if scroll == "by":
+                    self.driver.execute_script("window.scrollBy(0, 1000);")
+                else:
+                    self.driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
+                time.sleep(SCROLL_DELAY)
+                new_height = self.driver.execute_script("return document.body.scrollHeight")
+            
+            if DOM_PRUNE_MODE:
+                # Tudo acima do checkpoint já foi processado antes da queda
+                try:
+                    self.driver.execute_script(PRUNE_FEED_JS, ", ".join(FEED_IMAGE_SELECTORS), DOM_PRUNE_MARGIN, False)
+                except Exception:
+                    pass
+            
+            no_change_count = no_change_count + 1 if new_height == last_height else 0
+            last_height = new_height
+        
+        print("⚠️  Post do checkpoint não encontrado (apagado?): recomeçando do topo")
+        self.clear_checkpoint()
+        self.driver.refresh()
+        self.settle_page(want="content")
+        self.install_feed_tracker()
+        return 0
+    
     def scroll_and_download_incremental(self):
         """Rola a página e baixa imagens incrementalmente"""
         print("🚀 Iniciando scroll e download incremental...")
         
+        scroll_count = 0
+        checkpoint = self.load_checkpoint("browser")
+        if checkpoint and checkpoint.get('shortcode'):
+            scroll_count = self.fast_forward(checkpoint)
+        
         last_height = self.driver.execute_script("return document.body.scrollHeight")
         posts_loaded = 0
         no_change_count = 0
         max_no_change = 5  # Máximo de tentativas sem mudança
-        scroll_count = 0
         total_downloads = 0
+        self.reset_known_streak()
         
         while True:
             scroll_count += 1
             print(f"\n🔄 Scroll #{scroll_count}")
             
-            # Rola até o final da página
-            self.driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
-            
-            # Aguarda o carregamento
-            print("   ⏳ Aguardando carregamento...")
-            time.sleep(4)
-            
-            # Verifica se há mais conteúdo para carregar
-            new_height = self.driver.execute_script("return document.body.scrollHeight")
+            if SCROLL_WAIT_MODE == "event":
+                # Rola e espera só até o novo conteúdo aparecer
+                print("   ⏳ Aguardando novo conteúdo...")
+                new_height = self.scroll_and_wait(last_height)
+            else:
+                # Rola até o final da página
+                self.driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
+                
+                # Aguarda o carregamento
+                print("   ⏳ Aguardando carregamento...")
+                time.sleep(4)
+                
+                # Verifica se há mais conteúdo para carregar
+                new_height = self.driver.execute_script("return document.body.scrollHeight")
             print(f"   📏 Altura da página: {new_height}px (anterior: {last_height}px)")
             
             # Conta elementos com detalhes
@@ -535,10 +2882,18 @@ class InstagramScraper:
             try:
                 downloads_this_round = self.extract_and_download_new_images(scroll_count)
                 total_downloads += downloads_this_round
-                print(f"   📊 Total baixado até agora: {total_downloads} imagens")
+                if self.pipeline:
+                    print(f"   📊 Total enfileirado até agora: {total_downloads} imagens ({self.pipeline.completed} já baixadas)")
+                else:
+                    print(f"   📊 Total baixado até agora: {total_downloads} imagens")
             except Exception as e:
                 print(f"   ❌ Erro ao baixar imagens neste scroll: {e}")
             
+            # Modo incremental: daqui para baixo o feed já está arquivado
+            if self.reached_known_content():
+                print(f"✓ {self.known_streak} mídias seguidas já baixadas: sem posts novos além deste ponto")
+                break
+            
             if current_posts > posts_loaded:
                 increment = current_posts - posts_loaded
                 print(f"   ✅ +{increment} novos elementos! Total: {current_posts}")
@@ -558,9 +2913,12 @@ class InstagramScraper:
                 # Tenta rolar mais algumas vezes para garantir
                 print("   🔄 Tentando scroll adicional...")
                 for i in range(3):
-                    self.driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
-                    time.sleep(3)
-                    newer_height = self.driver.execute_script("return document.body.scrollHeight")
+                    if SCROLL_WAIT_MODE == "event":
+                        newer_height = self.scroll_and_wait(new_height)
+                    else:
+                        self.driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
+                        time.sleep(3)
+                        newer_height = self.driver.execute_script("return document.body.scrollHeight")
                     if newer_height > new_height:
                         new_height = newer_height
                         print(f"   ✅ Nova altura detectada: {newer_height}px")
@@ -569,8 +2927,11 @@ class InstagramScraper:
                 else:
                     # Se nenhuma tentativa funcionou, força scroll adicional
                     print("   🚀 Forçando scroll adicional...")
-                    self.driver.execute_script("window.scrollBy(0, 1000);")
-                    time.sleep(SCROLL_DELAY)
+                    if SCROLL_WAIT_MODE == "event":
+                        self.scroll_and_wait(new_height, scroll="by")
+                    else:
+                        self.driver.execute_script("window.scrollBy(0, 1000);")
+                        time.sleep(SCROLL_DELAY)
             else:
                 height_diff = new_height - last_height
                 print(f"   ✅ Página cresceu +{height_diff}px")
@@ -578,6 +2939,20 @@ class InstagramScraper:
             
             last_height = new_height
             
+            # Grava os downloads deste scroll no registro em uma transação
+            self.flush_history()
+            
+            # Libera da página os posts já entregues à fila de download
+            self.prune_processed_posts()
+            
+            # Checkpoint periódico: uma queda não obriga a rolar o feed de novo desde o topo
+            if CHECKPOINT_MODE and scroll_count % CHECKPOINT_INTERVAL == 0:
+                shortcodes = self.page_shortcodes()
+                if shortcodes:
+                    self.save_checkpoint("browser", shortcode=shortcodes[-1], scroll_count=scroll_count)
+            else:
+                self.write_ready_checkpoints()
+            
             # Verifica se atingiu o limite de "end of posts"
             try:
                 end_messages = self.driver.find_elements(By.XPATH, "//*[contains(text(), 'You've seen all') or contains(text(), 'Você viu todas')]")
@@ -587,6 +2962,14 @@ class InstagramScraper:
             except:
                 pass
         
+        if self.pipeline:
+            print("\n⏳ Aguardando a fila de downloads terminar...")
+            completed_before = self.pipeline.completed
+            self.pipeline.flush()
+            print(f"   ✅ {self.pipeline.completed - completed_before} downloads concluídos após o fim do scroll")
+            total_downloads = self.pipeline.completed
+        self.clear_checkpoint()
+        
         print(f"\n🏁 Scroll e download completos!")
         print(f"📊 Estatísticas finais:")
         final_count, final_details = self.count_elements_detailed()
@@ -598,92 +2981,30 @@ class InstagramScraper:
         
         return final_count, total_downloads
     
-    def is_reel_or_video(self, img_element):
-        """Verifica se a imagem é thumbnail de reel ou vídeo"""
-        try:
-            # Verifica o elemento pai e elementos próximos para identificar reels
-            parent = img_element.find_element(By.XPATH, "./..")
-            grandparent = parent.find_element(By.XPATH, "./..")
-            
-            # Procura por indicadores de vídeo/reel no HTML próximo
-            parent_html = parent.get_attribute('outerHTML').lower()
-            grandparent_html = grandparent.get_attribute('outerHTML').lower()
-            
-            # Indicadores de que é um reel/vídeo
-            video_indicators = [
-                'reel', 'video', 'play', 'duration', 'clip',
-                'svg', 'play-button', 'video-player', 'media-video'
-            ]
-            
-            # Verifica se há indicadores de vídeo no HTML dos elementos pais
-            for indicator in video_indicators:
-                if indicator in parent_html or indicator in grandparent_html:
-                    return True
-            
-            # Verifica se há elementos SVG (ícone de play) próximos
-            try:
-                svg_elements = grandparent.find_elements(By.TAG_NAME, "svg")
-                if svg_elements:
-                    return True
-            except:
-                pass
-            
-            # Verifica se há span com texto indicando duração
-            try:
-                spans = grandparent.find_elements(By.TAG_NAME, "span")
-                for span in spans:
-                    text = span.text.strip()
-                    # Procura por padrão de duração (ex: "0:15", "1:23")
-                    if re.match(r'\d+:\d+', text):
-                        return True
-            except:
-                pass
-                
-            return False
-            
-        except Exception as e:
-            return False
-    
-    def has_reel_link_nearby(self, img_element):
-        """Verifica se há links de reel próximos à imagem"""
+    def classify_media_element(self, img_element):
+        """Classifica uma imagem como 'photo', 'reel' ou 'video' em uma única chamada ao navegador"""
         try:
-            # Procura por elementos <a> próximos que podem conter links de reel
-            parent = img_element.find_element(By.XPATH, "./..")
-            grandparent = parent.find_element(By.XPATH, "./..")
-            
-            # Procura por links em elementos pais
-            for ancestor in [parent, grandparent]:
-                try:
-                    links = ancestor.find_elements(By.TAG_NAME, "a")
-                    for link in links:
-                        href = link.get_attribute('href') or ""
-                        if any(pattern in href.lower() for pattern in ['/reel/', '/reels/', '/tv/', 'reel']):
-                            return True
-                except:
-                    continue
-            
-            return False
-            
+            result = self.driver.execute_script(CLASSIFY_ELEMENT_JS, img_element)
+            return result.get('verdict', 'photo'), result.get('reason', '')
         except Exception as e:
-            return False
+            return 'photo', ''
     
     def extract_images_from_feed(self):
         """Extrai todas as imagens diretamente do feed, excluindo reels e vídeos"""
         print("Extraindo imagens do feed (excluindo reels/vídeos)...")
         
-        # Seletores para imagens no feed
-        image_selectors = [
-            "article img",
-            "div._aagw img", 
-            "img[style*='object-fit']",
-            "div._aagu img",
-            "div._aagv img"
-        ]
-        
         all_images = []
         images_found = set()  # Para evitar duplicatas
         reels_skipped = 0
         
+        if EXTRACTION_MODE == "script":
+            candidates = self.collect_feed_candidates()
+            print(f"Encontrados {len(candidates)} candidatos via script")
+            all_images, _, reels_skipped = self.filter_feed_candidates(candidates, images_found)
+            image_selectors = []
+        else:
+            image_selectors = FEED_IMAGE_SELECTORS
+        
         for selector in image_selectors:
             try:
                 img_elements = self.driver.find_elements(By.CSS_SELECTOR, selector)
@@ -694,51 +3015,36 @@ class InstagramScraper:
                         src = img.get_attribute('src')
                         alt = img.get_attribute('alt') or ""
                         
-                        # Filtros básicos
-                        if not (src and 'instagram' in src):
+                        # Filtros básicos (perfil, stories, URLs de reels/vídeos)
+                        verdict = self.check_basic_filters(src, alt)
+                        if verdict == 'skip':
                             continue
-                            
-                        # Exclui imagens de perfil, stories, etc.
-                        basic_excludes = ['profile', 'story', 'avatar', 'highlight']
-                        if any(exclude in src.lower() for exclude in basic_excludes):
-                            continue
-                        if any(exclude in alt.lower() for exclude in basic_excludes):
-                            continue
-                            
-                        # NOVO: Filtro específico para URLs de reels/vídeos
-                        reel_url_patterns = [
-                            '/reel/', '/clips/', '/tv/', 'video', 'reel'
-                        ]
-                        if any(pattern in src.lower() for pattern in reel_url_patterns):
+                        if verdict == 'reel':
                             reels_skipped += 1
                             print(f"⏭️  Reel ignorado (URL pattern)")
                             continue
                             
                         # Verifica se já foi processada nesta sessão
-                        if src in images_found:
+                        key = media_key(src)
+                        if key in images_found:
                             continue
                         
                         # NOVO: Verifica se já foi baixada anteriormente
-                        if src in self.downloaded_urls:
+                        if key in self.downloaded_urls:
                             print(f"🔄 Imagem já baixada anteriormente, pulando...")
                             continue
                         
-                        # NOVO: Verifica se é reel ou vídeo
-                        if self.is_reel_or_video(img):
+                        # NOVO: Verifica se é reel ou vídeo (thumbnail ou link próximo)
+                        verdict, reason = self.classify_media_element(img)
+                        if verdict != 'photo':
                             reels_skipped += 1
-                            print(f"⏭️  Reel/vídeo ignorado (thumbnail)")
-                            continue
-                        
-                        # NOVO: Verifica se o link da postagem é de reel
-                        if self.has_reel_link_nearby(img):
-                            reels_skipped += 1
-                            print(f"⏭️  Reel ignorado (link detectado)")
+                            print(f"⏭️  {verdict.capitalize()} ignorado ({reason})")
                             continue
                         
                         # Pega a URL da imagem em alta resolução se possível
                         high_res_src = src.replace('150x150/', '').replace('240x240/', '').replace('320x320/', '')
                         
-                        images_found.add(src)
+                        images_found.add(key)
                         all_images.append(high_res_src)
                         print(f"✓ Imagem válida adicionada")
                             
@@ -784,72 +3090,629 @@ class InstagramScraper:
         """Retorna a data atual para naming das imagens"""
         return datetime.now()
     
-    def download_image(self, img_url, filename):
-        """Baixa uma imagem específica"""
+    def download_image(self, img_url, filename, body=None, profile=None):
+        """Baixa uma imagem específica (ou grava os bytes já carregados pelo navegador)"""
+        claimed = False
         try:
             # Verifica novamente se não foi baixada (double check)
-            if img_url in self.downloaded_urls:
+            if media_key(img_url) in self.downloaded_urls:
                 print(f"🔄 {filename} - já baixada anteriormente")
                 return True
             
-            headers = {
-                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
-            }
-            
-            response = requests.get(img_url, headers=headers, timeout=30)
-            response.raise_for_status()
+            # Fila distribuída: reserva a mídia no registro compartilhado antes de baixar
+            if self.worker_id and self.ledger:
+                if not self.ledger.claim(img_url, self.worker_id, CLAIM_TTL_SECONDS):
+                    print(f"🔄 {filename} - já baixada (ou em download) por outro worker")
+                    return True
+                claimed = True
             
             filepath = os.path.join(self.prints_dir, filename)
-            with open(filepath, 'wb') as f:
-                f.write(response.content)
+            
+            if body is not None:
+                # Bytes vindos do navegador (CDP): nenhuma requisição extra
+                filepath, size, duplicate = self.write_chunks_atomically([body], filepath)
+            else:
+                # Sessão compartilhada (keep-alive) com limite de conexões por host
+                with self.get_host_semaphore(img_url):
+                    with self.http_session.get(img_url, timeout=30, stream=True) as response:
+                        response.raise_for_status()
+                        self.validate_image_response(response)
+                        filepath, size, duplicate = self.write_response_atomically(response, filepath)
             
             # Salva URL no controle de duplicatas
-            self.save_downloaded_url(img_url)
+            self.save_downloaded_url(img_url, file_path=filepath, size=size, profile=profile)
+            
+            if duplicate:
+                print(f"♻️  {filename} - conteúdo idêntico já salvo em {os.path.basename(filepath)}")
+                return True
+            
+            # Hash perceptual calculado em segundo plano (fora do caminho de download)
+            if self.phash_index:
+                self.phash_index.submit(filepath)
             
-            print(f"✓ Imagem salva: {filename}")
+            print(f"✓ Imagem salva: {os.path.basename(filepath)}")
             return True
             
         except Exception as e:
             print(f"✗ Erro ao baixar {filename}: {e}")
+            if claimed:
+                try:
+                    self.ledger.release(img_url, self.worker_id)
+                except Exception:
+                    pass
             return False
     
-    def scrape_profile(self, profile_url):
-        """Função principal para fazer scraping do perfil"""
+    def validate_image_response(self, response):
+        """Rejeita respostas que não são imagens (ex: página de erro HTML com status 200)"""
+        content_type = response.headers.get('Content-Type', '').lower()
+        if not content_type.startswith('image/'):
+            raise ValueError(f"resposta não é uma imagem (Content-Type: {content_type or 'ausente'})")
+        
+        content_length = response.headers.get('Content-Length')
+        if content_length is not None:
+            content_length = int(content_length)
+            if content_length == 0:
+                raise ValueError("resposta vazia (Content-Length: 0)")
+            if content_length > MAX_IMAGE_BYTES:
+                raise ValueError(f"imagem maior que o limite ({content_length} bytes)")
+    
+    def write_response_atomically(self, response, filepath):
+        """Grava a resposta em blocos num arquivo temporário e renomeia atomicamente.
+
+        A memória usada é limitada a DOWNLOAD_CHUNK_SIZE por worker e um crash no
+        meio da escrita nunca deixa uma imagem truncada no destino final. Com
+        STORAGE_MODE = "content" o arquivo é nomeado pelo SHA-256 do conteúdo e
+        cópias idênticas são descartadas.
+        Retorna (caminho_final, bytes_gravados, ja_existia).
+        """
+        # Content-Length só corresponde aos bytes gravados quando não há compressão
+        expected = response.headers.get('Content-Length')
+        if expected is not None and response.headers.get('Content-Encoding'):
+            expected = None
+        chunks = response.iter_content(chunk_size=DOWNLOAD_CHUNK_SIZE)
+        return self.write_chunks_atomically(chunks, filepath, expected)
+    
+    def write_chunks_atomically(self, chunks, filepath, expected=None):
+        """Grava uma sequência de blocos de bytes como em write_response_atomically.
+
+        Um arquivo com o mesmo nome nunca é sobrescrito: a imagem nova recebe um
+        sufixo (_2, _3...) e o caminho retornado é o realmente usado.
+        """
+        directory = os.path.dirname(filepath) or "."
+        fd, tmp_path = tempfile.mkstemp(prefix=f".{os.path.basename(filepath)}.", suffix=".part", dir=directory)
+        duplicate = False
+        reserved = None
+        try:
+            written = 0
+            digest = hashlib.sha256()
+            with os.fdopen(fd, 'wb') as f:
+                for chunk in chunks:
+                    if not chunk:
+                        continue
+                    if written == 0 and chunk.lstrip()[:1] in (b'<', b'{', b'['):
+                        raise ValueError("conteúdo recebido parece HTML/JSON, não imagem")
+                    written += len(chunk)
+                    if written > MAX_IMAGE_BYTES:
+                        raise ValueError(f"imagem maior que o limite ({MAX_IMAGE_BYTES} bytes)")
+                    digest.update(chunk)
+                    f.write(chunk)
+                f.flush()
+                os.fsync(f.fileno())
+            
+            if written == 0:
+                raise ValueError("nenhum byte recebido")
+            
+            if expected is not None and int(expected) != written:
+                raise ValueError(f"download incompleto ({written}/{expected} bytes)")
+            
+            if STORAGE_MODE == "content":
+                extension = os.path.splitext(filepath)[1] or ".jpg"
+                filepath = os.path.join(directory, digest.hexdigest() + extension)
+                duplicate = os.path.exists(filepath)
+            
+            if duplicate:
+                # Conteúdo idêntico já armazenado: descarta a cópia
+                os.unlink(tmp_path)
+                return filepath, written, True
+            if STORAGE_MODE != "content":
+                # Outra aba ou processo pode ter gerado o mesmo nome: nunca sobrescreve
+                filepath = reserved = reserve_unique_path(filepath)
+            os.replace(tmp_path, filepath)
+        except BaseException:
+            for path in (tmp_path, reserved):
+                if path:
+                    try:
+                        os.unlink(path)
+                    except OSError:
+                        pass
+            raise
+        
+        # Garante que o rename também chegue ao disco (não suportado no Windows)
+        try:
+            dir_fd = os.open(directory, os.O_RDONLY)
+            try:
+                os.fsync(dir_fd)
+            finally:
+                os.close(dir_fd)
+        except OSError:
+            pass
+        
+        return filepath, written, duplicate
+    
+    def attach_browser_bodies(self, jobs):
+        """Completa cada (url, arquivo, mensagem) com os bytes já carregados pelo navegador.
+
+        Roda na thread principal (os comandos CDP não podem sair dela). Imagens
+        sem cópia no navegador, ou com resolução abaixo do alvo, recebem None e
+        são baixadas por HTTP pelos workers.
+        """
+        capture = self.network_capture if BROWSER_BYTES_MODE else None
+        if capture:
+            capture.update()
+        
+        result = []
+        reused = 0
+        for img_url, filename, message in jobs:
+            body = capture.read_image(img_url) if capture else None
+            if body is not None:
+                reused += 1
+            result.append((img_url, filename, message, body))
+        
+        if reused:
+            print(f"   ♻️  {reused}/{len(jobs)} imagens reaproveitadas do cache do navegador")
+        return result
+    
+    def download_images_batch(self, jobs):
+        """Baixa uma lista de (url, arquivo, mensagem, bytes) com o pool de workers. Retorna quantas deram certo"""
+        def worker(job):
+            img_url, filename, message, body = job
+            print(message)
+            success = self.download_image(img_url, filename, body=body)
+            # Pequena pausa entre downloads (por worker)
+            time.sleep(DOWNLOAD_DELAY)
+            return success
+        
+        if DOWNLOAD_WORKERS <= 1 or len(jobs) <= 1:
+            return sum(1 for job in jobs if worker(job))
+        
+        with ThreadPoolExecutor(max_workers=min(DOWNLOAD_WORKERS, len(jobs))) as pool:
+            return sum(1 for success in pool.map(worker, jobs) if success)
+    
+    def start_download_pipeline(self):
+        """Inicia a fila de downloads em segundo plano (modo pipeline)"""
+        if PIPELINE_MODE and not self.pipeline:
+            self.pipeline = DownloadPipeline(self, DOWNLOAD_WORKERS, PIPELINE_QUEUE_SIZE)
+            print(f"📤 Pipeline de download ativo: {DOWNLOAD_WORKERS} workers, fila de até {PIPELINE_QUEUE_SIZE} imagens")
+    
+    def stop_download_pipeline(self):
+        """Esvazia a fila de downloads e encerra os workers"""
+        if self.pipeline:
+            pipeline = self.pipeline
+            self.pipeline = None
+            pipeline.close()
+            if pipeline.failed:
+                print(f"⚠️  {pipeline.failed} downloads falharam no pipeline")
+    
+    def scrape_profile_http(self, profile_url, transport=None):
+        """Pagina o perfil só por HTTP, sem navegador. Retorna (total_midias, total_downloads)"""
+        if transport is None:
+            if self.api_transport is None:
+                self.api_transport = self.create_api_transport()
+            transport = self.api_transport
+        client = InstagramApiClient(transport)
+        self.close_driver()
+        
+        user_id = client.get_user_id(self.current_profile)
+        print(f"🌐 Paginando o perfil por HTTP (id {user_id})...")
+        
+        images_found = set()
+        total_media = 0
+        total_downloads = 0
+        self.reset_known_streak()
+        
+        # Retomada: continua direto do cursor de paginação salvo no checkpoint
+        checkpoint = self.load_checkpoint("http")
+        max_id = checkpoint.get('cursor') if checkpoint else None
+        first_page = checkpoint.get('page', 0) + 1 if max_id else 1
+        if max_id:
+            print(f"⏩ Retomando da página {first_page} (post {checkpoint.get('shortcode')})")
+        
+        for page, (records, cursor) in enumerate(client.iter_feed_pages(user_id, max_id), first_page):
+            total_media += len(records)
+            new_images, already_downloaded, videos_skipped = self.filter_network_media(records, images_found)
+            print(f"📄 Página {page}: {len(records)} mídias, {len(new_images)} novas, "
+                  f"{already_downloaded} já baixadas, {videos_skipped} vídeos ignorados")
+            
+            prefix = self.filename_prefix()
+            jobs = []
+            for i, img_url in enumerate(new_images):
+                filename = f"{prefix}_page{page:02d}_img{i+1:03d}.jpg"
+                jobs.append((img_url, filename, f"      💾 Baixando {i+1}/{len(new_images)}: {filename}", None))
+            
+            if self.pipeline:
+                self.pipeline.submit_all(jobs)
+            elif jobs:
+                total_downloads += self.download_images_batch(jobs)
+            
+            self.flush_history()
+            if self.reached_known_content():
+                print(f"✓ {self.known_streak} mídias seguidas já baixadas: sem posts novos além desta página")
+                break
+            if cursor:
+                if page % CHECKPOINT_INTERVAL == 0:
+                    self.save_checkpoint("http", cursor=cursor, page=page,
+                                         shortcode=records[-1]['shortcode'] if records else None)
+                else:
+                    self.write_ready_checkpoints()
+                time.sleep(HTTP_PAGE_DELAY)
+        
+        if self.pipeline:
+            self.pipeline.flush()
+            total_downloads = self.pipeline.completed
+        self.clear_checkpoint()
+        
+        return total_media, total_downloads
+    
+    def harvest_shortcodes(self):
+        """Fase 1 do modo "hybrid": rola o feed o mais rápido possível coletando só os shortcodes"""
+        print("🚀 Coletando links dos posts...")
+        shortcodes = []
+        seen = set()
+        last_height = self.driver.execute_script("return document.body.scrollHeight")
+        no_change_count = 0
+        max_no_change = 5
+        scroll_count = 0
+        
+        while no_change_count < max_no_change:
+            scroll_count += 1
+            scroll = "by" if no_change_count >= 3 else "bottom"
+            if SCROLL_WAIT_MODE == "event":
+                new_height = self.scroll_and_wait(last_height, scroll=scroll)
+            else:
+                if scroll == "by":
+                    self.driver.execute_script("window.scrollBy(0, 1000);")
+                else:
+                    self.driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
+                time.sleep(SCROLL_DELAY)
+                new_height = self.driver.execute_script("return document.body.scrollHeight")
+            
+            before = len(shortcodes)
+            for shortcode in self.page_shortcodes():
+                if shortcode not in seen:
+                    seen.add(shortcode)
+                    shortcodes.append(shortcode)
+            print(f"🔄 Scroll #{scroll_count}: +{len(shortcodes) - before} posts (total {len(shortcodes)})")
+            self.prune_processed_posts()
+            
+            if new_height == last_height and len(shortcodes) == before:
+                no_change_count += 1
+            else:
+                no_change_count = 0
+            last_height = new_height
+        
+        print(f"✓ Chegou ao final do feed: {len(shortcodes)} posts")
+        return shortcodes
+    
+    def scrape_profile_hybrid(self, transport=None):
+        """Modo em duas fases: coleta os shortcodes no navegador e resolve as mídias por HTTP.
+
+        A resolução roda em paralelo (RESOLVE_WORKERS) e traz todos os slides dos
+        carrosséis. O navegador é fechado assim que a coleta termina (a não ser
+        que deva continuar aberto para o próximo perfil).
+        Retorna (total_posts, total_downloads).
+        """
+        client = InstagramApiClient(transport or self.create_api_transport())
+        shortcodes = self.harvest_shortcodes()
+        if not self.keep_driver:
+            self.close_driver()
+        
+        print(f"🌐 Resolvendo {len(shortcodes)} posts com {RESOLVE_WORKERS} workers...")
+        images_found = set()
+        total_downloads = 0
+        failed = 0
+        
+        def resolve(shortcode):
+            try:
+                return shortcode, client.get_post_media(shortcode)
+            except Exception as e:
+                print(f"✗ Erro ao resolver o post {shortcode}: {e}")
+                return shortcode, None
+        
+        prefix = self.filename_prefix()
+        with ThreadPoolExecutor(max_workers=max(RESOLVE_WORKERS, 1)) as pool:
+            for shortcode, records in pool.map(resolve, shortcodes):
+                if records is None:
+                    failed += 1
+                    continue
+                new_images, _, _ = self.filter_network_media(records, images_found)
+                jobs = []
+                for i, img_url in enumerate(new_images):
+                    filename = f"{prefix}_{shortcode}_{i+1:02d}.jpg"
+                    jobs.append((img_url, filename, f"      💾 Baixando {shortcode} {i+1}/{len(new_images)}: {filename}", None))
+                
+                if self.pipeline:
+                    self.pipeline.submit_all(jobs)
+                elif jobs:
+                    total_downloads += self.download_images_batch(jobs)
+                    self.flush_history()
+        
+        if self.pipeline:
+            self.pipeline.flush()
+            total_downloads = self.pipeline.completed
+        self.flush_history()
+        
+        if failed:
+            print(f"⚠️  {failed} posts não puderam ser resolvidos")
+        return len(shortcodes), total_downloads
+    
+    def print_final_report(self, profile_url, total_posts, total_downloads):
+        """Relatório final detalhado"""
+        print(f"\n" + "="*60)
+        print(f"📊 RELATÓRIO FINAL DE SCRAPING INCREMENTAL")
+        print(f"="*60)
+        print(f"🎯 Perfil processado: {profile_url}")
+        print(f"📱 Total de elementos no feed: {total_posts}")
+        print(f"✅ Imagens baixadas durante scroll: {total_downloads}")
+        print(f"💾 Total no histórico: {len(self.downloaded_urls)}")
+        print(f"📁 Pasta de destino: {os.path.abspath(self.prints_dir)}")
+        print(f"="*60)
+        
+        if total_downloads > 0:
+            print(f"✓ Scraping incremental concluído com sucesso!")
+        else:
+            print(f"⚠️  Nenhuma imagem nova foi baixada durante o scroll")
+    
+    def open_tab(self, profile_url, handle=None):
+        """Abre um perfil numa janela nova (ou numa já livre) e prepara o rastreamento do feed"""
+        if handle:
+            self.driver.switch_to.window(handle)
+        else:
+            self.driver.switch_to.new_window('window')
+        tab = FeedTab(self.driver.current_window_handle, profile_url)
+        self.current_profile = tab.profile
+        if self.pipeline:
+            tab.completed_before = self.pipeline.profile_status(tab.profile)[1]
+        print(f"🗂️  Abrindo {tab.profile} em uma nova aba...")
+        
+        # Buffers da captura e URLs bloqueadas precisam valer antes do carregamento da página
+        self.apply_tab_network_settings()
+        self.driver.get(profile_url)
+        # A página deve se comportar como em primeiro plano mesmo quando outra aba está ativa
+        for command, params in (("Emulation.setFocusEmulationEnabled", {"enabled": True}),
+                                ("Page.setWebLifecycleState", {"state": "active"})):
+            try:
+                self.driver.execute_cdp_cmd(command, params)
+            except Exception:
+                pass
+        self.settle_page(want="content")
+        self.install_feed_tracker()
+        tab.last_height = self.driver.execute_script("return document.body.scrollHeight")
+        self.driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
+        return tab
+    
+    def advance_tab(self, tab):
+        """Uma volta do scheduler numa aba: extrai o que carregou, verifica o fim do feed e rola de novo"""
+        self.driver.switch_to.window(tab.handle)
+        self.current_profile = tab.profile
+        tab.scroll_count += 1
+        print(f"\n🔄 {tab.profile} - scroll #{tab.scroll_count}")
+        
+        # Sequência de mídias já baixadas é por perfil: troca a da aba para dentro do scraper
+        self.known_streak, self.streak_keys = tab.known_streak, tab.streak_keys
+        try:
+            tab.queued += self.extract_and_download_new_images(tab.scroll_count)
+        except Exception as e:
+            print(f"   ❌ Erro ao baixar imagens neste scroll: {e}")
+        tab.known_streak, tab.streak_keys = self.known_streak, self.streak_keys
+        
+        if self.reached_known_content():
+            print(f"✓ {tab.profile}: {tab.known_streak} mídias seguidas já baixadas, sem posts novos")
+            tab.posts = self.count_elements_detailed()[0]
+            tab.done = True
+            return
+        
+        height = self.driver.execute_script("return document.body.scrollHeight")
+        if height == tab.last_height:
+            tab.no_change_count += 1
+            if tab.no_change_count >= 5:
+                print(f"✓ {tab.profile}: chegou ao final do feed!")
+                tab.posts = self.count_elements_detailed()[0]
+                tab.done = True
+                return
+        else:
+            tab.no_change_count = 0
+        tab.last_height = height
+        
+        self.flush_history()
+        self.prune_processed_posts()
+        
+        # Dispara o próximo scroll e segue para a próxima aba enquanto esta carrega
+        if tab.no_change_count >= 3:
+            self.driver.execute_script("window.scrollBy(0, 1000);")
+        else:
+            self.driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
+    
+    def update_tab_downloads(self, tab):
+        """Atualiza os downloads concluídos do perfil da aba. Retorna quantos ainda estão na fila"""
+        if not self.pipeline:
+            # Sem pipeline os downloads são síncronos: o contador já é de concluídos
+            tab.downloads = tab.queued
+            return 0
+        pending, completed = self.pipeline.profile_status(tab.profile)
+        tab.downloads = completed - tab.completed_before
+        return pending
+    
+    def scrape_profiles_in_tabs(self, next_profile, max_tabs, on_result=None):
+        """Modo multiabas: vários perfis num único Chrome, cada um em sua janela.
+
+        Um scheduler round-robin visita as abas em sequência: enquanto uma espera
+        o conteúdo carregar, as outras são processadas. next_profile() fornece o
+        próximo perfil (None quando acabaram) e on_result(resultado) é chamado
+        quando cada perfil termina e seus downloads saem da fila. Retorna a
+        lista de resultados.
+        """
+        results = []
+        
+        def finish(result):
+            results.append(result)
+            if on_result:
+                on_result(result)
+        
+        if not self.logged_in:
+            self.logged_in = self.ensure_logged_in(INSTAGRAM_USERNAME, INSTAGRAM_PASSWORD)
+        if self.network_capture and self.network_capture.capture_feed:
+            # O log de rede do Chrome mistura as respostas de todas as abas
+            print("⚠️  Modo multiabas usa a descoberta pelo DOM (DISCOVERY_MODE = \"network\" ignorado)")
+            self.network_capture.capture_feed = False
+        
+        self.start_download_pipeline()
+        tabs = []
+        draining = []
+        free_handles = [self.driver.current_window_handle]
+        exhausted = False
+        
+        try:
+            while True:
+                # Completa as abas com os próximos perfis
+                while not exhausted and len(tabs) < max_tabs:
+                    profile_url = next_profile()
+                    if profile_url is None:
+                        exhausted = True
+                        break
+                    try:
+                        tabs.append(self.open_tab(profile_url, free_handles.pop() if free_handles else None))
+                    except Exception as e:
+                        print(f"❌ Erro ao abrir {profile_url}: {e}")
+                        finish({'profile': profile_name(profile_url), 'url': profile_url, 'ok': False, 'error': str(e)})
+                
+                if not tabs:
+                    # Aguarda os downloads pendentes para reportar os perfis restantes
+                    if self.pipeline:
+                        self.pipeline.flush()
+                    for tab in draining:
+                        self.update_tab_downloads(tab)
+                        finish(tab.result())
+                    draining = []
+                    break
+                
+                round_started = time.time()
+                for tab in list(tabs):
+                    try:
+                        self.advance_tab(tab)
+                    except Exception as e:
+                        print(f"❌ Erro na aba de {tab.profile}: {e}")
+                        tab.error = str(e)
+                        tab.done = True
+                    
+                    if tab.done:
+                        tabs.remove(tab)
+                        draining.append(tab)
+                        # Fecha a janela (ou guarda a última para o próximo perfil)
+                        if len(self.driver.window_handles) > 1:
+                            self.driver.switch_to.window(tab.handle)
+                            self.driver.close()
+                            self.driver.switch_to.window(self.driver.window_handles[0])
+                        else:
+                            free_handles.append(tab.handle)
+                
+                # Perfis encerrados só são reportados quando seus downloads terminam
+                for tab in list(draining):
+                    if self.update_tab_downloads(tab) == 0:
+                        draining.remove(tab)
+                        finish(tab.result())
+                
+                # Cada aba tem pelo menos SCROLL_WAIT_MIN segundos para carregar entre as visitas
+                remaining = SCROLL_WAIT_MIN - (time.time() - round_started)
+                if remaining > 0:
+                    time.sleep(remaining)
+        finally:
+            self.stop_download_pipeline()
+            self.flush_history()
+            self.persist_membership_index()
+            self.reset_known_streak()
+        
+        return results
+    
+    def close(self):
+        """Encerra tudo o que a instância mantém aberto (fila, índices, registro e navegador)"""
+        self.stop_download_pipeline()
+        self.flush_history()
+        self.persist_membership_index()
+        self.close_phash_index()
+        if isinstance(self.downloaded_urls, CompactMembership):
+            self.downloaded_urls.close()
+        if self.ledger:
+            self.ledger.close()
+            self.ledger = None
+        self.close_driver()
+    
+    def scrape_profile(self, profile_url, close_driver=True):
+        """Função principal para fazer scraping do perfil.
+
+        Com close_driver=False o navegador e a sessão continuam abertos para o
+        próximo perfil (modo em lote). Retorna um dicionário com o resultado.
+        """
         print("Iniciando scraping...")
         print(f"URL do perfil: {profile_url}")
+        self.current_profile = profile_name(profile_url)
+        self.keep_driver = not close_driver
+        started = time.time()
+        result = {'profile': self.current_profile, 'url': profile_url, 'posts': 0, 'downloads': 0, 'ok': False, 'error': None}
+        
+        if not self.phash_index:
+            self.open_phash_index()
         
         try:
-            # Faz login primeiro
-            login_success = self.login_instagram(INSTAGRAM_USERNAME, INSTAGRAM_PASSWORD)
-            if not login_success:
-                print("Falha no login detectada pelo script. Verificando manualmente...")
-                
-                # Verifica novamente se realmente não está logado
-                try:
-                    self.driver.get("https://www.instagram.com/")
-                    time.sleep(3)
+            if self.driver is None and not (CRAWL_MODE == "http" and self.api_transport):
+                # Navegador fechado por um perfil anterior (ex: modo "hybrid"): reabre
+                self.setup_driver()
+                self.logged_in = False
+            
+            if self.logged_in or (CRAWL_MODE == "http" and self.api_transport):
+                print("✓ Sessão já ativa, reaproveitando o login")
+            else:
+                # Faz login primeiro
+                login_success = self.ensure_logged_in(INSTAGRAM_USERNAME, INSTAGRAM_PASSWORD)
+                if not login_success:
+                    print("Falha no login detectada pelo script. Verificando manualmente...")
                     
-                    # Procura por indicadores de login
-                    login_indicators = self.driver.find_elements(By.NAME, "username")
-                    if not login_indicators:
-                        print("✓ Na verdade o login funcionou! Continuando...")
-                        login_success = True
-                    else:
-                        print("⚠️ Confirmado: não está logado. Tentando continuar sem login...")
-                except:
-                    print("⚠️ Não foi possível verificar status de login. Tentando continuar...")
+                    # Verifica novamente se realmente não está logado
+                    try:
+                        self.driver.get("https://www.instagram.com/")
+                        state = self.settle_page(want="logged_in")
+                        
+                        # Procura por indicadores de login
+                        if state and not state.get('loginForm'):
+                            print("✓ Na verdade o login funcionou! Continuando...")
+                            login_success = True
+                        else:
+                            print("⚠️ Confirmado: não está logado. Tentando continuar sem login...")
+                    except:
+                        print("⚠️ Não foi possível verificar status de login. Tentando continuar...")
                 
-                time.sleep(3)
+                self.logged_in = login_success
+            
+            if CRAWL_MODE == "http":
+                # Modo sem navegador: o Chrome só serviu para o login
+                self.start_download_pipeline()
+                total_posts, total_downloads = self.scrape_profile_http(profile_url)
+                self.print_final_report(profile_url, total_posts, total_downloads)
+                result.update(posts=total_posts, downloads=total_downloads, ok=True)
+                return result
             
             # Navega para o perfil
             print(f"Navegando para: {profile_url}")
             navigation_success = False
             
+            # Descarta as respostas do login e da página inicial: só as do perfil interessam
+            if self.network_capture:
+                self.network_capture.drain()
+            
             for attempt in range(3):
                 try:
                     print(f"Tentativa de navegação {attempt + 1}/3...")
                     self.driver.get(profile_url)
-                    time.sleep(5)
+                    self.settle_page(want="content")
                     
                     # Verifica se a navegação foi bem-sucedida
                     current_url = self.driver.current_url
@@ -867,7 +3730,8 @@ class InstagramScraper:
             
             if not navigation_success:
                 print("❌ Falha na navegação após múltiplas tentativas")
-                return
+                result['error'] = "falha na navegação"
+                return result
             
             # Aguarda o carregamento da página com múltiplas tentativas
             page_loaded = False
@@ -889,30 +3753,27 @@ class InstagramScraper:
                     if attempt < 2:
                         time.sleep(3)
                         self.driver.refresh()
-                        time.sleep(5)
+                        self.settle_page(want="content")
             
             if not page_loaded:
                 print("⚠️ Não foi possível carregar a página completamente, tentando continuar...")
-                time.sleep(5)
+                self.settle_page(want="content")
+            
+            if CRAWL_MODE == "hybrid":
+                self.start_download_pipeline()
+                total_posts, total_downloads = self.scrape_profile_hybrid()
+                self.print_final_report(profile_url, total_posts, total_downloads)
+                result.update(posts=total_posts, downloads=total_downloads, ok=True)
+                return result
             
             # NOVO: Scroll e download incremental
+            self.install_feed_tracker()
+            self.start_download_pipeline()
             total_posts, total_downloads = self.scroll_and_download_incremental()
+            result.update(posts=total_posts, downloads=total_downloads, ok=True)
             
             # Relatório final detalhado
-            print(f"\n" + "="*60)
-            print(f"📊 RELATÓRIO FINAL DE SCRAPING INCREMENTAL")
-            print(f"="*60)
-            print(f"🎯 Perfil processado: {profile_url}")
-            print(f"📱 Total de elementos no feed: {total_posts}")
-            print(f"✅ Imagens baixadas durante scroll: {total_downloads}")
-            print(f"💾 Total no histórico: {len(self.downloaded_urls)}")
-            print(f"📁 Pasta de destino: {os.path.abspath(self.prints_dir)}")
-            print(f"="*60)
-            
-            if total_downloads > 0:
-                print(f"✓ Scraping incremental concluído com sucesso!")
-            else:
-                print(f"⚠️  Nenhuma imagem nova foi baixada durante o scroll")
+            self.print_final_report(profile_url, total_posts, total_downloads)
                 
             # Verificação final opcional - extrai qualquer imagem que possa ter ficado
             print(f"\n🔍 Fazendo verificação final...")
@@ -921,24 +3782,30 @@ class InstagramScraper:
                 if final_images:
                     new_images_found = []
                     for img_url in final_images:
-                        if img_url not in self.downloaded_urls:
+                        if media_key(img_url) not in self.downloaded_urls:
                             new_images_found.append(img_url)
                     
                     if new_images_found:
                         print(f"🎯 Encontradas {len(new_images_found)} imagens adicionais na verificação final")
-                        additional_downloads = 0
-                        current_date = datetime.now()
+                        prefix = self.filename_prefix()
+                        jobs = []
                         
                         for i, img_url in enumerate(new_images_found):
-                            date_str = current_date.strftime("%Y%m%d_%H%M%S")
-                            filename = f"{date_str}_final_{i+1:03d}.jpg"
-                            
-                            print(f"   📥 Baixando adicional {i+1}/{len(new_images_found)}: {filename}")
-                            if self.download_image(img_url, filename):
-                                additional_downloads += 1
+                            filename = f"{prefix}_final_{i+1:03d}.jpg"
+                            jobs.append((img_url, filename, f"   📥 Baixando adicional {i+1}/{len(new_images_found)}: {filename}"))
+                        jobs = self.attach_browser_bodies(jobs)
+                        
+                        if self.pipeline:
+                            completed_before = self.pipeline.completed
+                            self.pipeline.submit_all(jobs)
+                            self.pipeline.flush()
+                            additional_downloads = self.pipeline.completed - completed_before
+                        else:
+                            additional_downloads = self.download_images_batch(jobs)
                         
                         print(f"✅ {additional_downloads}/{len(new_images_found)} imagens adicionais baixadas")
                         total_downloads += additional_downloads
+                        result['downloads'] = total_downloads
                         
                         print(f"\n📊 TOTAL FINAL: {total_downloads} imagens baixadas")
                     else:
@@ -951,6 +3818,7 @@ class InstagramScraper:
         except Exception as e:
             print(f"Erro durante o scraping: {e}")
             print("Tentando continuar com fallback...")
+            result['error'] = str(e)
             
             # Tenta capturar informações úteis mesmo com erro
             try:
@@ -976,12 +3844,20 @@ class InstagramScraper:
                 print(f"Erro no fallback: {fallback_error}")
         
         finally:
+            # Garante que nenhum download enfileirado seja perdido
             try:
-                if self.driver:
-                    self.driver.quit()
-                    print("✓ Navegador fechado")
-            except:
-                print("⚠️ Erro ao fechar navegador")
+                self.stop_download_pipeline()
+            except Exception as e:
+                print(f"⚠️ Erro ao encerrar a fila de downloads: {e}")
+            self.flush_history()
+            self.persist_membership_index()
+            self.close_phash_index()
+            
+            if close_driver:
+                self.close_driver()
+            result['elapsed'] = round(time.time() - started, 1)
+        
+        return result
 
 def is_admin():
     """Verifica se o script está sendo executado como administrador"""
@@ -992,6 +3868,8 @@ def is_admin():
 
 def request_admin_privileges():
     """Solicita privilégios de administrador"""
+    if os.name != "nt":
+        return
     if not is_admin():
         print("Este script precisa de privilégios de administrador para funcionar corretamente.")
         print("Solicitando elevação de privilégios...")
@@ -1011,17 +3889,239 @@ def request_admin_privileges():
             print("Tente executar o prompt de comando como administrador e rode o script novamente.")
             input("Pressione Enter para continuar mesmo assim...")
 
+def read_profiles_file(path):
+    """Lê um arquivo com um perfil por linha (URL ou nome de usuário; '#' inicia comentário)"""
+    profiles = []
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.split('#', 1)[0].strip()
+            if not line:
+                continue
+            if 'instagram.com' not in line:
+                line = f"https://www.instagram.com/{line.lstrip('@').strip('/')}/"
+            if line not in profiles:
+                profiles.append(line)
+    return profiles
+
+def batch_worker(worker_id, tasks, results, tabs=1):
+    """Processo do modo em lote: mantém um navegador e uma sessão abertos entre os perfis"""
+    scraper = None
+    try:
+        scraper = InstagramScraper(tabs=tabs)
+        if tabs > 1 and CRAWL_MODE == "browser":
+            def report(result):
+                result['worker'] = worker_id
+                results.put(result)
+            scraper.scrape_profiles_in_tabs(tasks.get, tabs, on_result=report)
+            return
+        
+        while True:
+            profile_url = tasks.get()
+            if profile_url is None:
+                break
+            try:
+                result = scraper.scrape_profile(profile_url, close_driver=False)
+            except Exception as e:
+                result = {'profile': profile_name(profile_url), 'url': profile_url, 'ok': False, 'error': str(e)}
+            result['worker'] = worker_id
+            results.put(result)
+    finally:
+        if scraper:
+            scraper.close()
+
+def run_batch(profiles_file, workers=BATCH_WORKERS, tabs=TABS_PER_BROWSER):
+    """Processa um arquivo de perfis com um pool de processos, cada um com seu navegador.
+
+    Com tabs > 1 cada navegador atende vários perfis ao mesmo tempo (modo multiabas).
+    """
+    profiles = read_profiles_file(profiles_file)
+    if not profiles:
+        print(f"Nenhum perfil encontrado em {profiles_file}")
+        return []
+    
+    tabs = max(tabs, 1)
+    workers = max(1, min(workers, -(-len(profiles) // tabs)))
+    print(f"📋 Modo em lote: {len(profiles)} perfis, {workers} navegadores em paralelo"
+          + (f", {tabs} abas por navegador" if tabs > 1 else ""))
+    
+    tasks = multiprocessing.Queue()
+    results = multiprocessing.Queue()
+    for profile_url in profiles:
+        tasks.put(profile_url)
+    for _ in range(workers):
+        tasks.put(None)
+    
+    started = time.time()
+    processes = [
+        multiprocessing.Process(target=batch_worker, args=(i + 1, tasks, results, tabs), name=f"batch-{i + 1}")
+        for i in range(workers)
+    ]
+    for process in processes:
+        process.start()
+    
+    collected = {}
+    while len(collected) < len(profiles):
+        try:
+            result = results.get(timeout=5)
+        except queue.Empty:
+            if not any(process.is_alive() for process in processes):
+                break
+            continue
+        collected[result['url']] = result
+        status = "✅" if result.get('ok') else "❌"
+        print(f"{status} [{len(collected)}/{len(profiles)}] {result['profile']}: "
+              f"{result.get('downloads', 0)} imagens ({result.get('elapsed', 0)}s, worker {result['worker']})")
+        with open(BATCH_RESULTS_FILE, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(result, ensure_ascii=False) + "\n")
+    
+    for process in processes:
+        process.join()
+    
+    # Perfis perdidos por um worker que caiu no meio do caminho
+    for profile_url in profiles:
+        if profile_url not in collected:
+            collected[profile_url] = {'profile': profile_name(profile_url), 'url': profile_url,
+                                      'ok': False, 'error': "worker encerrado antes de concluir"}
+    
+    elapsed = time.time() - started
+    ordered = [collected[profile_url] for profile_url in profiles]
+    ok = sum(1 for result in ordered if result.get('ok'))
+    downloads = sum(result.get('downloads', 0) for result in ordered)
+    
+    print(f"\n" + "="*60)
+    print(f"📊 RELATÓRIO DO LOTE")
+    print(f"="*60)
+    for result in ordered:
+        status = "✅" if result.get('ok') else f"❌ {result.get('error') or ''}"
+        print(f"{result['profile']:<30} {result.get('posts', 0):>6} posts {result.get('downloads', 0):>6} imagens  {status}")
+    print(f"="*60)
+    print(f"🎯 {ok}/{len(ordered)} perfis concluídos, {downloads} imagens em {elapsed / 60:.1f} min")
+    print(f"📄 Resultados por perfil em {BATCH_RESULTS_FILE}")
+    return ordered
+
+def queue_worker(worker_number, backend=JOB_QUEUE_BACKEND, job_queue=None):
+    """Worker da fila distribuída: pega perfis da fila até ela esvaziar.
+
+    Um heartbeat em segundo plano renova o lease enquanto o perfil é processado.
+    Quando a fila não tem perfis livres, mas ainda há perfis com outros workers,
+    espera JOB_POLL_SECONDS: se algum deles cair, o lease expira e o perfil é
+    retomado aqui.
+    """
+    if job_queue is None and backend == "memory":
+        # Uma fila em memória aberta aqui estaria vazia: ninguém mais a enxerga
+        raise ValueError("A fila \"memory\" precisa ser criada e passada em job_queue")
+    job_queue = job_queue or open_job_queue(backend)
+    owner = f"{socket.gethostname()}-{os.getpid()}-{worker_number}"
+    scraper = None
+    processed = 0
+    try:
+        while True:
+            profile_url = job_queue.claim(owner, JOB_LEASE_SECONDS)
+            if profile_url is None:
+                counts = job_queue.counts()
+                if not counts.get('pending') and not counts.get('leased'):
+                    break
+                time.sleep(JOB_POLL_SECONDS)
+                continue
+            
+            if scraper is None:
+                scraper = InstagramScraper()
+                scraper.worker_id = owner
+                if not scraper.ledger:
+                    print("⚠️  Fila distribuída sem registro SQLite: não há deduplicação entre workers")
+            
+            stop = threading.Event()
+            def heartbeat():
+                while not stop.wait(JOB_LEASE_SECONDS / 3):
+                    if not job_queue.heartbeat(profile_url, owner, JOB_LEASE_SECONDS):
+                        print(f"⚠️  Lease de {profile_url} perdido (outro worker pode retomá-lo)")
+                        return
+            heartbeat_thread = threading.Thread(target=heartbeat, name="lease-heartbeat", daemon=True)
+            heartbeat_thread.start()
+            
+            try:
+                result = scraper.scrape_profile(profile_url, close_driver=False)
+            except Exception as e:
+                result = {'profile': profile_name(profile_url), 'url': profile_url, 'ok': False, 'error': str(e)}
+            finally:
+                stop.set()
+                heartbeat_thread.join()
+            
+            result['worker'] = owner
+            if result.get('ok'):
+                job_queue.complete(profile_url, owner, result)
+            else:
+                job_queue.fail(profile_url, owner, result.get('error') or "erro desconhecido")
+            processed += 1
+    finally:
+        if scraper:
+            scraper.close()
+        job_queue.close()
+    print(f"🏁 Worker {owner}: {processed} perfis processados, fila vazia")
+    return processed
+
+def run_queue_workers(workers):
+    """Inicia workers da fila distribuída neste nó (um processo/navegador por worker)"""
+    if workers <= 1:
+        return queue_worker(1)
+    processes = [
+        multiprocessing.Process(target=queue_worker, args=(i + 1,), name=f"queue-{i + 1}")
+        for i in range(workers)
+    ]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+
+def print_queue_status(job_queue):
+    counts = job_queue.counts()
+    print(f"📋 Fila {JOB_QUEUE_FILE}: " + ", ".join(f"{status}: {count}" for status, count in sorted(counts.items())))
+
 def main():
+    parser = argparse.ArgumentParser(description="Baixa as imagens do feed de perfis do Instagram")
+    parser.add_argument("profile", nargs="?", help="URL do perfil (perguntada se omitida)")
+    parser.add_argument("--batch", metavar="ARQUIVO", help="arquivo com um perfil por linha (modo em lote)")
+    parser.add_argument("--workers", type=int, default=BATCH_WORKERS, help="navegadores em paralelo no modo em lote")
+    parser.add_argument("--tabs", type=int, default=TABS_PER_BROWSER, help="perfis simultâneos por navegador (abas)")
+    parser.add_argument("--queue-add", metavar="ARQUIVO", help="coordenador: enfileira os perfis do arquivo na fila distribuída")
+    parser.add_argument("--queue-worker", action="store_true", help="worker: processa perfis da fila distribuída até ela esvaziar")
+    parser.add_argument("--queue-status", action="store_true", help="mostra o estado da fila distribuída")
+    args = parser.parse_args()
+    
+    if (args.queue_add or args.queue_status or args.queue_worker) and JOB_QUEUE_BACKEND == "memory":
+        # Cada comando roda em outro processo: a fila em memória começaria sempre vazia
+        print("❌ JOB_QUEUE_BACKEND = \"memory\" só funciona dentro de um mesmo processo (testes).")
+        print("   Use JOB_QUEUE_BACKEND = \"sqlite\" para --queue-add, --queue-status e --queue-worker.")
+        return
+    
+    if args.queue_add or args.queue_status:
+        job_queue = open_job_queue()
+        if args.queue_add:
+            added = job_queue.add(read_profiles_file(args.queue_add))
+            print(f"📥 {added} perfis adicionados à fila")
+        print_queue_status(job_queue)
+        job_queue.close()
+        return
+    
     # Verifica privilégios de administrador
     request_admin_privileges()
     
-    if is_admin():
-        print("✓ Executando com privilégios de administrador")
-    else:
-        print("⚠️ Executando sem privilégios de administrador (pode causar problemas)")
+    if os.name == "nt":
+        if is_admin():
+            print("✓ Executando com privilégios de administrador")
+        else:
+            print("⚠️ Executando sem privilégios de administrador (pode causar problemas)")
+    
+    if args.batch:
+        run_batch(args.batch, args.workers, args.tabs)
+        return
+    
+    if args.queue_worker:
+        run_queue_workers(args.workers)
+        return
     
     # URL do perfil Instagram
-    profile_url = input("Digite a URL do perfil Instagram: ").strip()
+    profile_url = (args.profile or input("Digite a URL do perfil Instagram: ")).strip()
     
     if not profile_url:
         print("URL não fornecida!")
@@ -0,0 +1,94 @@
+"""Servidor local que imita os endpoints da API usados pelo modo "http".
+
+Serve o perfil e as páginas do feed gravadas em fixtures/api/, seguindo o
+cursor max_id de uma página para a outra, para testar a paginação sem o
+Instagram. Também pode ser usado à mão:
+    python tests/api_server.py --port 8765
+e no config.py: API_BASE_URL = "http://127.0.0.1:8765"
+"""
+import argparse
+import glob
+import json
+import os
+import re
+import threading
+import urllib.parse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+API_FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "api")
+
+
+class FixtureApiHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        url = urllib.parse.urlparse(self.path)
+        params = dict(urllib.parse.parse_qsl(url.query))
+        self.server.requests.append((url.path, params))
+
+        status, payload = self.server.route(url.path, params)
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class FixtureApiServer(ThreadingHTTPServer):
+    """Servidor das fixtures. failing_cursors: cursores que respondem 500 (uma vez cada)"""
+
+    def __init__(self, port=0, fixtures=API_FIXTURES):
+        super().__init__(("127.0.0.1", port), FixtureApiHandler)
+        self.requests = []
+        self.failing_cursors = set()
+        with open(os.path.join(fixtures, "web_profile_info.json"), encoding="utf-8") as f:
+            self.profile = json.load(f)
+
+        # Encadeia as páginas pelo next_max_id: a primeira é a pedida sem cursor
+        self.pages = {}
+        cursor = None
+        for path in sorted(glob.glob(os.path.join(fixtures, "feed_page*.json")),
+                           key=lambda p: int(re.search(r"(\d+)\.json$", p).group(1))):
+            with open(path, encoding="utf-8") as f:
+                page = json.load(f)
+            self.pages[cursor] = page
+            cursor = page.get("next_max_id")
+
+    @property
+    def base_url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+    def route(self, path, params):
+        user = self.profile["data"]["user"]
+        if path == "/api/v1/users/web_profile_info/":
+            if params.get("username") != user["username"]:
+                return 404, {"status": "fail", "message": "User not found"}
+            return 200, self.profile
+        if path == f"/api/v1/feed/user/{user['id']}/":
+            cursor = params.get("max_id")
+            if cursor in self.failing_cursors:
+                self.failing_cursors.discard(cursor)
+                return 500, {"status": "fail"}
+            if cursor not in self.pages:
+                return 400, {"status": "fail", "message": "invalid max_id"}
+            return 200, self.pages[cursor]
+        return 404, {"status": "fail"}
+
+    def start(self):
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+    server = FixtureApiServer(args.port)
+    print(f"API de teste em {server.base_url} ({len(server.pages)} páginas)")
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
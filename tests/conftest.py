@@ -0,0 +1,26 @@
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+@pytest.fixture(scope="session")
+def browser():
+    """Chrome headless para os testes que executam os scripts da página (pulados sem Chrome/ChromeDriver)"""
+    from selenium import webdriver
+    import instagram_scraper
+
+    options = webdriver.ChromeOptions()
+    for argument in ("--headless=new", "--no-sandbox", "--disable-dev-shm-usage", "--disable-gpu"):
+        options.add_argument(argument)
+    if instagram_scraper.CHROME_BINARY:
+        options.binary_location = instagram_scraper.CHROME_BINARY
+    try:
+        driver = webdriver.Chrome(options=options)
+    except Exception as e:
+        pytest.skip(f"Chrome/ChromeDriver indisponível: {e.__class__.__name__}")
+    yield driver
+    driver.quit()
@@ -0,0 +1,108 @@
+"""Checkpoints no modo pipeline: gravados sem esvaziar a fila de downloads.
+
+O checkpoint só pode apontar para posts cujas imagens já estão em disco; em vez
+de parar o scroll até a fila esvaziar, ele espera os downloads enfileirados
+antes dele terminarem.
+"""
+import json
+import threading
+
+import instagram_scraper
+from instagram_scraper import DownloadPipeline, InstagramScraper
+
+
+def make_scraper(tmp_path, monkeypatch):
+    monkeypatch.setattr(instagram_scraper, "CHECKPOINT_MODE", True)
+    monkeypatch.setattr(instagram_scraper, "CHECKPOINT_DIRECTORY", str(tmp_path / "checkpoints"))
+    monkeypatch.setattr(instagram_scraper, "DOWNLOAD_DELAY", 0)
+    scraper = InstagramScraper.__new__(InstagramScraper)
+    scraper.current_profile = "freelancer.photos"
+    scraper.pending_checkpoints = []
+    scraper.pipeline = None
+    scraper.flush_history = lambda: None
+    return scraper
+
+
+def saved_checkpoint(scraper):
+    try:
+        with open(scraper.checkpoint_path(scraper.current_profile), encoding="utf-8") as f:
+            return json.load(f)
+    except OSError:
+        return None
+
+
+def wait_finished(pipeline, sequence):
+    while pipeline.finished_through() < sequence:
+        threading.Event().wait(0.01)
+
+
+def test_checkpoint_waits_for_earlier_downloads_without_blocking(tmp_path, monkeypatch):
+    scraper = make_scraper(tmp_path, monkeypatch)
+    release = {name: threading.Event() for name in ("a.jpg", "b.jpg", "c.jpg")}
+
+    def download_image(url, filename, body=None, profile=None):
+        release[filename].wait(10)
+        return True
+    scraper.download_image = download_image
+    pipeline = scraper.pipeline = DownloadPipeline(scraper, workers=3, max_queued=10)
+
+    def flush():
+        raise AssertionError("o checkpoint não pode esperar a fila esvaziar")
+    pipeline.flush = flush
+
+    pipeline.submit("https://cdn.example/a.jpg", "a.jpg")
+    pipeline.submit("https://cdn.example/b.jpg", "b.jpg")
+    # Volta na hora, com os downloads ainda em andamento
+    scraper.save_checkpoint("browser", shortcode="C1aPost0010", scroll_count=10)
+    assert saved_checkpoint(scraper) is None
+
+    # Um download enfileirado depois do checkpoint não o segura; um anterior, sim
+    pipeline.submit("https://cdn.example/c.jpg", "c.jpg")
+    release["a.jpg"].set()
+    release["c.jpg"].set()
+    wait_finished(pipeline, 1)
+    scraper.write_ready_checkpoints()
+    assert saved_checkpoint(scraper) is None
+
+    release["b.jpg"].set()
+    wait_finished(pipeline, 3)
+    scraper.write_ready_checkpoints()
+    checkpoint = saved_checkpoint(scraper)
+    assert checkpoint["shortcode"] == "C1aPost0010" and checkpoint["scroll_count"] == 10
+    assert scraper.pending_checkpoints == []
+
+    del pipeline.flush
+    pipeline.close()
+
+
+def test_newest_ready_checkpoint_wins(tmp_path, monkeypatch):
+    scraper = make_scraper(tmp_path, monkeypatch)
+    done = threading.Event()
+    scraper.download_image = lambda url, filename, body=None, profile=None: done.wait(10)
+    scraper.pipeline = DownloadPipeline(scraper, workers=1, max_queued=10)
+
+    scraper.pipeline.submit("https://cdn.example/a.jpg", "a.jpg")
+    scraper.save_checkpoint("http", cursor="cursor-10", page=10)
+    scraper.save_checkpoint("http", cursor="cursor-20", page=20)
+    assert saved_checkpoint(scraper) is None
+
+    done.set()
+    scraper.pipeline.close()
+    scraper.write_ready_checkpoints()
+    assert saved_checkpoint(scraper)["cursor"] == "cursor-20"
+
+
+def test_clear_checkpoint_drops_pending(tmp_path, monkeypatch):
+    scraper = make_scraper(tmp_path, monkeypatch)
+    done = threading.Event()
+    scraper.download_image = lambda url, filename, body=None, profile=None: done.wait(10)
+    scraper.pipeline = DownloadPipeline(scraper, workers=1, max_queued=10)
+
+    scraper.pipeline.submit("https://cdn.example/a.jpg", "a.jpg")
+    scraper.save_checkpoint("browser", shortcode="C1aPost0010", scroll_count=10)
+    # Perfil terminou: o checkpoint pendente não pode reaparecer depois
+    scraper.clear_checkpoint()
+    done.set()
+    scraper.pipeline.close()
+    scraper.write_ready_checkpoints()
+    assert saved_checkpoint(scraper) is None
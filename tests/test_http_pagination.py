@@ -0,0 +1,130 @@
+"""Paginação do modo "http" contra o servidor local de fixtures (api_server.py)"""
+import pytest
+import requests
+
+import instagram_scraper
+from instagram_scraper import InstagramApiClient, InstagramScraper, RequestsTransport
+from api_server import FixtureApiServer
+
+USER_ID = "51234567"
+
+
+@pytest.fixture
+def server():
+    server = FixtureApiServer().start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def transport(server):
+    return RequestsTransport(requests.Session(), server.base_url, {"X-IG-App-ID": instagram_scraper.IG_APP_ID})
+
+
+def feed_cursors(server):
+    return [params.get("max_id") for path, params in server.requests if path.startswith("/api/v1/feed/user/")]
+
+
+def test_iter_feed_pages_follows_cursors_to_the_end(server, transport):
+    client = InstagramApiClient(transport, page_size=3)
+    assert client.get_user_id("freelancer.photos") == USER_ID
+
+    pages = list(client.iter_feed_pages(USER_ID))
+
+    assert [len(records) for records, cursor in pages] == [3, 2, 2]
+    assert [cursor for records, cursor in pages] == [
+        "3500000000000000003_51234567", "3500000000000000005_51234567", None
+    ]
+    assert feed_cursors(server) == [None, "3500000000000000003_51234567", "3500000000000000005_51234567"]
+    assert all(params["count"] == "3" for path, params in server.requests if "feed" in path)
+
+
+def test_unknown_profile_raises(transport):
+    with pytest.raises(requests.HTTPError):
+        InstagramApiClient(transport).get_user_id("nao.existe")
+
+
+@pytest.fixture
+def scraper(transport, tmp_path, monkeypatch):
+    monkeypatch.setattr(instagram_scraper, "HTTP_PAGE_DELAY", 0)
+    monkeypatch.setattr(instagram_scraper, "CHECKPOINT_DIRECTORY", str(tmp_path / "checkpoints"))
+    monkeypatch.setattr(instagram_scraper, "CHECKPOINT_INTERVAL", 1)
+
+    scraper = InstagramScraper.__new__(InstagramScraper)
+    scraper.driver = None
+    scraper.network_capture = None
+    scraper.pipeline = None
+    scraper.ledger = None
+    scraper.api_transport = transport
+    scraper.current_profile = "freelancer.photos"
+    scraper.downloaded_urls = set()
+    scraper.reset_known_streak()
+    scraper.pending_checkpoints = []
+    scraper.jobs = []
+
+    def download_images_batch(jobs):
+        scraper.jobs.extend(jobs)
+        scraper.downloaded_urls.update(instagram_scraper.media_key(job[0]) for job in jobs)
+        return len(jobs)
+    scraper.download_images_batch = download_images_batch
+    return scraper
+
+
+def test_scrape_profile_http_downloads_every_page(server, scraper):
+    total_media, total_downloads = scraper.scrape_profile_http("https://www.instagram.com/freelancer.photos/")
+
+    assert total_media == 7
+    assert total_downloads == 6  # o reel da primeira página fica de fora
+    assert [job[1].split("_")[-2] for job in scraper.jobs] == ["page01"] * 2 + ["page02"] * 2 + ["page03"] * 2
+    assert all(job[1].startswith("freelancer.photos_") for job in scraper.jobs)
+    assert scraper.load_checkpoint("http") is None  # perfil completo: checkpoint apagado
+
+
+def test_scrape_profile_http_resumes_from_checkpoint(server, scraper):
+    # A terceira página falha: a execução cai com o checkpoint da página 2 salvo
+    server.failing_cursors.add("3500000000000000005_51234567")
+    with pytest.raises(requests.HTTPError):
+        scraper.scrape_profile_http("https://www.instagram.com/freelancer.photos/")
+    assert scraper.load_checkpoint("http")["cursor"] == "3500000000000000005_51234567"
+
+    server.requests.clear()
+    scraper.jobs.clear()
+    total_media, total_downloads = scraper.scrape_profile_http("https://www.instagram.com/freelancer.photos/")
+
+    # A retomada vai direto para a página 3, sem repaginar o começo do feed
+    assert feed_cursors(server) == ["3500000000000000005_51234567"]
+    assert (total_media, total_downloads) == (2, 2)
+    assert [job[1].split("_")[-2] for job in scraper.jobs] == ["page03"] * 2
+
+
+def media_url(number):
+    return f"https://scontent-gru2-1.cdninstagram.com/v/t51.29350-15/{number}_n.jpg"
+
+
+def test_incremental_mode_stops_on_known_media(server, scraper, monkeypatch):
+    monkeypatch.setattr(instagram_scraper, "INCREMENTAL_MODE", True)
+    monkeypatch.setattr(instagram_scraper, "INCREMENTAL_STOP_AFTER", 3)
+    # Execução anterior baixou tudo até a página 2, menos o post fixado (601)
+    scraper.downloaded_urls = {instagram_scraper.media_key(media_url(n)) for n in (602, 604, 605)}
+
+    total_media, total_downloads = scraper.scrape_profile_http("https://www.instagram.com/freelancer.photos/")
+
+    # 602 + 604 + 605 seguidas: para depois da página 2, sem pedir a página 3
+    assert feed_cursors(server) == [None, "3500000000000000003_51234567"]
+    assert scraper.known_streak == 3
+    assert (total_media, total_downloads) == (5, 1)
+    assert [instagram_scraper.media_key(job[0]) for job in scraper.jobs] == [instagram_scraper.media_key(media_url(601))]
+
+
+def test_incremental_mode_ignores_pinned_post(server, scraper, monkeypatch):
+    monkeypatch.setattr(instagram_scraper, "INCREMENTAL_MODE", True)
+    monkeypatch.setattr(instagram_scraper, "INCREMENTAL_STOP_AFTER", 2)
+    # O post fixado já baixado não conta: só 602 é uma mídia conhecida em sequência
+    scraper.downloaded_urls = {instagram_scraper.media_key(media_url(n)) for n in (601, 602)}
+
+    total_media, total_downloads = scraper.scrape_profile_http("https://www.instagram.com/freelancer.photos/")
+
+    assert feed_cursors(server) == [None, "3500000000000000003_51234567", "3500000000000000005_51234567"]
+    assert (total_media, total_downloads) == (7, 4)
+    assert scraper.known_streak == 0
@@ -0,0 +1,166 @@
+"""Fila distribuída: leases de perfis e reservas de mídias entre workers.
+
+Os testes de lease rodam nas duas filas (SQLite e em memória), com leases de
+frações de segundo no lugar dos minutos de JOB_LEASE_SECONDS. Os de reserva
+abrem dois DownloadLedger no mesmo banco, como dois nós num volume
+compartilhado.
+"""
+import time
+
+import pytest
+
+import instagram_scraper
+from instagram_scraper import DownloadLedger, MemoryJobQueue, SQLiteJobQueue, queue_worker
+
+PROFILE = "https://www.instagram.com/freelancer.photos/"
+MEDIA = "https://scontent.cdninstagram.com/v/t51.29350-15/441_n.jpg?stp=dst-jpg_e35&oh=1"
+LEASE = 0.2
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def make_queue(request, tmp_path):
+    def make(max_attempts=3):
+        if request.param == "memory":
+            return MemoryJobQueue(max_attempts)
+        return SQLiteJobQueue(str(tmp_path / "jobs.db"), max_attempts)
+    return make
+
+
+def test_expired_lease_is_taken_by_another_worker(make_queue):
+    job_queue = make_queue()
+    job_queue.add([PROFILE])
+
+    # O worker A pega o perfil e cai: nunca renova o lease
+    assert job_queue.claim("worker-a", LEASE) == PROFILE
+    assert job_queue.claim("worker-b", LEASE) is None
+
+    time.sleep(LEASE * 1.5)
+    assert job_queue.claim("worker-b", LEASE) == PROFILE
+
+    # A volta tarde demais: perdeu o lease e não pode concluir o perfil
+    assert job_queue.heartbeat(PROFILE, "worker-a", LEASE) is False
+    job_queue.complete(PROFILE, "worker-a", {'ok': True})
+    assert job_queue.counts() == {'leased': 1}
+
+    assert job_queue.heartbeat(PROFILE, "worker-b", LEASE) is True
+    job_queue.complete(PROFILE, "worker-b", {'ok': True})
+    assert job_queue.counts() == {'done': 1}
+    job_queue.close()
+
+
+def test_profile_fails_after_max_attempts(make_queue):
+    job_queue = make_queue(max_attempts=2)
+    job_queue.add([PROFILE])
+
+    assert job_queue.claim("worker-a", LEASE) == PROFILE
+    time.sleep(LEASE * 1.5)
+    assert job_queue.claim("worker-b", LEASE) == PROFILE
+    time.sleep(LEASE * 1.5)
+
+    # Dois leases expirados: o perfil é marcado como falho em vez de voltar à fila
+    assert job_queue.claim("worker-c", LEASE) is None
+    assert job_queue.counts() == {'failed': 1}
+    job_queue.close()
+
+
+class FakeScraper:
+    """Substitui o InstagramScraper no worker: só registra os perfis processados"""
+    scraped = []
+
+    def __init__(self):
+        self.ledger = None
+
+    def scrape_profile(self, profile_url, close_driver=True):
+        FakeScraper.scraped.append(profile_url)
+        return {'profile': instagram_scraper.profile_name(profile_url), 'url': profile_url, 'ok': True}
+
+    def close(self):
+        pass
+
+
+def test_worker_resumes_profile_from_crashed_worker(monkeypatch, tmp_path):
+    monkeypatch.setattr(instagram_scraper, "InstagramScraper", FakeScraper)
+    monkeypatch.setattr(instagram_scraper, "JOB_LEASE_SECONDS", LEASE)
+    monkeypatch.setattr(instagram_scraper, "JOB_POLL_SECONDS", 0.05)
+    FakeScraper.scraped = []
+    db_path = str(tmp_path / "jobs.db")
+
+    coordinator = SQLiteJobQueue(db_path)
+    coordinator.add([PROFILE, "https://www.instagram.com/ana.souza/"])
+    # Worker que caiu com o primeiro perfil
+    assert coordinator.claim("worker-a", LEASE) == PROFILE
+
+    # O segundo worker processa o perfil livre e espera o lease de A expirar
+    processed = queue_worker(2, job_queue=SQLiteJobQueue(db_path))
+
+    assert processed == 2
+    assert FakeScraper.scraped == ["https://www.instagram.com/ana.souza/", PROFILE]
+    assert coordinator.counts() == {'done': 2}
+    coordinator.close()
+
+
+def test_memory_backend_needs_shared_queue():
+    with pytest.raises(ValueError):
+        queue_worker(1, backend="memory")
+
+
+def open_ledgers(tmp_path):
+    db_path = str(tmp_path / "downloads.db")
+    # Mesmo modo de journal recomendado para o volume compartilhado
+    return DownloadLedger(db_path, journal_mode="DELETE"), DownloadLedger(db_path, journal_mode="DELETE")
+
+
+def claim_rows(ledger):
+    return ledger.conn.execute("SELECT media_key, owner FROM claims").fetchall()
+
+
+def test_claim_blocks_other_worker(tmp_path):
+    node_a, node_b = open_ledgers(tmp_path)
+
+    assert node_a.claim(MEDIA, "worker-a", ttl=600)
+    assert not node_b.claim(MEDIA, "worker-b", ttl=600)
+    # A mesma mídia com outra assinatura na URL continua reservada
+    assert not node_b.claim(MEDIA.replace("oh=1", "oh=2"), "worker-b", ttl=600)
+    # O dono pode renovar a própria reserva
+    assert node_a.claim(MEDIA, "worker-a", ttl=600)
+
+
+def test_stale_claim_is_taken_over(tmp_path):
+    node_a, node_b = open_ledgers(tmp_path)
+
+    assert node_a.claim(MEDIA, "worker-a", ttl=LEASE)
+    time.sleep(LEASE * 1.5)
+    # A caiu no meio do download: depois do ttl, B assume a reserva
+    assert node_b.claim(MEDIA, "worker-b", ttl=LEASE)
+    assert not node_a.claim(MEDIA, "worker-a", ttl=600)
+    assert claim_rows(node_a) == [(instagram_scraper.media_key(MEDIA), "worker-b")]
+
+
+def test_release_frees_claim(tmp_path):
+    node_a, node_b = open_ledgers(tmp_path)
+
+    assert node_a.claim(MEDIA, "worker-a", ttl=600)
+    # Só o dono libera a reserva
+    node_b.release(MEDIA, "worker-b")
+    assert not node_b.claim(MEDIA, "worker-b", ttl=600)
+
+    node_a.release(MEDIA, "worker-a")
+    assert claim_rows(node_b) == []
+    assert node_b.claim(MEDIA, "worker-b", ttl=600)
+
+
+def test_flushed_download_ends_claim(tmp_path):
+    node_a, node_b = open_ledgers(tmp_path)
+
+    assert node_a.claim(MEDIA, "worker-a", ttl=600)
+    node_a.add(MEDIA, profile="freelancer.photos", file_path="prints/a.jpg", size=123)
+    # Ainda no buffer de A: B continua bloqueado pela reserva
+    assert not node_b.claim(MEDIA, "worker-b", ttl=600)
+
+    node_a.flush()
+    assert claim_rows(node_b) == []
+    assert MEDIA in node_b
+    # Mídia registrada não pode ser reservada de novo, nem depois do ttl
+    assert not node_b.claim(MEDIA, "worker-b", ttl=0)
+    assert not node_a.claim(MEDIA, "worker-a", ttl=0)
+    assert claim_rows(node_b) == []
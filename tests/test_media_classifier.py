@@ -0,0 +1,104 @@
+"""Paridade do classificador de mídia (MEDIA_CLASSIFIER_JS) com o modo antigo.
+
+Executa numa grade de posts gravada (fixtures/feed_grid.html) tanto o
+classificador do navegador quanto as heurísticas antigas em Python
+(is_reel_or_video + has_reel_link_nearby, reproduzidas abaixo como referência)
+e compara os vereditos imagem a imagem.
+"""
+import os
+import re
+import pathlib
+
+import pytest
+from selenium.webdriver.common.by import By
+
+from instagram_scraper import CLASSIFY_ELEMENT_JS, FEED_CANDIDATES_JS, FEED_IMAGE_SELECTORS
+
+FEED_GRID = pathlib.Path(os.path.dirname(os.path.abspath(__file__)), "fixtures", "feed_grid.html")
+
+# Vereditos esperados (True = pulada como reel/vídeo), iguais aos do modo antigo
+EXPECTED = {
+    "photo": False,
+    "pinned": False,
+    "short": True,
+    "timer": True,
+    "igtv": True,
+    "carousel": True,
+    "alt-game": True,
+}
+
+
+def old_is_reel_or_video(img_element):
+    """is_reel_or_video do modo antigo"""
+    try:
+        parent = img_element.find_element(By.XPATH, "./..")
+        grandparent = parent.find_element(By.XPATH, "./..")
+        parent_html = parent.get_attribute('outerHTML').lower()
+        grandparent_html = grandparent.get_attribute('outerHTML').lower()
+        video_indicators = [
+            'reel', 'video', 'play', 'duration', 'clip',
+            'svg', 'play-button', 'video-player', 'media-video'
+        ]
+        for indicator in video_indicators:
+            if indicator in parent_html or indicator in grandparent_html:
+                return True
+        if grandparent.find_elements(By.TAG_NAME, "svg"):
+            return True
+        for span in grandparent.find_elements(By.TAG_NAME, "span"):
+            if re.match(r'\d+:\d+', span.text.strip()):
+                return True
+        return False
+    except Exception:
+        return False
+
+
+def old_has_reel_link_nearby(img_element):
+    """has_reel_link_nearby do modo antigo"""
+    try:
+        parent = img_element.find_element(By.XPATH, "./..")
+        grandparent = parent.find_element(By.XPATH, "./..")
+        for ancestor in [parent, grandparent]:
+            for link in ancestor.find_elements(By.TAG_NAME, "a"):
+                href = link.get_attribute('href') or ""
+                if any(pattern in href.lower() for pattern in ['/reel/', '/reels/', '/tv/', 'reel']):
+                    return True
+        return False
+    except Exception:
+        return False
+
+
+@pytest.fixture(scope="module")
+def feed_grid(browser):
+    browser.get(FEED_GRID.as_uri())
+    return browser
+
+
+def test_fixture_covers_expected_cases(feed_grid):
+    ids = [img.get_attribute("id") for img in feed_grid.find_elements(By.CSS_SELECTOR, "article img")]
+    assert ids == list(EXPECTED)
+
+
+@pytest.mark.parametrize("image_id", list(EXPECTED))
+def test_element_verdict_matches_old_heuristics(feed_grid, image_id):
+    img = feed_grid.find_element(By.ID, image_id)
+    old = old_is_reel_or_video(img) or old_has_reel_link_nearby(img)
+    new = feed_grid.execute_script(CLASSIFY_ELEMENT_JS, img)
+    assert (new["verdict"] != "photo") == old == EXPECTED[image_id], new
+
+
+def test_batch_candidates_match_element_verdicts(feed_grid):
+    candidates = feed_grid.execute_script(FEED_CANDIDATES_JS, ", ".join(FEED_IMAGE_SELECTORS))
+    verdicts = {}
+    for candidate in candidates:
+        image_id = feed_grid.execute_script(
+            "return document.querySelector(`img[src='${arguments[0]}']`).id", candidate["src"]
+        )
+        verdicts[image_id] = candidate["verdict"] != "photo"
+    assert verdicts == EXPECTED
+
+
+def test_post_link_with_reel_in_username_is_not_a_reel(feed_grid):
+    # O link do post envolve a imagem e contém o nome do perfil (freelancer.photos)
+    img = feed_grid.find_element(By.ID, "photo")
+    assert "reel" in img.find_element(By.XPATH, "./ancestor::a").get_attribute("href")
+    assert feed_grid.execute_script(CLASSIFY_ELEMENT_JS, img)["verdict"] == "photo"
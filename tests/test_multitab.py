@@ -0,0 +1,201 @@
+"""Modo multiabas: ajustes de rede por aba e downloads concluídos por perfil.
+
+O driver falso registra os comandos CDP por janela, já que no Chrome cada aba
+é um alvo separado e Network.enable/Network.setBlockedURLs não passam de uma
+aba para outra.
+"""
+import time
+from datetime import datetime
+
+import instagram_scraper
+from instagram_scraper import DownloadPipeline, InstagramScraper, NetworkCapture
+
+
+class FakeSwitchTo:
+    def __init__(self, driver):
+        self.driver = driver
+
+    def new_window(self, kind):
+        handle = f"window-{len(self.driver.window_handles) + 1}"
+        self.driver.window_handles.append(handle)
+        self.driver.current_window_handle = handle
+
+    def window(self, handle):
+        self.driver.current_window_handle = handle
+
+
+class FakeDriver:
+    def __init__(self):
+        self.window_handles = ["window-1"]
+        self.current_window_handle = "window-1"
+        self.switch_to = FakeSwitchTo(self)
+        self.events = []
+
+    def execute_cdp_cmd(self, command, params):
+        self.events.append((self.current_window_handle, command, params))
+        return {}
+
+    def get(self, url):
+        self.events.append((self.current_window_handle, "get", url))
+
+    def execute_script(self, script, *args):
+        return 1000
+
+    def close(self):
+        self.window_handles.remove(self.current_window_handle)
+
+
+def make_scraper(driver, capture=True):
+    scraper = InstagramScraper.__new__(InstagramScraper)
+    scraper.driver = driver
+    scraper.network_capture = NetworkCapture(driver, capture_feed=False, capture_images=True) if capture else None
+    scraper.pipeline = None
+    scraper.logged_in = True
+    scraper.current_profile = None
+    scraper.settle_page = lambda want=None: None
+    scraper.install_feed_tracker = lambda: None
+    scraper.flush_history = lambda: None
+    scraper.persist_membership_index = lambda: None
+    return scraper
+
+
+def test_network_settings_applied_to_every_new_tab(monkeypatch):
+    monkeypatch.setattr(instagram_scraper, "LEAN_BROWSER_MODE", True)
+    driver = FakeDriver()
+    scraper = make_scraper(driver)
+    driver.events.clear()
+
+    scraper.open_tab("https://www.instagram.com/perfil_a/", "window-1")
+    scraper.open_tab("https://www.instagram.com/perfil_b/")
+    scraper.open_tab("https://www.instagram.com/perfil_c/")
+
+    for handle in ("window-1", "window-2", "window-3"):
+        commands = [(command, params) for h, command, params in driver.events if h == handle]
+        names = [command for command, _ in commands]
+        # Buffers e bloqueio antes do carregamento da página
+        assert names.index("Network.enable") < names.index("get")
+        assert names.index("Network.setBlockedURLs") < names.index("get")
+        enable = dict(commands)["Network.enable"]
+        assert enable["maxTotalBufferSize"] == NetworkCapture.MAX_TOTAL_BUFFER
+        assert enable["maxResourceBufferSize"] == NetworkCapture.MAX_RESOURCE_BUFFER
+
+
+def test_lean_mode_off_leaves_tabs_unblocked(monkeypatch):
+    monkeypatch.setattr(instagram_scraper, "LEAN_BROWSER_MODE", False)
+    driver = FakeDriver()
+    scraper = make_scraper(driver, capture=False)
+
+    scraper.open_tab("https://www.instagram.com/perfil_a/")
+    assert not [command for _, command, _ in driver.events if command.startswith("Network.")]
+
+
+def test_pipeline_counts_downloads_per_profile(monkeypatch):
+    monkeypatch.setattr(instagram_scraper, "DOWNLOAD_DELAY", 0)
+    scraper = make_scraper(FakeDriver(), capture=False)
+    scraper.download_image = lambda url, filename, body=None, profile=None: not url.endswith("falha.jpg")
+    pipeline = DownloadPipeline(scraper, workers=2, max_queued=4)
+
+    scraper.current_profile = "perfil_a"
+    pipeline.submit("https://cdn.example/a1.jpg", "a1.jpg")
+    pipeline.submit("https://cdn.example/a2.jpg", "a2.jpg")
+    scraper.current_profile = "perfil_b"
+    pipeline.submit("https://cdn.example/b1.jpg", "b1.jpg")
+    pipeline.submit("https://cdn.example/falha.jpg", "falha.jpg")
+    pipeline.close()
+
+    assert pipeline.profile_status("perfil_a") == (0, 2)
+    assert pipeline.profile_status("perfil_b") == (0, 1)
+    assert pipeline.profile_status("perfil_c") == (0, 0)
+
+
+def test_tab_results_report_completed_downloads(monkeypatch):
+    monkeypatch.setattr(instagram_scraper, "PIPELINE_MODE", True)
+    monkeypatch.setattr(instagram_scraper, "DOWNLOAD_WORKERS", 2)
+    monkeypatch.setattr(instagram_scraper, "DOWNLOAD_DELAY", 0)
+    monkeypatch.setattr(instagram_scraper, "SCROLL_WAIT_MIN", 0)
+    monkeypatch.setattr(instagram_scraper, "LEAN_BROWSER_MODE", False)
+    scraper = make_scraper(FakeDriver(), capture=False)
+
+    def download_image(url, filename, body=None, profile=None):
+        # Downloads lentos: a aba termina antes da fila esvaziar
+        time.sleep(0.05)
+        return "falha" not in url
+    scraper.download_image = download_image
+
+    images = {
+        "perfil_a": ["a1.jpg", "a2.jpg", "a3.jpg"],
+        "perfil_b": ["b1.jpg", "falha1.jpg", "falha2.jpg"],
+    }
+
+    def advance_tab(tab):
+        scraper.current_profile = tab.profile
+        jobs = [(f"https://cdn.example/{tab.profile}/{name}", name, None, None) for name in images[tab.profile]]
+        tab.queued += scraper.pipeline.submit_all(jobs)
+        tab.done = True
+    scraper.advance_tab = advance_tab
+
+    profiles = iter(["https://www.instagram.com/perfil_a/", "https://www.instagram.com/perfil_b/"])
+    results = scraper.scrape_profiles_in_tabs(lambda: next(profiles, None), max_tabs=2)
+
+    downloads = {result["profile"]: result["downloads"] for result in results}
+    assert downloads == {"perfil_a": 3, "perfil_b": 1}
+    assert all(result["ok"] for result in results)
+
+
+def make_feed_scraper(monkeypatch):
+    """Scraper cujo feed mostra duas fotos por perfil a cada scroll"""
+    monkeypatch.setattr(instagram_scraper, "EXTRACTION_MODE", "script")
+    monkeypatch.setattr(instagram_scraper, "FEED_TRACKING_MODE", "full")
+    monkeypatch.setattr(instagram_scraper, "DOM_PRUNE_MODE", False)
+    monkeypatch.setattr(instagram_scraper, "INCREMENTAL_MODE", False)
+    monkeypatch.setattr(instagram_scraper, "LEAN_BROWSER_MODE", False)
+
+    scraper = make_scraper(FakeDriver(), capture=False)
+    scraper.downloaded_urls = set()
+    scraper.reset_known_streak()
+    scraper.prune_processed_posts = lambda: 0
+    scraper.collect_feed_candidates = lambda: [
+        {'src': f"https://scontent.cdninstagram.com/v/t51.29350-15/{scraper.current_profile}_{i}_n.jpg", 'alt': ""}
+        for i in range(2)
+    ]
+    scraper.filenames = []
+    scraper.download_images_batch = lambda jobs: scraper.filenames.extend(job[1] for job in jobs) or len(jobs)
+    return scraper
+
+
+def test_tabs_on_same_scroll_get_distinct_filenames(monkeypatch):
+    scraper = make_feed_scraper(monkeypatch)
+
+    # As abas avançam juntas: o mesmo scroll cai no mesmo segundo
+    class FrozenDatetime(datetime):
+        @classmethod
+        def now(cls, tz=None):
+            return cls(2024, 12, 15, 16, 20, 35)
+    monkeypatch.setattr(instagram_scraper, "datetime", FrozenDatetime)
+
+    tabs = [scraper.open_tab("https://www.instagram.com/perfil_a/"),
+            scraper.open_tab("https://www.instagram.com/perfil_b/")]
+    for tab in tabs:
+        scraper.advance_tab(tab)
+
+    assert [tab.scroll_count for tab in tabs] == [1, 1]
+    assert scraper.filenames == [
+        "perfil_a_20241215_162035_scroll01_img001.jpg", "perfil_a_20241215_162035_scroll01_img002.jpg",
+        "perfil_b_20241215_162035_scroll01_img001.jpg", "perfil_b_20241215_162035_scroll01_img002.jpg",
+    ]
+
+
+def test_known_streak_is_kept_per_tab(monkeypatch):
+    scraper = make_feed_scraper(monkeypatch)
+    tabs = [scraper.open_tab("https://www.instagram.com/perfil_a/"),
+            scraper.open_tab("https://www.instagram.com/perfil_b/")]
+    for _ in range(2):
+        for tab in tabs:
+            scraper.advance_tab(tab)
+
+    for tab in tabs:
+        assert tab.streak_keys == {f"ig:{tab.profile}_0_n", f"ig:{tab.profile}_1_n"}
+    # Ao encerrar, o scraper não guarda as chaves dos perfis processados
+    profiles = iter([])
+    scraper.scrape_profiles_in_tabs(lambda: next(profiles, None), max_tabs=2)
+    assert scraper.streak_keys == set() and scraper.known_streak == 0
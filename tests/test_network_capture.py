@@ -0,0 +1,132 @@
+"""Extração das mídias pelas respostas de rede (DISCOVERY_MODE = "network").
+
+As respostas em fixtures/network/ foram gravadas do web app e reduzidas aos
+campos que o parser lê: feed da API v1 (foto fixada, carrossel com vídeo,
+reel e post em colaboração), timeline da página inicial (post de outra conta
+e um story do próprio perfil) e a grade do perfil em GraphQL.
+"""
+import json
+import os
+
+import pytest
+
+import instagram_scraper
+from instagram_scraper import InstagramScraper, NetworkCapture, media_key, parse_feed_media
+
+NETWORK_FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "network")
+
+
+def load_fixture(name):
+    with open(os.path.join(NETWORK_FIXTURES, name), encoding="utf-8") as f:
+        return f.read()
+
+
+def make_scraper(profile="freelancer.photos", downloaded=()):
+    scraper = InstagramScraper.__new__(InstagramScraper)
+    scraper.current_profile = profile
+    scraper.downloaded_urls = {media_key(url) for url in downloaded}
+    scraper.reset_known_streak()
+    return scraper
+
+
+def test_v1_feed_carousel_video_and_pinned():
+    records = parse_feed_media(json.loads(load_fixture("feed_user.json")))
+    by_code = {}
+    for record in records:
+        by_code.setdefault(record["shortcode"], []).append(record)
+
+    # Carrossel: um registro por slide, com o slide de vídeo marcado
+    assert [r["media_type"] for r in by_code["C1aCarous06"]] == ["photo", "photo", "video"]
+    assert all(r["owners"] == ["freelancer.photos"] for r in by_code["C1aCarous06"])
+    assert by_code["C1aReel0003"][0]["media_type"] == "video"
+
+    pinned = by_code["C1aPinned02"][0]
+    assert pinned["is_pinned"] and pinned["width"] == 1080
+    assert not any(r["is_pinned"] for code, rs in by_code.items() if code != "C1aPinned02" for r in rs)
+
+
+def test_graphql_profile_grid():
+    records = parse_feed_media(json.loads(load_fixture("profile_graphql.json")))
+    assert [(r["shortcode"], r["media_type"]) for r in records] == [
+        ("C1aSidecar9", "photo"), ("C1aSidecar9", "video"),
+        ("C1aImage010", "photo"), ("C1aVideo011", "video"),
+    ]
+    # display_resources: fica a maior versão
+    assert records[0]["url"].endswith("oh=00_AYG2")
+
+
+def test_filter_keeps_only_profile_photos():
+    records = parse_feed_media(json.loads(load_fixture("feed_user.json")))
+    records += parse_feed_media(json.loads(load_fixture("home_timeline.json")))
+    scraper = make_scraper()
+
+    new_images, already_downloaded, videos_skipped = scraper.filter_network_media(records, set())
+
+    names = [url.split("/")[-1].split("?")[0] for url in new_images]
+    # Fora: o story (502), o post de outra conta (501) e os vídeos
+    assert names == ["442_n.jpg", "441_n.jpg", "446_1_n.jpg", "446_2_n.jpg", "448_n.jpg"]
+    assert already_downloaded == 0
+    assert videos_skipped == 2
+
+
+def test_filter_counts_known_media_and_skips_pinned_in_streak():
+    records = parse_feed_media(json.loads(load_fixture("feed_user.json")))
+    photos = [r["url"] for r in records if r["media_type"] == "photo"]
+    scraper = make_scraper(downloaded=photos)
+
+    new_images, already_downloaded, _ = scraper.filter_network_media(records, set())
+
+    assert new_images == []
+    assert already_downloaded == len(photos)
+    assert scraper.known_streak == len(photos) - 1  # o post fixado não conta
+
+
+class ReplayDriver:
+    """Driver falso que devolve um log de performance gravado e os corpos das respostas"""
+
+    def __init__(self, responses):
+        self.log = []
+        self.bodies = {}
+        for request_id, (url, body) in enumerate(responses, 1):
+            request_id = str(request_id)
+            self.bodies[request_id] = body
+            self.log.append(self.entry("Network.responseReceived", {
+                "requestId": request_id, "response": {"url": url, "mimeType": "application/json"}
+            }))
+            self.log.append(self.entry("Network.loadingFinished", {"requestId": request_id}))
+
+    @staticmethod
+    def entry(method, params):
+        return {"message": json.dumps({"message": {"method": method, "params": params}})}
+
+    def get_log(self, kind):
+        log, self.log = self.log, []
+        return log
+
+    def execute_cdp_cmd(self, command, params):
+        if command == "Network.getResponseBody":
+            return {"body": self.bodies[params["requestId"]], "base64Encoded": False}
+        return {}
+
+
+def test_network_capture_reads_feed_responses_once():
+    driver = ReplayDriver([
+        ("https://www.instagram.com/api/v1/feed/user/51234567/?count=12", "for (;;);" + load_fixture("feed_user.json")),
+        ("https://www.instagram.com/graphql/query", load_fixture("profile_graphql.json")),
+        ("https://www.instagram.com/api/v1/feed/user/51234567/?count=12", load_fixture("feed_user.json")),
+    ])
+    capture = NetworkCapture(driver)
+
+    records = capture.drain()
+
+    # A terceira resposta repete a primeira: nenhuma mídia sai duas vezes
+    assert len(records) == 7 + 4
+    assert capture.drain() == []
+
+
+@pytest.mark.parametrize("profile, expected", [("freelancer.photos", 5), ("studio.parceiro", 1), ("outra.conta", 1)])
+def test_filter_uses_current_profile(profile, expected):
+    records = parse_feed_media(json.loads(load_fixture("feed_user.json")))
+    records += parse_feed_media(json.loads(load_fixture("home_timeline.json")))
+    new_images, _, _ = make_scraper(profile).filter_network_media(records, set())
+    assert len(new_images) == expected
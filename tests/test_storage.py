@@ -0,0 +1,81 @@
+"""Gravação das imagens em disco: arquivos com o mesmo nome nunca se sobrescrevem.
+
+Workers do modo em lote e da fila distribuída gravam no mesmo prints/ e
+começam juntos, então dois processos podem gerar o mesmo nome no mesmo
+segundo.
+"""
+import multiprocessing
+import os
+
+import instagram_scraper
+from instagram_scraper import InstagramScraper
+
+JPEG = b"\xff\xd8\xff\xe0"
+
+
+def make_scraper():
+    return InstagramScraper.__new__(InstagramScraper)
+
+
+def write_image(filepath, body):
+    return make_scraper().write_chunks_atomically([body], filepath)
+
+
+def write_after_barrier(barrier, filepath, body, results):
+    barrier.wait()
+    results.put(write_image(filepath, body)[0])
+
+
+def test_same_name_gets_a_suffix(monkeypatch, tmp_path):
+    monkeypatch.setattr(instagram_scraper, "STORAGE_MODE", "timestamp")
+    filepath = str(tmp_path / "20241215_162035_scroll01_img001.jpg")
+
+    first, _, _ = write_image(filepath, JPEG + b"perfil_a")
+    second, _, duplicate = write_image(filepath, JPEG + b"perfil_b")
+
+    assert first == filepath
+    assert second == str(tmp_path / "20241215_162035_scroll01_img001_2.jpg")
+    assert not duplicate
+    with open(first, "rb") as f:
+        assert f.read() == JPEG + b"perfil_a"
+    with open(second, "rb") as f:
+        assert f.read() == JPEG + b"perfil_b"
+    assert sorted(os.listdir(tmp_path)) == [os.path.basename(first), os.path.basename(second)]
+
+
+def test_processes_writing_the_same_name_keep_every_image(monkeypatch, tmp_path):
+    monkeypatch.setattr(instagram_scraper, "STORAGE_MODE", "timestamp")
+    filepath = str(tmp_path / "20241215_162035_scroll01_img001.jpg")
+    context = multiprocessing.get_context()
+    barrier = context.Barrier(4)
+    results = context.Queue()
+
+    processes = [
+        context.Process(target=write_after_barrier, args=(barrier, filepath, JPEG + bytes([i]) * 64, results))
+        for i in range(4)
+    ]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join(timeout=30)
+        assert process.exitcode == 0
+
+    paths = [results.get(timeout=5) for _ in processes]
+    assert len(set(paths)) == 4
+    contents = set()
+    for path in paths:
+        with open(path, "rb") as f:
+            contents.add(f.read())
+    assert contents == {JPEG + bytes([i]) * 64 for i in range(4)}
+    assert not [name for name in os.listdir(tmp_path) if name.endswith(".part")]
+
+
+def test_content_mode_still_deduplicates(monkeypatch, tmp_path):
+    monkeypatch.setattr(instagram_scraper, "STORAGE_MODE", "content")
+    filepath = str(tmp_path / "qualquer.jpg")
+
+    first, _, duplicate = write_image(filepath, JPEG + b"igual")
+    second, _, second_duplicate = write_image(filepath, JPEG + b"igual")
+
+    assert first == second and not duplicate and second_duplicate
+    assert os.listdir(tmp_path) == [os.path.basename(first)]